@@ -14,9 +14,15 @@ import gc
 import builtins
 import time
 import board
-import traceback
 
+import font_cache
+from errorhandler import ErrorHandler
+from metrics import Metrics
 from settings import app_config
+try:
+  from settings import hw_config
+except:
+  hw_config = None
 
 # --- application class   ----------------------------------------------------
 
@@ -35,10 +41,32 @@ class Application:
     if with_rtc and self._rtc_ext:
       self._rtc_ext.update_time(app_config.time_url)
     dataprovider.set_wifi(self.wifi)
+    if hasattr(dataprovider,"set_display"):
+      dataprovider.set_display(self.display)
 
     self._dataprovider = dataprovider
     self._uiprovider   = uiprovider
     self.data = {}
+    self.fingerprint = None           # checksum of displayed content
+    self.skipped     = 0              # number of skipped refreshes
+
+    # supervisor (see run())
+    self._error_handler = ErrorHandler()
+    self._error_handler.set_display(self.display)
+    self._error_handler.get_content()  # prebuilt: failures might be OOM
+    self._error_shown   = False       # error-screen is on the display
+    self._last_good     = None        # time of last successful update
+    self._outage_start  = None        # time of first failure of outage
+    self.failures        = 0          # consecutive failed runs
+    self.errors          = 0          # failed runs (total)
+    self.extra_refreshes = 0          # full refreshes caused by errors
+    self.recovery_time   = None       # duration of last outage (seconds)
+
+    # per-cycle records (see metrics.py)
+    self.metrics = Metrics(
+      size=getattr(app_config,"metrics_size",32),
+      path=getattr(app_config,"metrics_file",None),
+      flush=1 if getattr(app_config,"deep_sleep",False) else None)
 
   # --- get HAL   ------------------------------------------------------------
 
@@ -46,12 +74,27 @@ class Application:
   # This expects an object "impl" within the implementing hal_file.
   # All hal implementations are within src/hal/. Filenames must be
   # board.board_id.py, e.g. src/hal/pimoroni_inky_frame_5_7.py
+  # hw_config.HAL overrides the board_id (e.g. "headless").
+  # A bundle built with tools/build_mpy.py contains the map hal_map.py of
+  # all HAL-files: boards without a HAL-file then use the default
+  # implementation without a failing import.
 
   def _get_hal(self):
     """ read and return hal-object """
 
+    board_id = getattr(hw_config,"HAL",board.board_id).replace(".","_")
     try:
-      hal_file = "hal."+board.board_id.replace(".","_")
+      from hal_map import HAL_MAP
+    except ImportError:
+      HAL_MAP = None
+
+    if HAL_MAP is not None:
+      hal_file = HAL_MAP.get(board_id,"hal.hal_default")
+      self.msg(f"info: using {hal_file} (hal_map)")
+      return builtins.__import__(hal_file,None,None,["impl"],0)
+
+    try:
+      hal_file = "hal."+board_id
       hal = builtins.__import__(hal_file,None,None,["impl"],0)
       self.msg("using board-specific implementation")
     except Exception as ex:
@@ -76,6 +119,8 @@ class Application:
     self.wifi       = hal.impl.wifi(self._debug)
     self._shutdown  = hal.impl.shutdown
     self.sleep      = hal.impl.sleep
+    self.deep_sleep = hal.impl.deep_sleep
+    self.sleep_memory = hal.impl.get_sleep_memory()
     self._show      = hal.impl.show
     self.reset      = hal.impl.reset_if_needed
     if with_rtc:
@@ -92,6 +137,19 @@ class Application:
     if self._debug:
       print(text)
 
+  # --- run data-provider   --------------------------------------------------
+
+  def _fetch_data(self):
+    """ update data with the data-provider """
+
+    try:
+      self._dataprovider.update_data(self.data)
+    except MemoryError:
+      # drop cached glyphs (reloaded lazily) and retry once
+      self.msg("MemoryError: dropping glyphs")
+      font_cache.drop_glyphs()
+      self._dataprovider.update_data(self.data)
+
   # --- update data from server   --------------------------------------------
 
   def update_data(self):
@@ -100,9 +158,10 @@ class Application:
     self.blink(0.3,color=Application.RED)
     self.data["bat_level"] = self.bat_level()
 
-    start = time.monotonic()
-    self._dataprovider.update_data(self.data)
-    duration = time.monotonic()-start
+    self.metrics.begin()
+    self._fetch_data()
+    duration = self.metrics.end("data")
+    self.metrics.low("mem_data",getattr(self._dataprovider,"mem_min",0))
     self.blink(0.3,color=Application.GREEN)
     self.msg(f"update_data (dataprovider): {duration:f}s")
 
@@ -111,9 +170,9 @@ class Application:
   def create_ui(self):
     """ create UI. UI-provider might buffer UI for performance """
 
-    start = time.monotonic()
+    self.metrics.begin()
     self._ui = self._uiprovider.create_ui(self.display)
-    duration = time.monotonic()-start
+    duration = self.metrics.end("ui")
     self.msg(f"create_content (uiprovider): {duration:f}s")
 
   # --- update display   -----------------------------------------------------
@@ -121,17 +180,34 @@ class Application:
   def update_display(self):
     """ update display """
 
+    # skip refresh if the content would not change
+    fingerprint = None
+    if hasattr(self._uiprovider,"fingerprint"):
+      fingerprint = self._uiprovider.fingerprint(self.data)
+      if fingerprint == self.fingerprint:
+        self.skipped += 1
+        self.msg(f"content unchanged: skipped refreshes: {self.skipped}")
+        return
+
     # update UI with current model
-    start = time.monotonic()
+    self.metrics.begin()
     self._uiprovider.update_ui(self.data)
-    duration = time.monotonic()-start
+    duration = self.metrics.end("update")
     self.msg(f"update_ui (uiprovider): {duration:f}s")
 
-    # and show content on screen
-    start = time.monotonic()
-    self._show(self._ui)
-    duration = time.monotonic()-start
+    # and show content on screen (partial refresh of changed regions, if
+    # supported by UI-provider and HAL)
+    dirty = None
+    if hasattr(self._uiprovider,"get_dirty"):
+      dirty = self._uiprovider.get_dirty()
+    self.metrics.begin()
+    failed = self._show(self._ui,dirty)
+    duration = self.metrics.end("show")
+    if failed:
+      self.msg(f"partial refresh failed: {failed}")
+    self.metrics.set("refresh",1)
     self.msg(f"show (HAL): {duration:f}s")
+    self.fingerprint = fingerprint
 
   # --- free memory from UI   ------------------------------------------------
 
@@ -139,11 +215,11 @@ class Application:
     """ free memory used by UI and display """
 
     if not self.is_pygame:
-      self.msg(f"free memory before clear of UI: {gc.mem_free()}")
+      self.msg(f"free memory before clear of UI: {Metrics.mem_free()}")
       self.display.root_group = None
       self._uiprovider.clear_ui()
       #gc.collect()
-      self.msg(f"free memory after clear of UI: {gc.mem_free()}")
+      self.msg(f"free memory after clear of UI: {Metrics.mem_free()}")
 
   # --- blink status-led   ---------------------------------------------------
 
@@ -159,14 +235,119 @@ class Application:
     """ turn off device """
     self._shutdown()
 
-  # --- main application code   ----------------------------------------------
+  # --- error-handling   ----------------------------------------------------
 
-  def run(self):
-    """ main application logic usually called in a loop """
+  def on_error(self,phase,ex):
+    """ handle failure of a phase: show stale data or the error-screen """
+
+    self.msg(f"{phase} failed: {ex}")
+    self._error_handler.on_exception(ex)
+    self.errors   += 1
+    self.failures += 1
+    if self._outage_start is None:
+      self._outage_start = time.monotonic()
+
+    try:
+      if (phase == "update_data" and self._last_good is not None and
+          getattr(self._uiprovider,"STALE_BANNER",False)):
+        # last-good data is on the display: only mark it as stale
+        # (partial refresh of the footer)
+        self.data["stale"] = True
+        self.update_display()
+        return
+      if self._last_good is None and self.fingerprint is not None:
+        # content from before a reset (deep-sleep) is on the display
+        self.msg("keeping content of display")
+        return
+    except Exception as ex2:
+      self._error_handler.on_exception(ex2)
+
+    if self._error_shown:
+      return
+    try:
+      self._show(self._error_handler.get_content())
+    except Exception as ex2:
+      # keep the display, retry at the next failure
+      self._error_handler.on_exception(ex2)
+      return
+    self._error_shown   = True
+    self.fingerprint    = None        # force refresh after recovery
+    self.extra_refreshes += 1
+    self.msg(f"error-screen shown: extra refreshes: {self.extra_refreshes}")
+
+  # --- recovery after successful run   --------------------------------------
+
+  def _on_success(self):
+    """ update counters after a successful run """
+
+    self._last_good = time.monotonic()
+    if self._error_shown:
+      # update_display() replaced the error-screen with a full refresh
+      self._error_shown     = False
+      self.extra_refreshes += 1
+    if self._outage_start is not None:
+      self.recovery_time = self._last_good - self._outage_start
+      self._outage_start = None
+      self.msg(f"recovered after {self.failures} failures " +
+               f"in {self.recovery_time:f}s, " +
+               f"extra refreshes: {self.extra_refreshes}")
+    self.failures = 0
+
+  # --- run phase   ---------------------------------------------------------
+
+  def _run_phase(self,phase):
+    """ run method phase, return False if it failed """
 
     try:
-      self.update_data()    # update data before UI is created
-      self.create_ui()      # ui-provider should buffer this for performance
-      self.update_display()
+      getattr(self,phase)()
+      return True
     except Exception as ex:
-      raise
+      self.on_error(phase,ex)
+      return False
+
+  # --- show updated data   -------------------------------------------------
+
+  def _show_data(self,stale):
+    """ create UI and update display after a successful update of the data.
+        stale: stale data was shown before """
+
+    self.data["stale"] = False
+    if (self.data.get("unchanged",False) and
+        not (stale or self._error_shown)):
+      self.msg("data unchanged: skipping update of display")
+    elif not (self._run_phase("create_ui") and  # ui-provider buffers the UI
+              self._run_phase("update_display")):
+      return False
+    self._on_success()
+    return True
+
+  # --- metrics of a cycle   ------------------------------------------------
+
+  def start_cycle(self):
+    """ start record of metrics """
+    self.metrics.start()
+    self._rx_bytes = getattr(self.wifi,"rx_bytes",0)
+
+  def end_cycle(self,ok):
+    """ finish record of metrics """
+
+    policy = getattr(self.wifi,"policy",None)
+    if policy:
+      self.metrics.set("retries",max(0,policy.stats.attempts-1))
+    self.metrics.set("bytes",getattr(self.wifi,"rx_bytes",0)-self._rx_bytes)
+    self.metrics.set("bat",self.data.get("bat_level",0))
+    self.metrics.set("ok",ok)
+    self.metrics.commit()
+    return ok
+
+  # --- main application code   ----------------------------------------------
+
+  def run(self):
+    """ main application logic usually called in a loop.
+        Failures are handled by on_error(). Returns True on success """
+
+    self.start_cycle()
+    stale = self.data.get("stale",False)
+    if not self._run_phase("update_data"):  # update data before UI is created
+      return self.end_cycle(False)
+    return self.end_cycle(self._show_data(stale))
@@ -0,0 +1,172 @@
+# -------------------------------------------------------------------------
+# Application framework class using asyncio.
+#
+# Data-fetch, creation of the static UI, LED-signalling and key-polling
+# run as cooperative tasks. LED-patterns no longer block the update-cycle,
+# and between updates the main-loop sleeps until the next update is due
+# or a key-press wakes it up.
+#
+# On CPython (Linux/pygame) the blocking fetch runs in a worker-thread,
+# so the UI is created while waiting for the network. CircuitPython has
+# no threads: the fetch runs inline, but LED and keys still don't add
+# dead time.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+# --- imports   -----------------------------------------------------------
+
+import time
+import asyncio
+try:
+  import keypad
+except:
+  keypad = None
+
+from application import Application
+from metrics import Metrics
+
+# --- application class   ----------------------------------------------------
+
+class AsyncApplication(Application):
+
+  KEY_POLL = 0.1                      # poll-interval of keys (seconds)
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,dataprovider,uiprovider,with_rtc=True,debug=False):
+    """ constructor """
+
+    super().__init__(dataprovider,uiprovider,with_rtc=with_rtc,debug=debug)
+    self._wake     = asyncio.Event()
+    self._led_task = None
+
+  # --- blink status-led without blocking   ----------------------------------
+
+  async def _blink(self,duration,color):
+    """ blink status-led once for the given duration """
+    self.led(1,color=color)
+    await asyncio.sleep(duration)
+    self.led(0,color=color)
+
+  def signal(self,duration,color=Application.GREEN):
+    """ blink status-led in the background """
+    self._led_task = asyncio.create_task(self._blink(duration,color))
+
+  # --- update data from server   --------------------------------------------
+
+  async def update_data_async(self):
+    """ update data. The LED is on while fetching """
+
+    self.led(1,color=Application.RED)
+    self.data["bat_level"] = self.bat_level()
+
+    start = time.monotonic()            # create_ui() runs concurrently
+    mem   = Metrics.mem_free()
+    try:
+      if hasattr(asyncio,"to_thread"):
+        await asyncio.to_thread(self._fetch_data)
+      else:
+        self._fetch_data()
+    finally:
+      self.led(0,color=Application.RED)
+    duration = self.metrics.record("data",start,mem)
+    self.metrics.low("mem_data",getattr(self._dataprovider,"mem_min",0))
+    self.msg(f"update_data (dataprovider): {duration:f}s")
+    self.signal(0.3,color=Application.GREEN)
+
+  # --- create ui   ----------------------------------------------------------
+
+  async def create_ui_async(self):
+    """ create UI while the fetch is running """
+
+    await asyncio.sleep(0)              # let the fetch start first
+    self.create_ui()
+
+  # --- one update-cycle   ---------------------------------------------------
+
+  async def run_async(self):
+    """ main application logic: fetch and create UI overlapped.
+        Failures are handled by on_error(). Returns True on success """
+
+    self.start_cycle()
+    stale   = self.data.get("stale",False)
+    results = await asyncio.gather(self.update_data_async(),
+                                   self.create_ui_async(),
+                                   return_exceptions=True)
+    if isinstance(results[0],Exception):
+      self.on_error("update_data",results[0])
+      return self.end_cycle(False)
+    return self.end_cycle(self._show_data(stale))  # retries failed create_ui
+
+  # --- hook: called after every cycle   -------------------------------------
+
+  def after_run(self):
+    """ return seconds until the next cycle is due (None: stop) """
+    return None
+
+  # --- hook: key-press   ----------------------------------------------------
+
+  def on_key(self,key):
+    """ process key-press: default is to force an update """
+    self.msg(f"key {key} pressed")
+    self._wake.set()
+
+  # --- poll keys and pygame-events   ----------------------------------------
+
+  async def _poll_keys(self):
+    """ poll keys (and quit-events of pygame) """
+
+    keys = None
+    if self.keys and keypad:
+      active,pins = self.keys
+      keys  = keypad.Keys(pins,value_when_pressed=active,pull=True)
+      event = keypad.Event()
+    while True:
+      if self.is_pygame and self.display.check_quit():
+        self.shutdown()
+      while keys and keys.events.get_into(event):
+        if event.pressed:
+          self.on_key(event.key_number)
+      await asyncio.sleep(AsyncApplication.KEY_POLL)
+
+  # --- sleep until next cycle or key-press   --------------------------------
+
+  async def _idle(self,delay):
+    """ wait for the given delay or until woken up """
+
+    self._wake.clear()
+    try:
+      await asyncio.wait_for(self._wake.wait(),delay)
+    except asyncio.TimeoutError:
+      pass
+
+  # --- main loop   ----------------------------------------------------------
+
+  async def main_loop(self):
+    """ run cycles until after_run() returns None """
+
+    poll = None
+    if (self.keys and keypad) or self.is_pygame:
+      poll = asyncio.create_task(self._poll_keys())
+    while True:
+      await self.run_async()
+      delay = self.after_run()
+      if delay is None:
+        break
+      if delay > 0:
+        self.msg(f"idle for {delay:f}s")
+        await self._idle(delay)
+
+    if poll:
+      poll.cancel()
+    if self._led_task and not self._led_task.done():
+      await self._led_task              # don't leave the LED on
+
+  def start(self):
+    """ run main loop """
+    asyncio.run(self.main_loop())
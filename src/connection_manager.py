@@ -0,0 +1,194 @@
+# ----------------------------------------------------------------------------
+# connection_manager.py: long-lived HTTP-session with DNS-cache
+#
+# The socket-pool, SSL-context and requests-session are created once and
+# kept across update-cycles, so keep-alive sockets of
+# adafruit_connection_manager are reused as long as the radio stays up.
+# Host-names are resolved once per TTL: the resolved address is also used
+# for TLS-connections (the SSL-context still verifies the host-name).
+#
+# Timings of the last request are available in SessionManager.stats.
+# TCP-connect and TLS-handshake are a single call on CircuitPython, so
+# "connect" covers both (zero if a keep-alive socket was reused). The
+# timings are taken by proxies of the socket-pool and SSL-context passed
+# to adafruit_requests.Session, so no internals of the session are patched.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# ----------------------------------------------------------------------------
+
+import time
+import adafruit_requests
+import adafruit_connection_manager
+
+# --- statistics   -----------------------------------------------------------
+
+class ConnectionStats:
+  """ timings of the last request """
+
+  def __init__(self):
+    self.requests = 0           # cumulative
+    self.reuses   = 0           # cumulative: requests on keep-alive sockets
+    self.reset()
+
+  def reset(self):
+    """ reset values of the last request """
+    self.dns      = 0.0         # name-resolution (zero on cache-hit)
+    self.connect  = 0.0         # tcp-connect and tls-handshake
+    self.wait     = 0.0         # request until response-headers
+    self.transfer = 0.0         # response-body
+    self.reused   = False
+
+  def print(self):
+    for key,value in vars(self).items():
+      print(f"{key} = {value}")
+
+# --- socket-pool with DNS-cache   -------------------------------------------
+
+class DnsCache:
+  """ proxy for a socket-pool caching getaddrinfo() """
+
+  def __init__(self,pool,ttl,stats):
+    self._pool  = pool
+    self._ttl   = ttl
+    self._stats = stats
+    self._cache = {}            # (host,port) -> (expires,addrinfo)
+
+  def getaddrinfo(self,host,port,*args):
+    """ return cached addrinfo or query the pool """
+
+    now   = time.monotonic()
+    entry = self._cache.get((host,port))
+    if entry and now < entry[0]:
+      return entry[1]
+    info = self._pool.getaddrinfo(host,port,*args)
+    self._stats.dns += time.monotonic()-now
+    self._cache[(host,port)] = (now+self._ttl,info)
+    return info
+
+  def socket(self,*args,**kwargs):
+    """ return socket of the pool with timing of connect() """
+    return _TimedSocket(self._pool.socket(*args,**kwargs),self._stats)
+
+  def address(self,host,port):
+    """ return cached ip-address of host (or host if not cached) """
+
+    entry = self._cache.get((host,port))
+    return entry[1][0][-1][0] if entry else host
+
+  def flush(self):
+    """ clear cache """
+    self._cache = {}
+
+  def __getattr__(self,name):
+    return getattr(self._pool,name)
+
+# --- socket with timing of connect()   --------------------------------------
+
+class _TimedSocket:
+  """ proxy for a socket """
+
+  def __init__(self,sock,stats):
+    self._sock  = sock
+    self._stats = stats
+
+  def connect(self,address):
+    """ connect and update timings (no connect: keep-alive socket) """
+    start = time.monotonic()
+    self._sock.connect(address)
+    self._stats.connect += time.monotonic() - start
+    self._stats.reused   = False
+
+  def __getattr__(self,name):
+    return getattr(self._sock,name)
+
+# --- TLS-socket connecting to the cached address   --------------------------
+
+class _TlsSocket(_TimedSocket):
+  """ proxy for a TLS-socket """
+
+  def __init__(self,sock,dns):
+    super().__init__(sock,dns._stats)
+    self._dns = dns
+
+  def connect(self,address):
+    host,port = address
+    super().connect((self._dns.address(host,port),port))
+
+class _TlsContext:
+  """ proxy for an SSL-context """
+
+  def __init__(self,context,dns):
+    self._context = context
+    self._dns     = dns
+
+  def wrap_socket(self,sock,server_hostname=None):
+    if isinstance(sock,_TimedSocket):
+      sock = sock._sock                 # the SSL-context needs the socket
+    return _TlsSocket(
+      self._context.wrap_socket(sock,server_hostname=server_hostname),
+      self._dns)
+
+  def __getattr__(self,name):
+    return getattr(self._context,name)
+
+# --- session-manager   ------------------------------------------------------
+
+class SessionManager:
+  """ long-lived requests-session """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,pool,ssl_context,dns_ttl=3600,debug=False):
+    """ constructor """
+
+    self._debug  = debug
+    self.stats   = ConnectionStats()
+    self._pool   = DnsCache(pool,dns_ttl,self.stats)
+    self._session = adafruit_requests.Session(
+      self._pool,_TlsContext(ssl_context,self._pool))
+    self._start  = None
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- execute get-request   ------------------------------------------------
+
+  def get(self,url,timeout=None):
+    """ execute get-request, return response (caller must call done()) """
+
+    stats = self.stats
+    stats.reset()
+    stats.reused    = True              # until a socket connects
+    stats.requests += 1
+    start = time.monotonic()
+    response = self._session.get(url,timeout=timeout)
+    self._start = time.monotonic()
+    stats.wait  = self._start - start - stats.dns - stats.connect
+    if stats.reused:
+      stats.reuses += 1
+    return response
+
+  # --- request finished   ---------------------------------------------------
+
+  def done(self):
+    """ record transfer-time after the response was read and closed """
+
+    stats = self.stats
+    stats.transfer = time.monotonic() - self._start
+    self.msg(f"http: dns {stats.dns:f}s, connect {stats.connect:f}s " +
+             f"(reused: {stats.reused}), wait {stats.wait:f}s, " +
+             f"transfer {stats.transfer:f}s")
+
+  # --- close sockets   ------------------------------------------------------
+
+  def close_all(self):
+    """ close all sockets (e.g. after the radio was down) """
+    adafruit_connection_manager.connection_manager_close_all(self._pool)
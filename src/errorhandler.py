@@ -3,6 +3,11 @@
 #
 # This class implements a simple error handler
 #
+# The error screen (UI_SETTINGS.NO_NETWORK, or UI_SETTINGS.ERROR_TEXT if
+# the image is missing) is prebuilt at startup (Application calls
+# get_content()), so showing it needs no allocations after a failure,
+# e.g. a MemoryError. The image stays open with a single file handle.
+#
 # Author: Bernhard Bablok
 # License: GPL3
 #
@@ -10,7 +15,6 @@
 #
 # -------------------------------------------------------------------------
 
-import time
 import traceback
 import displayio
 from vectorio import Rectangle
@@ -23,11 +27,17 @@ class ErrorHandler:
 
   def __init__(self):
     """ constructor: create ressources """
+    self._display = None
+    self._content = None
+    self._file    = None
+    self._ex      = None
 
   # --- set display   --------------------------------------------------------
 
   def set_display(self,display):
     """ set display """
+    if display is not self._display:
+      self._content = None
     self._display = display
 
   # --- exception-handler   ------------------------------------------------
@@ -35,14 +45,12 @@ class ErrorHandler:
   def on_exception(self,ex):
     """ save exception for later processing """
     self._ex = ex
-    traceback.print_exc()
-
-  # --- provide content   --------------------------------------------------
+    traceback.print_exception(ex)
 
-  def get_content(self):
-    """ provide content in relation to exeception """
+  # --- create error-screen   ------------------------------------------------
 
-    # TODO: implement...
+  def _create_content(self):
+    """ create error-screen """
 
     g = displayio.Group()
     background = Rectangle(pixel_shader=UI_PALETTE,x=0,y=0,
@@ -51,10 +59,40 @@ class ErrorHandler:
                            color_index=COLORS.WHITE)
     g.append(background)
 
-    f = open(UI_SETTINGS.NO_NETWORK, "rb")
-    pic = displayio.OnDiskBitmap(f)
+    try:
+      if not self._file:
+        self._file = open(UI_SETTINGS.NO_NETWORK, "rb")
+      pic = displayio.OnDiskBitmap(self._file)
+    except (OSError,ValueError):
+      # no (valid) image: show text instead
+      g.append(self._get_text())
+      return g
     x = int((self._display.width-pic.width)/2)
     y = int((self._display.height-pic.height)/2)
     t = displayio.TileGrid(pic, x=x,y=y, pixel_shader=UI_PALETTE)
     g.append(t)
     return g
+
+  # --- text instead of image   ----------------------------------------------
+
+  def _get_text(self):
+    """ create centered label with UI_SETTINGS.ERROR_TEXT (DATE_FONT) """
+
+    import font_cache
+    from adafruit_display_text import label
+    text = getattr(UI_SETTINGS,"ERROR_TEXT","No connection")
+    font = font_cache.get_font(UI_SETTINGS.DATE_FONT,text)
+    return label.Label(font,text=text,
+                       color=UI_PALETTE[COLORS.BLACK],
+                       anchor_point=(0.5,0.5),
+                       anchored_position=(self._display.width//2,
+                                          self._display.height//2))
+
+  # --- provide content   --------------------------------------------------
+
+  def get_content(self):
+    """ provide error-screen (created once) """
+
+    if self._content is None:
+      self._content = self._create_content()
+    return self._content
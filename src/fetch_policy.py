@@ -0,0 +1,156 @@
+# ----------------------------------------------------------------------------
+# fetch_policy.py: deadline-bounded retries with exponential backoff
+#
+# A fetch is a callable that is retried until it succeeds, a
+# non-retryable error occurs, the number of attempts is exhausted or the
+# total deadline would be exceeded. Between attempts the policy waits
+# with jittered exponential backoff. Timing statistics of the last run
+# and cumulative counters help to tune the radio-on time per cycle.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# ----------------------------------------------------------------------------
+
+import time
+import random
+
+# --- HTTP-errors   ----------------------------------------------------------
+
+class HTTPError(OSError):
+  """ error for HTTP status-codes >= 400 """
+
+  def __init__(self,status,reason=""):
+    if not isinstance(reason,str):
+      reason = str(reason,"utf-8")      # adafruit_requests: bytearray
+    super().__init__(f"HTTP {status} {reason}")
+    self.status = status
+
+  @property
+  def retryable(self):
+    """ only timeouts, rate-limits and server-errors are worth a retry """
+    return self.status in [408,429] or self.status >= 500
+
+# --- statistics   -----------------------------------------------------------
+
+class FetchStats:
+  """ statistics of a single run and cumulative counters """
+
+  def __init__(self):
+    self.runs      = 0          # cumulative
+    self.failures  = 0          # cumulative (runs that raised)
+    self.retries   = 0          # cumulative
+    self.reset()
+
+  def reset(self):
+    """ reset values of the last run """
+    self.attempts   = 0
+    self.duration   = 0.0       # total time of last run including backoff
+    self.backoff    = 0.0       # time spent waiting
+    self.last_error = None
+
+  def print(self):
+    for key,value in vars(self).items():
+      print(f"{key} = {value}")
+
+# --- policy   ---------------------------------------------------------------
+
+class FetchPolicy:
+  """ retry-policy for fetches """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,deadline=60,connect_timeout=10,read_timeout=15,
+               max_attempts=3,backoff=1.0,max_backoff=16.0,jitter=0.5,
+               debug=False):
+    """ constructor. All times are in seconds """
+
+    self._debug          = debug
+    self.deadline        = deadline
+    self.connect_timeout = connect_timeout   # connect of the radio
+    self.read_timeout    = read_timeout
+    self.max_attempts    = max_attempts
+    self.backoff         = backoff
+    self.max_backoff     = max_backoff
+    self.jitter          = jitter
+    self.stats           = FetchStats()
+    self._start          = None
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- classify errors   ----------------------------------------------------
+
+  def is_retryable(self,ex):
+    """ check if an error is worth another attempt """
+
+    if isinstance(ex,HTTPError):
+      return ex.retryable
+    # transport-errors only (EOFError: truncated response). Other errors
+    # (e.g. KeyError, TypeError, ValueError from parsing) are bugs
+    return (isinstance(ex,(OSError,TimeoutError,EOFError)) or
+            type(ex).__name__ == "OutOfRetries")      # adafruit_requests
+
+  # --- remaining time   -----------------------------------------------------
+
+  def remaining(self):
+    """ remaining time until the deadline of the current run """
+
+    if self._start is None:
+      return self.deadline
+    return self.deadline - (time.monotonic()-self._start)
+
+  # --- timeout for the next socket-operation   ------------------------------
+
+  @property
+  def timeout(self):
+    """ read-timeout, bounded by the remaining time """
+    return max(0.1,min(self.read_timeout,self.remaining()))
+
+  # --- backoff-delay   ------------------------------------------------------
+
+  def _delay(self,attempt):
+    """ jittered exponential backoff for the given (failed) attempt """
+
+    delay = min(self.max_backoff,self.backoff*(2**(attempt-1)))
+    return delay*(1-self.jitter) + delay*self.jitter*random.random()
+
+  # --- run fetch   ----------------------------------------------------------
+
+  def run(self,fetch):
+    """ execute fetch() with retries. Returns the result of fetch() """
+
+    stats = self.stats
+    stats.reset()
+    stats.runs += 1
+    self._start = time.monotonic()
+    try:
+      while True:
+        stats.attempts += 1
+        try:
+          return fetch()
+        except Exception as ex:
+          stats.last_error = ex
+          self.msg(f"fetch: attempt {stats.attempts} failed: {ex}")
+          if (not self.is_retryable(ex) or
+              stats.attempts >= self.max_attempts):
+            stats.failures += 1
+            raise
+          delay = self._delay(stats.attempts)
+          if delay >= self.remaining():
+            self.msg("fetch: deadline exceeded")
+            stats.failures += 1
+            raise
+          stats.retries += 1
+          stats.backoff += delay
+          time.sleep(delay)
+    finally:
+      stats.duration = time.monotonic() - self._start
+      self._start = None
+      self.msg(f"fetch: {stats.attempts} attempt(s), {stats.duration:f}s")
@@ -0,0 +1,70 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Process-wide font registry.
+#
+# Every font is loaded once. Callers pass the characters they can
+# display, and these glyphs are preloaded in a single pass over the font
+# file instead of being parsed one by one on first use. Under memory
+# pressure the glyphs can be dropped: they are reloaded lazily.
+#
+# If a packed font (*.pft, see tools/compile_fonts.py) exists next to a
+# BDF-font, the packed font is used and the BDF-font only serves as a
+# fallback for missing glyphs.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import gc
+import os
+
+DIGITS = "0123456789"
+
+_fonts = {}          # path -> font
+
+# --- load font   ------------------------------------------------------------
+
+def _load_font(path):
+  """ load packed font if available, else BDF-font """
+
+  if path.endswith(".pft"):
+    packed,fallback = path,None
+  else:
+    packed,fallback = path[:path.rfind(".")]+".pft",path
+  try:
+    os.stat(packed)
+    from packed_font import PackedFont
+    return PackedFont(packed,fallback=fallback)
+  except OSError:
+    pass
+  from adafruit_bitmap_font import bitmap_font
+  return bitmap_font.load_font(path)
+
+# --- return font   ----------------------------------------------------------
+
+def get_font(path,glyphs=None):
+  """ return font (loaded once), preload the given characters """
+
+  font = _fonts.get(path)
+  if not font:
+    font = _load_font(path)
+    _fonts[path] = font
+  if glyphs:
+    font.load_glyphs(glyphs)
+  return font
+
+# --- drop glyphs   ----------------------------------------------------------
+
+def drop_glyphs(path=None):
+  """ drop loaded glyphs of one or all fonts (only packed fonts support
+      this, BDF-fonts keep their glyphs) """
+
+  for name,font in _fonts.items():
+    if path is None or name == path:
+      if hasattr(font,"drop"):
+        font.drop()
+  gc.collect()
@@ -0,0 +1,188 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Compact store for hourly forecast data.
+#
+# Every hourly variable is kept in a typed array with a fixed layout.
+# Floats are stored as scaled integers. The raw buffers can be written
+# to and read from any stream (file, sleep-memory) without conversion.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import struct
+from array import array
+
+import iso_time
+
+# --- typed series   ---------------------------------------------------------
+
+class Series:
+  """ hourly series, indexed by hour since midnight of the first day """
+
+  def __init__(self,typecode,scale,n,offset):
+    """ constructor """
+    self.itemsize = struct.calcsize(typecode)
+    self.values  = array(typecode,bytearray(n*self.itemsize))
+    self._scale  = scale
+    self._offset = offset
+
+  def put(self,i,value):
+    """ set value for raw index i (counted from the first hour) """
+    if value is None:
+      value = 0
+    if self._scale == 1:
+      self.values[i] = int(value)
+    else:
+      self.values[i] = int(round(value*self._scale))
+
+  def __getitem__(self,i):
+    if i < self._offset:
+      # before the first hour: don't wrap around to the end
+      raise IndexError("hour before start of series")
+    value = self.values[i-self._offset]
+    if self._scale == 1:
+      return value
+    return value/self._scale
+
+  def __len__(self):
+    return len(self.values)
+
+# --- forecast store   -------------------------------------------------------
+
+class ForecastStore:
+  """ compact store for hourly data """
+
+  # variable, typecode, scale. The order defines the binary layout
+  LAYOUT = [
+    ("is_day",         "b",  1),
+    ("weathercode",    "B",  1),
+    ("temperature_2m", "h", 10),
+    ("precipitation",  "h", 10)
+    ]
+
+  # header: version, year, month, day, hour, n, mask
+  HEADER = "<BHBBBHB"
+  VERSION = 1
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,variables,n):
+    """ constructor: variables is a list of Open-Meteo hourly variables """
+
+    self.start   = None      # (year,month,day,hour) of the first value
+    self._n      = n
+    self._mask   = 0
+    self._series = {}
+    for bit,(var,_,_) in enumerate(ForecastStore.LAYOUT):
+      if var in variables:
+        self._mask |= 1 << bit
+
+  # --- create series (offset is only known after first timestamp)   --------
+
+  def _create_series(self,hour):
+    """ allocate arrays """
+
+    for bit,(var,typecode,scale) in enumerate(ForecastStore.LAYOUT):
+      if self._mask & (1 << bit):
+        self._series[var] = Series(typecode,scale,self._n,hour)
+
+  # --- set start-time   ----------------------------------------------------
+
+  def set_start(self,tm):
+    """ set start-time from first timestamp of hourly data """
+
+    if not isinstance(tm,tuple):
+      tm = iso_time.parse(tm)
+    self.start = tm[:4]
+    self._create_series(self.start[3])
+
+  # --- date of given hour   -------------------------------------------------
+
+  def date(self,i):
+    """ return (y,m,d) for hour i (counted from midnight of the first day) """
+
+    y,m,d,_ = self.start
+    return iso_time.add_days(y,m,d,i//24)
+
+  # --- store value   -------------------------------------------------------
+
+  def put(self,var,i,value):
+    """ store value of variable at raw index i (counted from first hour) """
+
+    if var == "time":
+      if i == 0:
+        self.set_start(value)
+    elif var in self._series and i < self._n:
+      self._series[var].put(i,value)
+
+  # --- fill from hourly-dict of Open-Meteo   -------------------------------
+
+  def fill(self,hourly):
+    """ fill store from (complete) hourly data """
+
+    self.set_start(hourly["time"][0])
+    for var,series in self._series.items():
+      values = hourly.get(var,None)
+      if values:
+        for i in range(min(self._n,len(values))):
+          series.put(i,values[i])
+
+  # --- dict-like access   --------------------------------------------------
+
+  def __getitem__(self,var):
+    return self._series[var]
+
+  def __contains__(self,var):
+    return var in self._series
+
+  def get(self,var,default=None):
+    return self[var] if var in self else default
+
+  # --- size of binary representation   ------------------------------------
+
+  @property
+  def size(self):
+    """ size of binary representation in bytes """
+    size = struct.calcsize(ForecastStore.HEADER)
+    for series in self._series.values():
+      size += len(series)*series.itemsize
+    return size
+
+  # --- write raw buffers   -------------------------------------------------
+
+  def save(self,stream):
+    """ write store to stream (file, BytesIO) """
+
+    y,m,d,h = self.start
+    stream.write(struct.pack(ForecastStore.HEADER,ForecastStore.VERSION,
+                             y,m,d,h,self._n,self._mask))
+    for var,_,_ in ForecastStore.LAYOUT:
+      if var in self._series:
+        stream.write(self._series[var].values)
+
+  # --- read raw buffers   --------------------------------------------------
+
+  @classmethod
+  def load(cls,stream):
+    """ create store from stream. Returns None for invalid data """
+
+    header = stream.read(struct.calcsize(ForecastStore.HEADER))
+    if len(header) < struct.calcsize(ForecastStore.HEADER):
+      return None
+    version,y,m,d,h,n,mask = struct.unpack(ForecastStore.HEADER,header)
+    if version != ForecastStore.VERSION:
+      return None
+
+    store = cls([var for bit,(var,_,_) in enumerate(ForecastStore.LAYOUT)
+                 if mask & (1 << bit)],n)
+    store.start = (y,m,d,h)
+    store._create_series(h)
+    for var,_,_ in ForecastStore.LAYOUT:
+      if var in store._series:
+        stream.readinto(store._series[var].values)
+    return store
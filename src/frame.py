@@ -16,28 +16,69 @@ import displayio
 from vectorio import Rectangle
 from adafruit_display_text import label
 from adafruit_display_shapes.line import Line
-from adafruit_bitmap_font import bitmap_font
 
+import font_cache
+from font_cache import DIGITS
+from layout import Layout
 from ui_settings import UI_SETTINGS, COLORS, UI_COLOR_MAP, UI_PALETTE
 
 # --- Frame Class for layout   ----------------------------------------------
 
 class Frame:
 
+  # layout of header and footer (see layout.py)
+  LAYOUT = [
+    # header: box with day-number (sized for two digits) on the right,
+    # month on the left
+    ("day_bb",        "bbox(DAY_FONT,'88',tight=True)"),
+    ("day_pos",       "(MARGIN,MARGIN)"),
+    ("day_w",         "day_bb[2]+2*MARGIN"),
+    ("h_header",      "day_bb[3]+2*MARGIN"),
+    ("header_sep",    "(0,h_header,W,h_header)"),
+    ("date_pos",      "(5*MARGIN,h_header-2*MARGIN)"),
+    # footer: status on the left, battery-level on the right
+    ("status_bb",     "bbox(SMALL_FONT,FOOTER+': 00:00',base=True)"),
+    ("level_bb",      "bbox(SMALL_FONT,'0.0V',base=True)"),
+    ("h_footer",      "max(status_bb[3],level_bb[3])+2*MARGIN"),
+    ("status_anchor", "(0,level_bb[3]/status_bb[3])"),
+    ("status_pos",    "(MARGIN,H-MARGIN)"),
+    ("level_pos",     "(W-MARGIN,H-MARGIN)"),
+    ("footer_sep",    "(0,H-h_footer,W,H-h_footer)")
+    ]
+
   # --- constructor   --------------------------------------------------------
 
-  def __init__(self,display,data):
-    """ constructor: create ressources """
+  def __init__(self,display,data,layout=None):
+    """ constructor: layout are the solved rules (at least Frame.LAYOUT) """
 
     self._display     = display
     self._data        = data
-    self._small_font  = bitmap_font.load_font(UI_SETTINGS.SMALL_FONT)
+    if layout is None:
+      layout = Layout(Frame.LAYOUT).solve(display.width,display.height)
+    self._layout      = layout
+    glyphs            = Frame.glyphs()
+    self._small_font  = font_cache.get_font(UI_SETTINGS.SMALL_FONT,
+                                            glyphs[UI_SETTINGS.SMALL_FONT])
     self._margin      = UI_SETTINGS.MARGIN
+    self.dirty        = []          # changed regions: (x0,y0,x1,y1)
+
+  # --- characters used by header and footer   ------------------------------
+
+  @staticmethod
+  def glyphs():
+    """ return characters per font that header and footer can display """
+
+    return {
+      UI_SETTINGS.SMALL_FONT: DIGITS+":-. V"+UI_SETTINGS.FOOTER+
+                              UI_SETTINGS.STALE,
+      UI_SETTINGS.DAY_FONT:   DIGITS,
+      UI_SETTINGS.DATE_FONT:  "".join(UI_SETTINGS.UI_MONTHS)
+      }
 
   # --- create root-group   --------------------------------------------------
 
   def create_group(self):
-    """ create root-group """
+    """ create root-group with background, header and footer """
 
     g = displayio.Group()
     background = Rectangle(pixel_shader=UI_PALETTE,x=0,y=0,
@@ -45,81 +86,146 @@ class Frame:
                            height=self._display.height,
                            color_index=UI_SETTINGS.BACKGROUND)
     g.append(background)
+    header,self.h_header = self.get_header()
+    g.append(header)
+    footer,self.h_footer = self.get_footer()
+    g.append(footer)
     return g
 
+  # --- bounds of label   ---------------------------------------------------
+
+  @staticmethod
+  def bounds(lbl,ox=0,oy=0):
+    """ return region (x0,y0,x1,y1) of label, ox,oy is the parent-offset """
+
+    x,y,w,h = lbl.bounding_box
+    x0 = ox + lbl.x + x
+    y0 = oy + lbl.y + y
+    return (x0,y0,x0+w,y0+h)
+
+  # --- set text of label if changed   ---------------------------------------
+
+  @staticmethod
+  def set_text(lbl,text,dirty=None,ox=0,oy=0):
+    """ update text of label, return True if it changed.
+        Old and new region are appended to dirty (if not None) """
+
+    if lbl.text == text:
+      return False
+    if dirty is not None:
+      dirty.append(Frame.bounds(lbl,ox,oy))
+    lbl.text = text
+    if dirty is not None:
+      dirty.append(Frame.bounds(lbl,ox,oy))
+    return True
+
   # --- create box with day-number   -----------------------------------------
 
   def _get_day_box(self):
     """ create box with day-number """
 
+    L = self._layout
     day_box = displayio.Group()
-    day_font = bitmap_font.load_font(UI_SETTINGS.DAY_FONT)
-    day = label.Label(day_font,text=self._data["day"],
-                      color=UI_PALETTE[UI_SETTINGS.BACKGROUND],
-                      background_tight=True,
-                      anchor_point=(0,0),
-                      anchored_position=(self._margin,self._margin))
-    background = Rectangle(pixel_shader=UI_PALETTE,x=0,y=0,
-                           width=day.bounding_box[2]+2*self._margin,
-                           height=day.bounding_box[3]+2*self._margin,
-                           color_index=UI_SETTINGS.FOREGROUND)
-    day_box.append(background)
-    day_box.append(day)
-    return (day_box,background.width,background.height)
+    day_font = font_cache.get_font(UI_SETTINGS.DAY_FONT,
+                                   Frame.glyphs()[UI_SETTINGS.DAY_FONT])
+    self._day = label.Label(day_font,text="",
+                            color=UI_PALETTE[UI_SETTINGS.BACKGROUND],
+                            background_tight=True,
+                            anchor_point=(0,0),
+                            anchored_position=L["day_pos"])
+    self._day_bg = Rectangle(pixel_shader=UI_PALETTE,x=0,y=0,
+                             width=L["day_w"],height=L["h_header"],
+                             color_index=UI_SETTINGS.FOREGROUND)
+    day_box.append(self._day_bg)
+    day_box.append(self._day)
+    return day_box
 
   # --- create header   ------------------------------------------------------
 
   def get_header(self):
     """ create complete header """
 
+    L = self._layout
     header = displayio.Group()
-    
-    day_box,w,h = self._get_day_box()
-    day_box.x = self._display.width-w
-    day_box.y = 0
-    header.append(day_box)
-
-    sep = Line(0,h,self._display.width,h,color=UI_PALETTE[UI_SETTINGS.FOREGROUND])
-    header.append(sep)
-
-    date_font   = bitmap_font.load_font(UI_SETTINGS.DATE_FONT)
-    date = label.Label(date_font,text=self._data["date"],
-                      color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                      background_tight=True,
-                      anchor_point=(0,1),
-                       anchored_position=(5*self._margin,h-2*self._margin))
-    header.append(date)
-    return (header,h)
+
+    self._day_box   = self._get_day_box()
+    self._day_box.x = self._display.width-L["day_w"]
+    self._day_box.y = 0
+    header.append(self._day_box)
+
+    header.append(Line(*L["header_sep"],
+                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND]))
+
+    date_font   = font_cache.get_font(UI_SETTINGS.DATE_FONT,
+                                      Frame.glyphs()[UI_SETTINGS.DATE_FONT])
+    self._date = label.Label(date_font,text="",
+                             color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
+                             background_tight=True,
+                             anchor_point=(0,1),
+                             anchored_position=L["date_pos"])
+    header.append(self._date)
+    return (header,L["h_header"])
 
   # --- create footer   ------------------------------------------------------
 
   def get_footer(self):
     """ create complete footer """
 
+    L = self._layout
     footer = displayio.Group()
-    status = label.Label(self._small_font,
-                         text=f"{UI_SETTINGS.FOOTER}: {self._data['now']}",
+    self._status = label.Label(self._small_font,text="",
                          color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
                          base_alignment=True,
-                         anchor_point=(0,1),
-                         anchored_position=(self._margin,
-                                            self._display.height-self._margin))
+                         anchor_point=L["status_anchor"],
+                         anchored_position=L["status_pos"])
 
-    level = label.Label(self._small_font,
-                        text=f"{self._data['bat_level']:0.1f}V",
+    self._level = label.Label(self._small_font,text="",
                         color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
                         base_alignment=True,
                         anchor_point=(1,1),
-                        anchored_position=(self._display.width-self._margin,
-                                            self._display.height-self._margin))
-
-    h = max(status.bounding_box[3],level.bounding_box[3]) + 2*self._margin
-    status.anchor_point = (0,level.bounding_box[3]/status.bounding_box[3])
-    sep = Line(0,self._display.height-h,
-               self._display.width,self._display.height-h,
-               color=UI_PALETTE[UI_SETTINGS.FOREGROUND])
-
-    footer.append(status)
-    footer.append(level)
-    footer.append(sep)
-    return (footer,h)
+                        anchored_position=L["level_pos"])
+
+    footer.append(self._status)
+    footer.append(self._level)
+    footer.append(Line(*L["footer_sep"],
+                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND]))
+    return (footer,L["h_footer"])
+
+  # --- stale-data banner   -------------------------------------------------
+
+  def _set_banner(self,on):
+    """ show status inverted (banner) if the data is stale """
+
+    if on:
+      self._status.color            = UI_PALETTE[UI_SETTINGS.BACKGROUND]
+      self._status.background_color = UI_PALETTE[UI_SETTINGS.FOREGROUND]
+    else:
+      self._status.color            = UI_PALETTE[UI_SETTINGS.FOREGROUND]
+      self._status.background_color = None
+
+  # --- update header and footer   -------------------------------------------
+
+  @staticmethod
+  def get_texts(data):
+    """ return texts of header and footer: day, date, status, level """
+
+    if data.get("stale",False):
+      status = f"{UI_SETTINGS.STALE}: {data['now']}"
+    else:
+      status = f"{UI_SETTINGS.FOOTER}: {data['now']}"
+    return [data["day"],data["date"],status,f"{data['bat_level']:0.1f}V"]
+
+  def update(self):
+    """ update texts of header and footer from data """
+
+    day,date,status,level = Frame.get_texts(self._data)
+    x = self._day_box.x
+    if Frame.set_text(self._day,day):
+      self._day_bg.width = self._day.bounding_box[2]+2*self._margin
+      self._day_box.x    = self._display.width-self._day_bg.width
+      self.dirty.append((min(x,self._day_box.x),0,
+                         self._display.width,self._day_bg.height))
+    Frame.set_text(self._date,date,self.dirty)
+    if Frame.set_text(self._status,status,self.dirty):
+      self._set_banner(self._data.get("stale",False))
+    Frame.set_text(self._level,level,self.dirty)
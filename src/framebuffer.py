@@ -0,0 +1,325 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Headless framebuffer for CPython (needs NumPy).
+#
+# Framebuffer composites a displayio group-tree (Group, TileGrid with
+# Bitmap or OnDiskBitmap, vectorio.Rectangle) into a NumPy-array of
+# indices of the target palette (UI_PALETTE). Bitmaps are converted and
+# quantised with array-operations instead of per-pixel calls.
+#
+# FramebufferDisplay is a stand-in for a displayio-display without a
+# window: refresh() renders the root-group, optionally exports every
+# frame (PNG, BMP or packed 4bpp) and records the render-time.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import time
+import struct
+import zlib
+import numpy as np
+import displayio
+import vectorio
+
+from ui_settings import UI_PALETTE
+
+# --- palette helpers   ------------------------------------------------------
+
+def _rgb(shader,index):
+  """ return rgb888 of palette-entry (blinka stores dicts or ints) """
+  color = shader[index]
+  if isinstance(color,dict):
+    color = color["rgb888"]
+  return color
+
+# --- compositor   -----------------------------------------------------------
+
+class Framebuffer:
+  """ composite a displayio group-tree into a palette-indexed array """
+
+  def __init__(self,width,height,palette=UI_PALETTE):
+    self.width  = width
+    self.height = height
+    self.colors = [_rgb(palette,i) for i in range(len(palette))]
+    self._rgb   = np.array([((c>>16),(c>>8) & 0xFF,c & 0xFF)
+                            for c in self.colors],dtype=np.int32)
+    self.fb     = np.zeros((height,width),dtype=np.uint8)
+    self._odb   = {}              # id -> (OnDiskBitmap,values)
+
+  # --- quantise rgb888-values   ---------------------------------------------
+
+  def _nearest(self,values):
+    """ map array of rgb888-values to indices of the nearest color """
+
+    values = np.asarray(values,dtype=np.int64)
+    rgb = np.stack(((values>>16) & 0xFF,(values>>8) & 0xFF,values & 0xFF),
+                   axis=-1)
+    d = ((rgb[...,None,:]-self._rgb)**2).sum(axis=-1)
+    return d.argmin(axis=-1).astype(np.int16)
+
+  def _lut(self,shader):
+    """ lookup-table palette-index -> target-index (-1: transparent) """
+
+    n   = len(shader)
+    lut = self._nearest([_rgb(shader,i) for i in range(n)])
+    for i in range(n):
+      if shader.is_transparent(i):
+        lut[i] = -1
+    return lut
+
+  # --- bitmap-values as array   ---------------------------------------------
+
+  def _bitmap(self,bitmap):
+    """ return values of a Bitmap as 2D-array """
+
+    w,h = bitmap.width,bitmap.height
+    bpv = getattr(bitmap,"_bits_per_value",32)
+    data = getattr(bitmap,"_data",None)
+    if bpv < 8 and data is not None:
+      # blinka: values packed msb-first into 32-bit words
+      words  = np.frombuffer(data,dtype=f"u{data.itemsize}").astype(
+                               np.uint32).reshape(h,-1)
+      shifts = np.arange(32-bpv,-1,-bpv,dtype=np.uint32)
+      values = (words[:,:,None] >> shifts) & ((1 << bpv)-1)
+      return values.reshape(h,-1)[:,:w]
+    # public API (slow)
+    return np.array([[bitmap[x,y] for x in range(w)] for y in range(h)])
+
+  def _read_bmp(self,odb):
+    """ read pixel-data of an OnDiskBitmap from the file (uses internals
+        of blinka), return None if not possible """
+
+    try:
+      w,h,bpp = odb.width,odb.height,odb._bits_per_pixel
+      if bpp not in (1,4,8):
+        return None
+      odb._file.seek(odb._data_offset)
+      stride = odb._stride
+      data   = odb._file.read(stride*h)
+    except AttributeError:
+      return None
+    data = np.frombuffer(data,dtype=np.uint8).reshape(h,stride)[::-1]
+    if bpp == 1:
+      values = np.unpackbits(data,axis=1)
+    elif bpp == 4:
+      values = np.stack((data >> 4,data & 0x0F),axis=-1).reshape(h,-1)
+    else:
+      values = data
+    return values[:,:w]
+
+  def _ondiskbitmap(self,odb):
+    """ return values of an OnDiskBitmap as 2D-array (cached) """
+
+    entry = self._odb.get(id(odb))
+    if entry and entry[0] is odb:
+      return entry[1]
+    values = self._read_bmp(odb)
+    if values is None:
+      # per pixel (blinka has no public item-access)
+      values = np.array([[odb._get_pixel(x,y) for x in range(odb.width)]
+                         for y in range(odb.height)])
+    self._odb[id(odb)] = (odb,values)
+    return values
+
+  # --- draw helpers   -------------------------------------------------------
+
+  def _blit(self,idx,x,y,scale,clip):
+    """ copy target-indices (-1: transparent) to (x,y) """
+
+    if scale > 1:
+      idx = idx.repeat(scale,axis=0).repeat(scale,axis=1)
+    h,w = idx.shape
+    x0,y0 = max(x,clip[0]),max(y,clip[1])
+    x1,y1 = min(x+w,clip[2]),min(y+h,clip[3])
+    if x1 <= x0 or y1 <= y0:
+      return
+    src  = idx[y0-y:y1-y,x0-x:x1-x]
+    mask = src >= 0
+    self.fb[y0:y1,x0:x1][mask] = src[mask]
+
+  def _tilegrid(self,tg,ox,oy,scale,clip):
+    """ draw TileGrid """
+
+    bitmap = tg.bitmap
+    if isinstance(bitmap,displayio.OnDiskBitmap):
+      values = self._ondiskbitmap(bitmap)
+    else:
+      values = self._bitmap(bitmap)
+    shader = tg.pixel_shader
+    if isinstance(shader,displayio.Palette):
+      idx = self._lut(shader)[values]
+    else:
+      idx = self._nearest(values)      # ColorConverter: values are rgb888
+
+    tw,th = tg.tile_width,tg.tile_height
+    tpr   = max(1,bitmap.width // tw)
+    x0    = ox + tg.x*scale
+    y0    = oy + tg.y*scale
+    for row in range(tg.height):
+      for col in range(tg.width):
+        tile = tg[col,row]
+        sx,sy = (tile % tpr)*tw,(tile // tpr)*th
+        self._blit(idx[sy:sy+th,sx:sx+tw],
+                   x0+col*tw*scale,y0+row*th*scale,scale,clip)
+
+  def _rectangle(self,rect,ox,oy,scale,clip):
+    """ draw vectorio.Rectangle """
+
+    shader = rect.pixel_shader
+    if shader.is_transparent(rect.color_index):
+      return
+    color = self._nearest(_rgb(shader,rect.color_index))
+    x0 = max(clip[0],ox + rect.x*scale)
+    y0 = max(clip[1],oy + rect.y*scale)
+    x1 = min(clip[2],ox + (rect.x+rect.width)*scale)
+    y1 = min(clip[3],oy + (rect.y+rect.height)*scale)
+    if x1 > x0 and y1 > y0:
+      self.fb[y0:y1,x0:x1] = color
+
+  def _group(self,group,ox,oy,scale,clip):
+    """ draw group and children """
+
+    if group.hidden:
+      return
+    ox    += group.x*scale
+    oy    += group.y*scale
+    scale *= group.scale
+    for item in group:
+      if getattr(item,"hidden",False):
+        continue
+      if isinstance(item,displayio.Group):
+        self._group(item,ox,oy,scale,clip)
+      elif isinstance(item,displayio.TileGrid):
+        self._tilegrid(item,ox,oy,scale,clip)
+      elif isinstance(item,vectorio.Rectangle):
+        self._rectangle(item,ox,oy,scale,clip)
+
+  # --- render   -------------------------------------------------------------
+
+  def render(self,group,region=None):
+    """ render group (only region (x0,y0,x1,y1) if given), return fb """
+
+    if region:
+      clip = (max(0,region[0]),max(0,region[1]),
+              min(self.width,region[2]),min(self.height,region[3]))
+    else:
+      clip = (0,0,self.width,self.height)
+    self.fb[clip[1]:clip[3],clip[0]:clip[2]] = 0
+    if group is not None:
+      self._group(group,0,0,1,clip)
+    return self.fb
+
+# --- export   ---------------------------------------------------------------
+
+def pack4(fb):
+  """ pack framebuffer to 4bpp, high nibble first, rows padded to bytes """
+
+  if fb.shape[1] % 2:
+    fb = np.pad(fb,((0,0),(0,1)))
+  return ((fb[:,0::2] << 4) | fb[:,1::2]).astype(np.uint8)
+
+def to_raw(fb):
+  """ raw format: width, height, packed rows """
+  h,w = fb.shape
+  return struct.pack("<HH",w,h) + pack4(fb).tobytes()
+
+def to_bmp(fb,colors,bpp=4):
+  """ BMP with 1 or 4 bits per pixel (bottom-up rows, padded to 4 bytes) """
+
+  h,w     = fb.shape
+  if bpp == 1:
+    rows  = np.packbits(fb.astype(np.uint8),axis=1)
+  else:
+    rows  = pack4(fb)
+  stride  = (rows.shape[1] + 3) & ~3
+  rows    = np.pad(rows,((0,0),(0,stride-rows.shape[1])))[::-1]
+  n       = 1 << bpp
+  palette = b"".join([struct.pack("<BBBB",c & 0xFF,(c>>8) & 0xFF,c>>16,0)
+                      for c in colors] + [b"\0\0\0\0"]*(n-len(colors)))
+  offset  = 14 + 40 + len(palette)
+  return (struct.pack("<2sIHHI",b"BM",offset+stride*h,0,0,offset) +
+          struct.pack("<IiiHHIIiiII",40,w,h,1,bpp,0,stride*h,
+                      2835,2835,n,n) +
+          palette + rows.tobytes())
+
+def to_png(fb,colors):
+  """ palette-PNG (8 bit per pixel) """
+
+  def chunk(tag,data):
+    return (struct.pack(">I",len(data)) + tag + data +
+            struct.pack(">I",zlib.crc32(tag+data) & 0xFFFFFFFF))
+
+  h,w  = fb.shape
+  rows = np.hstack((np.zeros((h,1),dtype=np.uint8),fb))  # filter: none
+  return (b"\x89PNG\r\n\x1a\n" +
+          chunk(b"IHDR",struct.pack(">IIBBBBB",w,h,8,3,0,0,0)) +
+          chunk(b"PLTE",b"".join([struct.pack("BBB",c>>16,(c>>8) & 0xFF,
+                                              c & 0xFF) for c in colors])) +
+          chunk(b"IDAT",zlib.compress(rows.tobytes())) +
+          chunk(b"IEND",b""))
+
+def save(fb,colors,path):
+  """ save framebuffer, format depends on the extension of path """
+
+  if path.endswith(".png"):
+    data = to_png(fb,colors)
+  elif path.endswith(".bmp"):
+    data = to_bmp(fb,colors)
+  else:
+    data = to_raw(fb)
+  with open(path,"wb") as f:
+    f.write(data)
+
+# --- headless display   -----------------------------------------------------
+
+class FramebufferDisplay:
+  """ displayio-display stand-in rendering into a Framebuffer """
+
+  def __init__(self,width,height,palette=UI_PALETTE,export=None,
+               verbose=False):
+    """ constructor. export: path-pattern with {n} (frame-number) """
+
+    self.width       = width
+    self.height      = height
+    self.root_group  = None
+    self.framebuffer = Framebuffer(width,height,palette)
+    self.frames      = 0
+    self.render_time = 0.0          # last frame
+    self.total_time  = 0.0          # all frames
+    self._export     = export
+    self._verbose    = verbose
+
+  def _render(self,region):
+    """ render (region of) root-group, export frame """
+
+    start = time.monotonic()
+    fb = self.framebuffer.render(self.root_group,region)
+    self.render_time = time.monotonic() - start
+    self.total_time += self.render_time
+    self.frames     += 1
+    if self._verbose:
+      print(f"framebuffer: frame {self.frames} rendered in " +
+            f"{self.render_time:f}s (avg {self.total_time/self.frames:f}s)")
+    if self._export:
+      self.save(self._export.format(n=self.frames))
+    return fb
+
+  def refresh(self):
+    """ render complete root-group """
+    self._render(None)
+
+  def refresh_partial(self,region):
+    """ render only the region (x0,y0,x1,y1) """
+    self._render(region)
+
+  def save(self,path):
+    """ save current frame (png, bmp or raw packed 4bpp) """
+    if os.path.dirname(path):
+      os.makedirs(os.path.dirname(path),exist_ok=True)
+    save(self.framebuffer.fb,self.framebuffer.colors,path)
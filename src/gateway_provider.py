@@ -0,0 +1,216 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Thin client for the render gateway (tools/gateway.py).
+#
+# The gateway renders the complete screen. The data-provider downloads
+# the packed bitmap and the UI-provider just shows it, so the device
+# needs no JSON-parsing, no fonts and no layout.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import struct
+import displayio
+
+from settings import app_config
+from ui_settings import UI_PALETTE
+from response_cache import ResponseCache
+
+# preamble of gateway-response: magic, update, interval, format
+PREAMBLE = "<4sIHB"
+MAGIC    = b"EIW1"
+
+# --- helper class (value-holder)   ------------------------------------------
+
+class Values(object):
+  pass
+
+# --- data-provider: download bitmap   ---------------------------------------
+
+class GatewayDataProvider:
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,fields=None,debug=False):
+    """ constructor (fields are ignored: the gateway knows the layout) """
+
+    self._debug  = debug
+    self._wifi   = None
+    self._width  = 0
+    self._height = 0
+    self._bitmap = None
+    self._has_data = False
+
+    # download to flash (OnDiskBitmap) if possible, else into RAM
+    self._cache = None
+    path = getattr(app_config,"gateway_file","cache/screen.bmp")
+    if path:
+      self._cache = ResponseCache(path,debug=debug)
+      if not self._cache.enabled:
+        self._cache = None
+    self._path = path
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- set wifi-object   ----------------------------------------------------
+
+  def set_wifi(self,wifi):
+    """ set wifi-object """
+    self._wifi = wifi
+
+  # --- set display   --------------------------------------------------------
+
+  def set_display(self,display):
+    """ set display (the gateway needs the size) """
+    self._width  = display.width
+    self._height = display.height
+
+  # --- strip preamble from response   ---------------------------------------
+
+  def _payload(self,chunks):
+    """ parse preamble and yield the payload """
+
+    size = struct.calcsize(PREAMBLE)
+    buf  = b""
+    for chunk in chunks:
+      if buf is not None:
+        buf += chunk
+        if len(buf) < size:
+          continue
+        magic,update_ts,interval,_ = struct.unpack(PREAMBLE,buf[:size])
+        if magic != MAGIC:
+          raise ValueError("invalid response from gateway")
+        self._current = Values()
+        self._current.update_ts = update_ts
+        self._current.interval  = interval
+        chunk = buf[size:]
+        buf   = None
+      yield chunk
+
+  # --- read raw format into bitmap   ----------------------------------------
+
+  def _read_raw(self,chunks):
+    """ unpack 4bpp rows into a displayio.Bitmap. Every response starts
+        with the size of the bitmap (<HH) """
+
+    x = y = 0
+    buf = b""
+    for chunk in chunks:
+      if buf is not None:
+        buf += chunk
+        if len(buf) < 4:
+          continue
+        w,h = struct.unpack("<HH",buf[:4])
+        if (not self._bitmap or self._bitmap.width != w or
+            self._bitmap.height != h):
+          self._bitmap = displayio.Bitmap(w,h,len(UI_PALETTE))
+        chunk = buf[4:]
+        buf   = None
+      bitmap = self._bitmap
+      for b in chunk:
+        bitmap[x,y] = b >> 4
+        if x+1 < w:
+          bitmap[x+1,y] = b & 0x0F
+        x += 2
+        if x >= w:
+          x  = 0
+          y += 1
+
+  # --- fetch bitmap   -------------------------------------------------------
+
+  def _fetch(self,url):
+    """ fetch bitmap, return True if it changed """
+
+    chunks = self._payload(self._wifi.get_chunks(url))
+    if self._cache:
+      return self._cache.store(chunks) or not self._has_data
+    self._read_raw(chunks)
+    return True
+
+  # --- query bitmap   -------------------------------------------------------
+
+  def update_data(self,data):
+    """ callback for E-Ink-App: query screen from gateway """
+
+    fmt = "bmp" if self._cache else "raw"
+    url = "".join([
+      app_config.gateway_url,
+      f"?latitude={app_config.latitude}",
+      f"&longitude={app_config.longitude}",
+      f"&width={self._width}&height={self._height}",
+      f"&format={fmt}&bat={data.get('bat_level',0.0):0.2f}"
+      ])
+
+    # retries, timeouts and backoff are handled by the fetch-policy
+    changed = self._wifi.fetch(lambda: self._fetch(url))
+    if self._cache:
+      data["bitmap_file"] = self._path
+    else:
+      data["bitmap"] = self._bitmap
+
+    self._has_data    = True
+    data["unchanged"] = not changed
+    data["current"]   = self._current
+    self.msg(f"gateway: update {self._current.update_ts}, changed: {changed}")
+
+# --- UI-provider: show bitmap   ---------------------------------------------
+
+class GatewayUIProvider:
+
+  # model-fields used by this UI: none, the gateway renders everything
+  FIELDS = []
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,debug=False):
+    """ constructor """
+
+    self._debug = debug
+    self._group = None
+    self._file  = None
+
+  # --- update UI   ----------------------------------------------------------
+
+  def update_ui(self,new_data):
+    """ update data: callback for Application """
+
+    if len(self._group):
+      self._group.pop()
+    if self._file:
+      self._file.close()
+      self._file = None
+
+    if "bitmap_file" in new_data:
+      self._file = open(new_data["bitmap_file"],"rb")
+      bitmap = displayio.OnDiskBitmap(self._file)
+      shader = bitmap.pixel_shader
+    else:
+      bitmap = new_data["bitmap"]
+      shader = UI_PALETTE
+    self._group.append(displayio.TileGrid(bitmap,pixel_shader=shader))
+
+  # --- create complete content   --------------------------------------------
+
+  def create_ui(self,display):
+    """ create content """
+
+    if self._group is None:
+      self._group = displayio.Group()
+    return self._group
+
+  # --- handle exception   ---------------------------------------------------
+
+  def handle_exception(self,ex):
+    """ handle exception """
+    import traceback                      # only needed on errors
+    traceback.print_exception(ex)
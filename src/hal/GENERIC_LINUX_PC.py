@@ -14,18 +14,52 @@
 #   - Inky-Frame 5.7":      600x448
 #   - Badger2040W:          296x128
 
+import os
 import sys
 import time
 import board
 from hal.hal_base import HalBase
 
+class FileSleepMemory:
+  """ file-backed stand-in for alarm.sleep_memory """
+
+  def __init__(self,path,size=256):
+    self._path = path
+    try:
+      with open(path,"rb") as f:
+        self._buffer = bytearray(f.read(size))
+    except OSError:
+      self._buffer = bytearray()
+    self._buffer.extend(bytes(size-len(self._buffer)))
+
+  def __len__(self):
+    return len(self._buffer)
+
+  def __getitem__(self,index):
+    return self._buffer[index]
+
+  def __setitem__(self,index,value):
+    self._buffer[index] = value
+    with open(self._path,"wb") as f:
+      f.write(self._buffer)
+
 class HalPygame(HalBase):
   """ GENERIC_LINUX_PC specific HAL-class """
 
-  def show(self,content):
+  def show(self,content,dirty=None):
     """ show and refresh the display """
-    self._display.show(content)
+    region = self._use_partial(content,dirty)
+    if region and self.refresh_partial(region):
+      self._partials = getattr(self,"_partials",0) + 1
+      return
+    self._partials = 0
+    self._display.root_group = content
+    self._display.refresh()
+
+  def refresh_partial(self,region):
+    """ simulate partial refresh (the simulator only redraws dirty areas) """
     self._display.refresh()
+    return True
 
   def bat_level(self):
     """ return battery level """
@@ -46,7 +80,7 @@ class HalPygame(HalBase):
 
   def sleep(self,duration):
     if not self._display:
-      super.sleep(duration)
+      super().sleep(duration)
       return
 
     start = time.monotonic()
@@ -55,4 +89,16 @@ class HalPygame(HalBase):
         sys.exit(0)
       time.sleep(0.1)
 
+  def deep_sleep(self,duration):
+    """ simulate deep-sleep: wait, then restart the program """
+    self.sleep(duration)
+    os.execv(sys.executable,[sys.executable]+sys.argv)
+
+  def get_sleep_memory(self):
+    """ return file-backed sleep-memory """
+    if not hasattr(self,"_sleep_memory"):
+      self._sleep_memory = FileSleepMemory(
+        os.environ.get("SLEEP_MEMORY","sleep_memory.bin"))
+    return self._sleep_memory
+
 impl = HalPygame()
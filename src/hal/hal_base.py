@@ -106,10 +106,39 @@ class HalBase:
         self._display = self._display(self)
     return self._display
 
-  def show(self,content):
-    """ show and refresh the display """
+  def refresh_partial(self,region):
+    """ refresh region (x0,y0,x1,y1) of the display.
+        Returns False if the display does not support partial refresh """
+    if hasattr(self._display,"refresh_partial"):
+      self._display.refresh_partial(region)
+      return True
+    return False
+
+  def _use_partial(self,content,dirty):
+    """ ghosting-policy: check if a partial refresh is acceptable,
+        return the region to refresh or None """
+
+    if not dirty or self._display.root_group is not content:
+      return None
+    full_every = self._get_attrib('FULL_REFRESH_EVERY')
+    if full_every is None:
+      full_every = 10
+    max_area   = self._get_attrib('PARTIAL_MAX_AREA')
+    if max_area is None:
+      max_area = 0.5
+    if getattr(self,"_partials",0) >= full_every:
+      return None
+    x0 = max(0,min([r[0] for r in dirty]))
+    y0 = max(0,min([r[1] for r in dirty]))
+    x1 = min(self._display.width,max([r[2] for r in dirty]))
+    y1 = min(self._display.height,max([r[3] for r in dirty]))
+    if ((x1-x0)*(y1-y0) >
+        max_area*self._display.width*self._display.height):
+      return None
+    return (x0,y0,x1,y1)
 
-    self._display.root_group = content
+  def _refresh(self,refresh):
+    """ wait until the display is ready and refresh (retry while busy) """
 
     if hasattr(self._display,"time_to_refresh"):
       if self._display.time_to_refresh > 0.0:
@@ -119,7 +148,7 @@ class HalBase:
     start = time.monotonic()
     while True:
       try:
-        self._display.refresh()
+        refresh()
         break
       except RuntimeError:
         pass
@@ -133,6 +162,26 @@ class HalBase:
           monotonic_time=time.monotonic()+update_time)
         alarm.light_sleep_until_alarms(time_alarm)
 
+  def show(self,content,dirty=None):
+    """ show and refresh the display. dirty is a list of changed regions.
+        Returns the exception of a failed partial refresh (or None) """
+
+    failed = None
+    region = self._use_partial(content,dirty)
+    if region and hasattr(self._display,"refresh_partial"):
+      try:
+        self._refresh(lambda: self.refresh_partial(region))
+        self._partials = getattr(self,"_partials",0) + 1
+        return None
+      except Exception as ex:
+        # the dirty regions are already consumed: refresh everything
+        failed = ex
+    self._partials = 0
+
+    self._display.root_group = content
+    self._refresh(self._display.refresh)
+    return failed
+
   def get_rtc_ext(self):
     """ return external rtc, if available """
     try:
@@ -152,6 +201,19 @@ class HalBase:
     """ sleep for the given duration in seconds """
     time.sleep(duration)
 
+  def deep_sleep(self,duration):
+    """ deep-sleep for the given duration in seconds (does not return) """
+    time_alarm = alarm.time.TimeAlarm(
+      monotonic_time=time.monotonic()+duration)
+    alarm.exit_and_deep_sleep_until_alarms(time_alarm)
+
+  def get_sleep_memory(self):
+    """ return memory that survives deep-sleep (or None) """
+    try:
+      return alarm.sleep_memory
+    except:
+      return None
+
   def get_keys(self):
     """ return list of pin-numbers for up, down, left, right """
     # format is (active-state,[key1,...])
@@ -0,0 +1,46 @@
+# ----------------------------------------------------------------------------
+# headless.py: HAL for CPython without a window (containers, benchmarks)
+#
+# The display is a FramebufferDisplay (see framebuffer.py, needs NumPy).
+# Select this HAL in settings.py with
+#
+#   hw_config.HAL             = "headless"
+#   hw_config.HEADLESS_SIZE   = (600,448)                  # optional
+#   hw_config.HEADLESS_EXPORT = "frames/frame-{n:04d}.png" # optional
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+# ----------------------------------------------------------------------------
+
+import time
+from hal.hal_base import HalBase
+from hal.GENERIC_LINUX_PC import HalPygame
+
+try:
+  from settings import app_config
+except:
+  app_config = None
+
+class HalHeadless(HalPygame):
+  """ headless HAL-class """
+
+  def get_display(self):
+    """ return framebuffer-display """
+    if not self._display:
+      from framebuffer import FramebufferDisplay
+      width,height = self._get_attrib('HEADLESS_SIZE') or (600,448)
+      self._display = FramebufferDisplay(
+        width,height,export=self._get_attrib('HEADLESS_EXPORT'),
+        verbose=getattr(app_config,"debug",False))
+    return self._display
+
+  # the framebuffer renders only the dirty region
+  refresh_partial = HalBase.refresh_partial
+
+  def sleep(self,duration):
+    """ sleep for the given duration in seconds """
+    time.sleep(duration)
+
+impl = HalHeadless()
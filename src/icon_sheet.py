@@ -0,0 +1,106 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Icons from a pre-rendered sprite-sheet (created by tools/build_icons.py).
+#
+# The sheet is a 1bpp BMP with one tile per icon. It is shown with an
+# OnDiskBitmap, so icons need no font and (almost) no heap. The index
+# (a JSON-file next to the BMP) maps every icon-set to the font it was
+# rendered from and every character to (tile, width, height). The tile
+# contains the bounding-box of the label the character would need, so an
+# Icon is placed exactly like the label it replaces.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import json
+import displayio
+
+from ui_settings import UI_SETTINGS, UI_PALETTE
+
+# --- sprite-sheet   ---------------------------------------------------------
+
+class IconSheet:
+  """ sprite-sheet of pre-rendered icons """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,path):
+    """ constructor: read index and open bitmap """
+
+    with open(path[:path.rfind(".")]+".json","r") as f:
+      index = json.load(f)
+    self.tile_width,self.tile_height = index["tile"]
+    self._sets = {}
+    for name,(font,icons) in index["icons"].items():
+      self._sets[name] = (font,
+                          {chr(int(code,16)): tuple(value)
+                           for code,value in icons.items()})
+    self._bitmap = displayio.OnDiskBitmap(path)
+    self._shader = displayio.Palette(2)
+    self._shader[1] = UI_PALETTE[UI_SETTINGS.FOREGROUND]
+    self._shader.make_transparent(0)
+
+  # --- check icon-set   -----------------------------------------------------
+
+  def has(self,name,font):
+    """ check if the sheet has the icon-set rendered from the given font """
+    return name in self._sets and self._sets[name][0] == font
+
+  # --- create icon   --------------------------------------------------------
+
+  def icon(self,name,anchor_point,anchored_position):
+    """ create icon of the given set """
+
+    tg = displayio.TileGrid(self._bitmap,pixel_shader=self._shader,
+                            tile_width=self.tile_width,
+                            tile_height=self.tile_height)
+    return Icon(tg,self._sets[name][1],anchor_point,anchored_position)
+
+# --- icon   -----------------------------------------------------------------
+
+class Icon(displayio.Group):
+  """ tile of a sprite-sheet with the interface of a label """
+
+  def __init__(self,tilegrid,icons,anchor_point,anchored_position):
+    """ constructor """
+
+    super().__init__()
+    self._tg     = tilegrid
+    self._icons  = icons
+    self._text   = ""
+    self._size   = (0,0)
+    self.anchor_point      = anchor_point
+    self.anchored_position = anchored_position
+    self._tg.hidden = True
+    self.append(self._tg)
+
+  @property
+  def bounding_box(self):
+    """ bounding-box (relative to x,y) """
+    return (0,0,self._size[0],self._size[1])
+
+  @property
+  def text(self):
+    """ character of the icon """
+    return self._text
+
+  @text.setter
+  def text(self,text):
+    """ switch icon: change tile-index and position """
+
+    self._text = text
+    icon = self._icons.get(text,None)
+    if not icon:
+      self._size = (0,0)
+      self._tg.hidden = True
+      return
+    self._tg[0] = icon[0]
+    self._size  = icon[1:3]
+    self.x = self.anchored_position[0] - round(self.anchor_point[0]*icon[1])
+    self.y = self.anchored_position[1] - round(self.anchor_point[1]*icon[2])
+    self._tg.hidden = False
@@ -0,0 +1,122 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an e-paper display.
+#
+# Import profile: import the modules of a cold boot one by one and report
+# the import time and the memory retained by every module.
+#
+# The modules are imported in the order of a boot (libraries first), so
+# every module is charged only for itself and for imports not profiled
+# before. Run it directly after a reset, e.g. from the REPL:
+#
+#   >>> import import_profile
+#   >>> import_profile.run()
+#
+# tools/build_mpy.py -p runs the profile with CPython (Blinka).
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import gc
+import sys
+import time
+
+try:
+  import tracemalloc                    # CPython
+except ImportError:
+  tracemalloc = None
+
+# modules of a cold boot of main.py (order of the imports)
+MODULES = ["board","displayio","vectorio","fontio","digitalio",
+           "adafruit_display_text.label",
+           "adafruit_display_shapes.line",
+           "adafruit_bitmap_font.bitmap_font",
+           "adafruit_connection_manager","adafruit_requests",
+           "settings","ui_settings",
+           "packed_font","font_cache","layout","icon_sheet","frame",
+           "iso_time","json_stream","forecast_store","response_cache",
+           "openmeteo_dataprovider","openmeteo_uiprovider",
+           "fetch_policy","connection_manager","wifi_helper_builtin",
+           "metrics","application","scheduler","sleep_state",
+           "hal.hal_base",None]           # None: HAL of the board
+
+# --- memory in use   --------------------------------------------------------
+
+def _mem_used():
+  """ return allocated memory (bytes) """
+
+  gc.collect()
+  if hasattr(gc,"mem_alloc"):
+    return gc.mem_alloc()               # CircuitPython
+  return tracemalloc.get_traced_memory()[0]
+
+# --- HAL of the board   -----------------------------------------------------
+
+def _hal_module():
+  """ return name of the HAL-module (see Application._get_hal()) """
+
+  import board
+  try:
+    from settings import hw_config
+  except ImportError:
+    hw_config = None
+  board_id = getattr(hw_config,"HAL",board.board_id).replace(".","_")
+  try:
+    from hal_map import HAL_MAP
+    return HAL_MAP.get(board_id,"hal.hal_default")
+  except ImportError:
+    return "hal."+board_id
+
+# --- profile imports   ------------------------------------------------------
+
+def profile(modules=MODULES):
+  """ import modules, return list of (name,ms,bytes,error) """
+
+  if tracemalloc and not hasattr(gc,"mem_alloc"):
+    tracemalloc.start()
+  results = []
+  for name in modules:
+    if name is None:
+      try:
+        name = _hal_module()
+      except Exception:
+        name = "hal.hal_default"
+    if name in sys.modules:
+      results.append((name,0.0,0,"loaded"))
+      continue
+    mem   = _mem_used()
+    start = time.monotonic_ns()
+    try:
+      __import__(name)
+      error = None
+    except Exception as ex:
+      error = f"{type(ex).__name__}: {ex}"
+    duration = (time.monotonic_ns() - start)/1e6
+    results.append((name,duration,_mem_used()-mem,error))
+  if tracemalloc and tracemalloc.is_tracing():
+    tracemalloc.stop()
+  return results
+
+# --- print report   ---------------------------------------------------------
+
+def report(results):
+  """ print results as table """
+
+  print(f"{'module':<34} {'time (ms)':>10} {'mem (bytes)':>12}")
+  total_time = 0
+  total_mem  = 0
+  for name,duration,mem,error in results:
+    total_time += duration
+    total_mem  += mem
+    line = f"{name:<34} {duration:10.1f} {mem:12d}"
+    if error:
+      line += f"  ({error})"
+    print(line)
+  print(f"{'total':<34} {total_time:10.1f} {total_mem:12d}")
+
+def run(modules=MODULES):
+  """ profile and report imports """
+  report(profile(modules))
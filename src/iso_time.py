@@ -0,0 +1,86 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Allocation-free parsing of ISO-timestamps and calendar arithmetic.
+#
+# Timestamps (YYYY-MM-DDTHH:MM) are parsed from str, bytes or memoryview
+# directly into integers. Date arithmetic uses days since 1970-01-01
+# (proleptic gregorian calendar), so no call to time.mktime() is needed.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+# --- parse number from buffer   ---------------------------------------------
+
+def _num(buf,start,end):
+  """ parse decimal digits buf[start:end] (str, bytes or memoryview) """
+
+  n = 0
+  for i in range(start,end):
+    c = buf[i]
+    if not isinstance(c,int):
+      c = ord(c)
+    n = 10*n + c - 48
+  return n
+
+# --- parse timestamp   ------------------------------------------------------
+
+def parse(buf,pos=0):
+  """ parse YYYY-MM-DD[THH:MM] starting at pos into (y,m,d,hh,mm) """
+
+  y = _num(buf,pos,pos+4)
+  m = _num(buf,pos+5,pos+7)
+  d = _num(buf,pos+8,pos+10)
+  if len(buf) >= pos+16:
+    return (y,m,d,_num(buf,pos+11,pos+13),_num(buf,pos+14,pos+16))
+  return (y,m,d,0,0)
+
+# --- days since 1970-01-01   ------------------------------------------------
+
+def days_from_civil(y,m,d):
+  """ convert date to days since 1970-01-01 """
+
+  if m <= 2:
+    y -= 1
+  era = y // 400                    # floor division, also for y < 0
+  yoe = y - era*400
+  doy = (153*(m + (-3 if m > 2 else 9)) + 2)//5 + d - 1
+  doe = yoe*365 + yoe//4 - yoe//100 + doy
+  return era*146097 + doe - 719468
+
+# --- date from days since 1970-01-01   --------------------------------------
+
+def civil_from_days(z):
+  """ convert days since 1970-01-01 to (y,m,d) """
+
+  z  += 719468
+  era = z // 146097
+  doe = z - era*146097
+  yoe = (doe - doe//1460 + doe//36524 - doe//146096) // 365
+  doy = doe - (365*yoe + yoe//4 - yoe//100)
+  mp  = (5*doy + 2)//153
+  d   = doy - (153*mp + 2)//5 + 1
+  m   = mp + (3 if mp < 10 else -9)
+  return (yoe + era*400 + (m <= 2),m,d)
+
+# --- add days to a date   ---------------------------------------------------
+
+def add_days(y,m,d,days):
+  """ return date (y,m,d) plus the given number of days """
+  return civil_from_days(days_from_civil(y,m,d)+days)
+
+# --- weekday   --------------------------------------------------------------
+
+def weekday(y,m,d):
+  """ return weekday, 0 is Monday """
+  return (days_from_civil(y,m,d)+3) % 7          # 01/01/1970 is Thursday
+
+# --- timestamp as number   --------------------------------------------------
+
+def to_seconds(tm):
+  """ convert (y,m,d,hh,mm) to seconds since 1970-01-01 (no timezone) """
+  return (days_from_civil(tm[0],tm[1],tm[2])*1440 + tm[3]*60 + tm[4])*60
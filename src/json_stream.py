@@ -0,0 +1,162 @@
+# -------------------------------------------------------------------------
+# Incremental (push) JSON parser with value selection.
+#
+# The parser consumes the response in chunks and only converts values
+# the caller asks for. All other values are skipped without creating
+# any objects. Arrays are addressed by index, so a caller can pick
+# single positions out of long arrays.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import json
+
+# byte-constants
+_QUOTE     = 0x22
+_BACKSLASH = 0x5C
+_COMMA     = 0x2C
+_COLON     = 0x3A
+_OBJ_START = 0x7B
+_OBJ_END   = 0x7D
+_ARR_START = 0x5B
+_ARR_END   = 0x5D
+_WS        = b" \t\r\n"
+_DELIM     = b" \t\r\n,]}"
+
+# --- parser class   ---------------------------------------------------------
+
+class JsonStream:
+  """ push-parser for JSON. select(path) -> bool decides about values """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,select=None,on_value=None,raw_strings=False):
+    """ constructor. With raw_strings, string-values are passed as
+    memoryview (only valid during the call of on_value) """
+
+    self._select   = select if select else lambda path: True
+    self._on_value = on_value if on_value else self.store
+    self.result    = {}
+    self.size      = 0             # number of bytes consumed
+    self._rest     = None          # incomplete token from last chunk
+    self._path     = []            # current key/index per nesting level
+    self._is_obj   = []            # type of container per nesting level
+    self._want_key = False
+    self._raw      = raw_strings
+
+  # --- default sink: store value in nested dicts   --------------------------
+
+  def store(self,path,value):
+    """ store value. Arrays are stored as dicts with the index as key """
+
+    node = self.result
+    for key in path[:-1]:
+      if key not in node:
+        node[key] = {}
+      node = node[key]
+    node[path[-1]] = value
+
+  # --- convert scalar token   -----------------------------------------------
+
+  def _convert(self,token):
+    """ convert number or literal """
+
+    if token == b"true":
+      return True
+    elif token == b"false":
+      return False
+    elif token == b"null":
+      return None
+    elif b"." in token or b"e" in token or b"E" in token:
+      return float(token)
+    else:
+      return int(token)
+
+  # --- find end of string   -------------------------------------------------
+
+  def _string_end(self,buf,pos):
+    """ return index of closing quote of string starting at pos or -1 """
+
+    end = buf.find(b'"',pos+1)
+    while end > 0 and buf[end-1] == _BACKSLASH:
+      # count backslashes: even number means the quote is not escaped
+      n = 1
+      while buf[end-1-n] == _BACKSLASH:
+        n += 1
+      if n % 2 == 0:
+        break
+      end = buf.find(b'"',end+1)
+    return end
+
+  # --- consume next chunk of data   -----------------------------------------
+
+  def feed(self,chunk,final=False):
+    """ consume chunk. Set final=True for the last chunk """
+
+    self.size += len(chunk)
+    if self._rest:
+      buf = self._rest + chunk
+      self._rest = None
+    else:
+      buf = chunk
+    n   = len(buf)
+    pos = 0
+
+    while pos < n:
+      c = buf[pos]
+      if c in _WS or c == _COLON:
+        pos += 1
+      elif c == _QUOTE:
+        end = self._string_end(buf,pos)
+        if end < 0:
+          break
+        if self._want_key:
+          self._path[-1] = str(buf[pos+1:end],"utf-8")
+          self._want_key = False
+        elif self._select(self._path):
+          token = buf[pos:end+1]
+          if _BACKSLASH in token:
+            value = json.loads(str(token,"utf-8"))
+          elif self._raw:
+            value = memoryview(buf)[pos+1:end]
+          else:
+            value = str(token[1:-1],"utf-8")
+          self._on_value(self._path,value)
+        pos = end + 1
+      elif c == _COMMA:
+        if self._is_obj[-1]:
+          self._want_key = True
+        else:
+          self._path[-1] += 1
+        pos += 1
+      elif c == _OBJ_START or c == _ARR_START:
+        is_obj = c == _OBJ_START
+        self._is_obj.append(is_obj)
+        self._path.append(None if is_obj else 0)
+        self._want_key = is_obj
+        pos += 1
+      elif c == _OBJ_END or c == _ARR_END:
+        self._is_obj.pop()
+        self._path.pop()
+        self._want_key = False
+        pos += 1
+      else:
+        # number or literal: scan to next delimiter
+        end = pos + 1
+        while end < n and buf[end] not in _DELIM:
+          end += 1
+        if end == n and not final:
+          break
+        if self._select(self._path):
+          self._on_value(self._path,self._convert(buf[pos:end]))
+        pos = end
+
+    if pos < n:
+      self._rest = bytes(buf[pos:])
+
+    if final and (self._rest or self._path):
+      raise EOFError("incomplete JSON")           # truncated response
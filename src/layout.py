@@ -0,0 +1,140 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Declarative layout.
+#
+# A layout is a list of rules (name, expression). The expressions are
+# evaluated in order and may use the results of earlier rules and:
+#
+#   W, H                  size of the display
+#   MARGIN, PADDING       from UI_SETTINGS
+#   FOOTER                footer-text from UI_SETTINGS
+#   *_FONT                font-paths from UI_SETTINGS
+#   bbox(font,text,...)   bounding-box of a label (tight/base: see Label)
+#
+# The solved values (numbers and lists) are cached per display-size and
+# rules in memory and in UI_SETTINGS.LAYOUT_CACHE (a JSON-file, if
+# writable), so labels are only measured at the first boot.
+#
+# Rules can be replaced per display-size without code-changes, e.g. in
+# settings.py:
+#
+#   ui_config.LAYOUTS = {"296x128": {"hour_time": "..."}}
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import json
+from binascii import crc32
+
+from ui_settings import UI_SETTINGS
+
+_solved = {}          # key -> values
+
+# --- measure label   --------------------------------------------------------
+
+def bbox(font,text,tight=False,base=False):
+  """ return bounding-box of a label """
+
+  import font_cache
+  from adafruit_display_text import label
+  lbl = label.Label(font_cache.get_font(font),text=text,
+                    background_tight=tight,base_alignment=base)
+  return tuple(lbl.bounding_box)
+
+# --- layout   ---------------------------------------------------------------
+
+class Layout:
+  """ rules solved once per display-size """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,rules,debug=False):
+    """ constructor """
+
+    self._rules = rules
+    self._debug = debug
+    self._cache = getattr(UI_SETTINGS,"LAYOUT_CACHE",None)
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- namespace of expressions   -------------------------------------------
+
+  def _namespace(self,width,height):
+    """ return constants available to expressions """
+
+    ns = {"W": width, "H": height,
+          "MARGIN":  UI_SETTINGS.MARGIN,
+          "PADDING": UI_SETTINGS.PADDING,
+          "FOOTER":  UI_SETTINGS.FOOTER}
+    for name in dir(UI_SETTINGS):
+      if name.endswith("_FONT"):
+        ns[name] = getattr(UI_SETTINGS,name)
+    return ns
+
+  # --- read/write cache-file   ----------------------------------------------
+
+  def _read_cache(self):
+    """ return content of the cache-file """
+    try:
+      with open(self._cache,"r") as f:
+        return json.load(f)
+    except (OSError,ValueError):
+      return {}
+
+  def _write_cache(self,key,values):
+    """ add values to the cache-file (ignore read-only filesystem) """
+    cache = self._read_cache()
+    cache[key] = values
+    if "/" in self._cache:
+      try:
+        os.mkdir(self._cache[:self._cache.rfind("/")])
+      except:
+        pass
+    try:
+      with open(self._cache,"w") as f:
+        json.dump(cache,f)
+    except OSError:
+      self.msg(f"layout: {self._cache} is not writable")
+
+  # --- solve layout   -------------------------------------------------------
+
+  def solve(self,width,height):
+    """ return values of all rules for the given display-size """
+
+    ns    = self._namespace(width,height)
+    rules = list(self._rules)
+    overrides = getattr(UI_SETTINGS,"LAYOUTS",{}).get(f"{width}x{height}",{})
+    for i,(name,expr) in enumerate(rules):
+      if name in overrides:
+        rules[i] = (name,overrides[name])
+
+    key = f"{width}x{height}:{crc32(repr((rules,ns)).encode()):08x}"
+    if key in _solved:
+      return _solved[key]
+    if self._cache:
+      values = self._read_cache().get(key,None)
+      if values:
+        self.msg(f"layout: {key} from {self._cache}")
+        _solved[key] = values
+        return values
+
+    self.msg(f"layout: solving {key}")
+    ns["bbox"] = bbox
+    values = {}
+    for name,expr in rules:
+      ns[name] = values[name] = eval(expr,ns)
+    _solved[key] = values
+    if self._cache:
+      self._write_cache(key,values)
+    return values
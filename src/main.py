@@ -15,17 +15,22 @@
 
 import sys
 import time
-try:
-  import pygame
-except:
-  # running CircuitPython on a MCU
-  pass
-
-from application import Application
-from openmeteo_uiprovider   import OpenMeteoUIProvider   as UIProvider
-from openmeteo_dataprovider import OpenMeteoDataProvider as DataProvider
+
 from settings import app_config
+if getattr(app_config,"use_asyncio",False):
+  from async_application import AsyncApplication as Application
+else:
+  from application import Application
+if getattr(app_config,"gateway_url",None):
+  # thin client: the screen is rendered by tools/gateway.py
+  from gateway_provider import GatewayUIProvider   as UIProvider
+  from gateway_provider import GatewayDataProvider as DataProvider
+else:
+  from openmeteo_uiprovider   import OpenMeteoUIProvider   as UIProvider
+  from openmeteo_dataprovider import OpenMeteoDataProvider as DataProvider
 from ui_settings import UI_SETTINGS
+from sleep_state import SleepState
+from scheduler import Scheduler
 
 DEBUG = getattr(app_config,'debug',False)
 
@@ -37,34 +42,42 @@ class OpenMeteo(Application):
   def __init__(self):
     """ constructor """
     ui_provider   = UIProvider(debug=DEBUG)
-    data_provider = DataProvider(debug=DEBUG)
+    data_provider = DataProvider(fields=UIProvider.FIELDS,debug=DEBUG)
     super().__init__(data_provider,ui_provider,with_rtc=False,debug=DEBUG)
     self.blink(0.1,color=Application.GREEN)
 
-    self.data["last_update"] = "unknown"
+    self.data["last_update"] = 0            # unknown
     self._last_run = 0
     self._next_update = 0
+    self._scheduler = Scheduler(
+      margin=getattr(app_config,"update_margin",30),debug=DEBUG)
 
   # --- calculate interval until next update   -------------------------------
 
   def _calc_next_update_time(self):
     """ return interval until next update is due """
 
-    if self.data["last_update"] == "unknown":
-      # very first update - start with 2 minutes
-      self.data["last_update"] = self.data["current"].update
-      interval = 120
-    elif self.data["last_update"] == self.data["current"].update:
-      # no change - use 2 minutes
-      interval = 120
-    else:
-      # data was updated - use interval of data
-      self.data["last_update"] = self.data["current"].update
-      interval = self.data["current"].interval
+    current  = self.data["current"]
+    interval = self._scheduler.next_fetch(current.update_ts,current.interval)
+    self.data["last_update"] = current.update_ts
 
     self.msg(f"calculated interval for next update: {interval}")
     self._next_update = self._last_run + interval
 
+  # --- update timings after a run   -----------------------------------------
+
+  def after_run(self):
+    """ update timings, return seconds until next update """
+
+    self._last_run = time.monotonic()
+    if self.failures:
+      # last run failed: retry (stale data or error-screen is shown)
+      self._next_update = self._last_run + getattr(app_config,
+                                                   "retry_interval",120)
+    else:
+      self._calc_next_update_time()
+    return self._next_update - self._last_run
+
   # --- main code (override base class)   ------------------------------------
 
   def run(self):
@@ -76,14 +89,14 @@ class OpenMeteo(Application):
     else:
       # execute standard code and update timings
       super().run()
-      self._last_run = time.monotonic()
-      self._calc_next_update_time()
+      self.after_run()
 
   # --- key-handler for PyGame-Display environment   -------------------------
 
   def on_event(self,ev):
     """ process key-press """
 
+    import pygame
     if ev.key in [pygame.K_ESCAPE,pygame.K_q]:
       sys.exit(0)
 
@@ -92,6 +105,7 @@ class OpenMeteo(Application):
   def run_pygame(self):
     """ event-loop for PyGame-Display environment """
 
+    import pygame                         # not available on a MCU
     self.run()
     self.display.event_loop(
       interval=60,
@@ -106,10 +120,46 @@ class OpenMeteo(Application):
       self.run()
       self.sleep(60)        # check once a minute if an update is necessary
 
+  # --- single run followed by deep-sleep   ----------------------------------
+
+  def run_deep_sleep(self):
+    """ run once, persist state and deep-sleep until next update """
+
+    state = SleepState(self.sleep_memory)
+    if state.load():
+      self.data["last_update"] = state.last_update
+      self._scheduler.restore(state.last_update,state.lag_lo,state.lag_hi)
+      self.fingerprint = state.fingerprint
+      self.skipped     = state.skipped
+      self.msg(f"wakeup {state.wakeups}: last update {state.last_update}")
+    try:
+      self.run()
+      interval = self._next_update - time.monotonic()
+    except Exception as ex:
+      # never stay awake: retry after the default interval
+      import traceback
+      traceback.print_exception(ex)
+      interval = getattr(app_config,"retry_interval",120)
+
+    state.last_update = self.data["last_update"]
+    state.interval    = max(1,int(interval))
+    state.wakeups    += 1
+    state.fingerprint = self.fingerprint
+    state.skipped     = self.skipped
+    state.lag_lo,state.lag_hi = self._scheduler.export(
+      Scheduler.now()+state.interval)
+    state.save()
+    self.msg(f"deep-sleep for {state.interval}s")
+    self.deep_sleep(state.interval)
+
 # --- main application code   -------------------------------------------------
 
 app = OpenMeteo()
-if app.is_pygame:
+if getattr(app_config,"deep_sleep",False):
+  app.run_deep_sleep()       # wakes up with a reset
+elif hasattr(app,"start"):
+  app.start()                # asyncio: tasks instead of polling
+elif app.is_pygame:
   app.run_pygame()
 else:
   app.run_cp()
@@ -0,0 +1,177 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Metrics: ring-buffer of per-cycle records.
+#
+# Every update-cycle writes one record with the duration and the lowest
+# observed free heap of the phases (data, ui, update, show; the free heap
+# of the data-phase includes the low-water mark of streaming), the number
+# of response-bytes and retries, if the display was refreshed, the
+# battery-level and if the cycle succeeded. The records live in a single
+# preallocated array (no allocations per cycle), so metrics can stay
+# enabled in production. The time of a record is relative to the creation
+# of the ring (floats of CircuitPython are too small for the uptime).
+#
+# dump() prints the records as CSV (serial console), save() appends them
+# to a CSV-file on flash (needs a writable filesystem).
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import gc
+import time
+from array import array
+
+# fields of a record (columns of the CSV)
+FIELDS = ("time",                                  # since start of ring
+          "data","ui","update","show",                     # seconds
+          "mem_data","mem_ui","mem_update","mem_show",     # free heap
+          "bytes","retries","refresh","bat","ok")
+
+# fields written with decimals (all others are integers)
+FLOATS = ("time","data","ui","update","show","bat")
+
+_mem_free = getattr(gc,"mem_free",None)    # not available on CPython
+
+# doubles if supported (CPython), else floats (CircuitPython)
+try:
+  _TYPECODE = "d"
+  array(_TYPECODE,[0.0])
+except ValueError:
+  _TYPECODE = "f"
+
+class Metrics:
+  """ fixed-size ring of per-cycle records """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,size=32,path=None,flush=None):
+    """ constructor: size is the number of records. If path is set, the
+        records are appended to this CSV-file every flush cycles
+        (default: size) """
+
+    self.size   = size
+    self.count  = 0                     # committed records (total)
+    self._n     = len(FIELDS)
+    self._data  = array(_TYPECODE,[0.0]*(size*self._n))
+    self._rec   = 0                     # offset of current record
+    self._path  = path
+    self._flush = flush or size
+    self._saved = 0                     # value of count at last save
+    self._t0    = 0.0
+    self._m0    = 0
+    self._epoch = time.monotonic()      # start of the ring
+
+  # --- free heap   ----------------------------------------------------------
+
+  @staticmethod
+  def mem_free():
+    """ return free heap (0 if not available) """
+    return _mem_free() if _mem_free else 0
+
+  # --- set value of current record   ----------------------------------------
+
+  def set(self,field,value):
+    """ set value of a field of the current record """
+    self._data[self._rec+FIELDS.index(field)] = value
+
+  def add(self,field,value):
+    """ add value to a field of the current record """
+    self._data[self._rec+FIELDS.index(field)] += value
+
+  # --- start cycle   --------------------------------------------------------
+
+  def start(self):
+    """ start a new record """
+
+    self._rec = (self.count % self.size)*self._n
+    for i in range(self._rec,self._rec+self._n):
+      self._data[i] = 0.0
+    self._data[self._rec] = time.monotonic() - self._epoch
+
+  # --- timing of phases   ---------------------------------------------------
+
+  def begin(self):
+    """ begin a phase """
+    self._t0 = time.monotonic()
+    self._m0 = Metrics.mem_free()
+
+  def end(self,phase):
+    """ end a phase: record duration and lowest free heap, return duration """
+    return self.record(phase,self._t0,self._m0)
+
+  def record(self,phase,start,mem):
+    """ record phase started at start with free heap mem (for phases
+        running concurrently), return duration """
+
+    duration = time.monotonic() - start
+    self.set(phase,duration)
+    self.set("mem_"+phase,min(mem,Metrics.mem_free()))
+    return duration
+
+  def low(self,field,value):
+    """ lower field of the current record to value, e.g. a low-water mark
+        of the free heap sampled inside a phase (0: not available) """
+
+    i = self._rec+FIELDS.index(field)
+    if value and (not self._data[i] or value < self._data[i]):
+      self._data[i] = value
+
+  # --- finish cycle   -------------------------------------------------------
+
+  def commit(self):
+    """ finish current record """
+
+    self.count += 1
+    if self._path and self.count - self._saved >= self._flush:
+      self.save(self._path)
+
+  # --- iterate records   ----------------------------------------------------
+
+  def records(self,first=0):
+    """ yield committed records (oldest first), skip records < first """
+
+    first = max(first,self.count-self.size)
+    for n in range(first,self.count):
+      i = (n % self.size)*self._n
+      yield self._data[i:i+self._n]
+
+  # --- CSV-output   ---------------------------------------------------------
+
+  @staticmethod
+  def _csv(record):
+    """ format record as CSV-line """
+    return ",".join([f"{v:.3f}" if FIELDS[i] in FLOATS else str(int(v))
+                     for i,v in enumerate(record)])
+
+  def dump(self):
+    """ print all records as CSV (e.g. to the serial console) """
+
+    print(",".join(FIELDS))
+    for record in self.records():
+      print(Metrics._csv(record))
+
+  def save(self,path):
+    """ append records not saved yet to a CSV-file. Returns False if the
+        filesystem is not writable """
+
+    try:
+      try:
+        with open(path,"r"):
+          header = False
+      except OSError:
+        header = True
+      with open(path,"a") as f:
+        if header:
+          f.write(",".join(FIELDS)+"\n")
+        for record in self.records(self._saved):
+          f.write(Metrics._csv(record)+"\n")
+      self._saved = self.count
+      return True
+    except OSError:
+      self._path = None                 # don't try again
+      return False
@@ -0,0 +1,126 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Batched interface to Open-Meteo API: fetch data of many locations with
+# a single request per batch.
+#
+# Open-Meteo accepts comma-separated lists of coordinates and returns an
+# array with one forecast per location. Parsing is delegated to one
+# OpenMeteoDataProvider per location, so every location gets the same
+# model (current, hours, days, units) as a single-location provider.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import gc
+
+from settings import app_config
+from json_stream import JsonStream
+from openmeteo_dataprovider import OpenMeteoDataProvider
+
+class OpenMeteoBatchProvider:
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,locations=None,fields=None,batch_size=None,debug=False):
+    """ constructor. locations is a list of (latitude,longitude) """
+
+    self._debug = debug
+    if not locations:
+      locations = app_config.locations
+    if not batch_size:
+      batch_size = getattr(app_config,"batch_size",50)
+    self._stream = getattr(app_config,"stream_json",True)
+    self._wifi   = None
+
+    # one parser per location (without response-cache)
+    self._locs = [OpenMeteoDataProvider(fields=fields,debug=debug,
+                                        location=loc,cache=False)
+                  for loc in locations]
+
+    # one request per batch: (first index, last index+1, url)
+    self._batches = []
+    for start in range(0,len(locations),batch_size):
+      end = min(start+batch_size,len(locations))
+      url = self._locs[0].get_url(locations[start:end])
+      self._batches.append((start,end,url))
+      self.msg(f"batch {start}-{end-1}: {url}")
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- set wifi-object   ----------------------------------------------------
+
+  def set_wifi(self,wifi):
+    """ set wifi-object """
+    self._wifi = wifi
+
+  # --- dispatch streaming-callbacks to location   ---------------------------
+
+  def _loc(self,path):
+    """ return location of path (a single location is not in an array) """
+    if self._single:
+      return self._locs[self._start]
+    return self._locs[self._start+path[0]]
+
+  def _select(self,path):
+    """ select values of the location in path[0] """
+    return self._loc(path).select(path)
+
+  def _on_value(self,path,value):
+    """ pass value to the location in path[0] """
+    self._loc(path).on_value(path,value)
+
+  # --- fetch and parse a single batch   -------------------------------------
+
+  def _fetch_batch(self,start,end,url):
+    """ fetch batch and return list of parsed data per location """
+
+    locs = self._locs[start:end]
+    if not self._stream:
+      om_data = self._wifi.get_json(url)
+      return om_data if isinstance(om_data,list) else [om_data]
+
+    self._start  = start
+    self._single = end-start == 1
+    for loc in locs:
+      loc.begin_stream(p0=0 if self._single else 1)
+    parser = JsonStream(select=self._select,on_value=self._on_value,
+                        raw_strings=True)
+    mem_free = getattr(gc,"mem_free",None)
+    for chunk in self._wifi.get_chunks(url):
+      parser.feed(chunk)
+      if mem_free:
+        self.mem_min = min(self.mem_min or mem_free(),mem_free())
+    parser.feed(b"",final=True)
+    self.msg(f"batch {start}-{end-1}: streamed {parser.size} bytes")
+    return [loc.end_stream() for loc in locs]
+
+  # --- query weather-data   -------------------------------------------------
+
+  def update_data(self,data):
+    """ callback for E-Ink-App: query weather data of all locations """
+
+    models = []
+    self.mem_min = 0             # lowest free heap while streaming (0: n/a)
+    for start,end,url in self._batches:
+      # retries, timeouts and backoff are handled by the fetch-policy
+      om_data = self._wifi.fetch(
+        lambda: self._fetch_batch(start,end,url))
+      for loc,loc_data in zip(self._locs[start:end],om_data):
+        model = {}
+        loc.parse(loc_data,model)
+        models.append(model)
+      om_data = None
+      gc.collect()
+
+    data["unchanged"] = False
+    data["locations"] = models
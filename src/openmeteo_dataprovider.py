@@ -10,9 +10,13 @@
 #
 # -------------------------------------------------------------------------
 
-import json, time
+import gc, json
 
 from settings import app_config
+from json_stream import JsonStream
+from forecast_store import ForecastStore
+from response_cache import ResponseCache
+import iso_time
 
 # --- helper class (value-holder)   ------------------------------------------
 
@@ -28,47 +32,138 @@ class OpenMeteoDataProvider:
   # wind-direction constants
   DIRECTION = ['N','NE','E','SE','S','SW','W','NW','N']
 
-  # Open-Meteo variables (current/hourly)
-  OM_HOURLY = ",".join([
-    "is_day",
-    "weathercode",
-    "temperature_2m",
-    "relativehumidity_2m",
-    "precipitation",
-    "pressure_msl",
-    "wind_speed_10m",
-    "winddirection_10m"
-  ])
-  OM_CURRENT = f"is_day,{OM_HOURLY}"
-  OM_DAILY = ",".join([
-    "weathercode",
-    "temperature_2m_min",
-    "temperature_2m_max",
-    "precipitation_sum",
-    "precipitation_hours",
-    "sunshine_duration",
-    "sunrise",
-    "sunset"
-  ])
+  # Open-Meteo variables needed for a model-field: [(section,variable),...].
+  # Fields derived from timestamps (hour, day, month, wday) and
+  # current.interval are always available and need no entry
+  OM_SOURCES = {
+    "current.temp":       [("current","temperature_2m")],
+    "current.wind_speed": [("current","wind_speed_10m")],
+    "current.wind_dir":   [("current","winddirection_10m")],
+    "current.is_day":     [("current","is_day")],
+    "current.wmo":        [("current","weathercode")],
+    "hours.temp":         [("hourly","temperature_2m")],
+    "hours.wmo":          [("hourly","weathercode")],
+    "hours.is_day":       [("hourly","is_day")],
+    "days.wmo":           [("hourly","is_day"),("hourly","weathercode")],
+    "days.sun_hours":     [("hourly","is_day"),("hourly","weathercode")],
+    "days.prec_hours":    [("hourly","is_day"),("hourly","precipitation")],
+    "days.tmin":          [("daily","temperature_2m_min")],
+    "days.tmax":          [("daily","temperature_2m_max")]
+    }
+
+  # map Open-Meteo variables (current/hourly) to model attributes
+  OM_CURRENT = {
+    "temperature_2m": "temp",
+    "wind_speed_10m": "wind_speed",
+    "is_day":         "is_day",
+    "weathercode":    "wmo"
+    }
+  OM_HOURLY = {
+    "temperature_2m": "temp",
+    "weathercode":    "wmo",
+    "is_day":         "is_day"
+    }
+
+  # number of days in daily block
+  OM_DAYS = 6
+
+  # API endpoint (base-url: app_config.api_url, e.g. a local stand-in,
+  # see tools/openmeteo_server.py)
+  OM_URL  = "https://api.open-meteo.com"
+  OM_PATH = "/v1/forecast?"
 
   # --- constructor   --------------------------------------------------------
 
-  def __init__(self,debug=False):
-    """ constructor """
-
-    self._debug       = debug
-    self._url = "".join([
-      "https://api.open-meteo.com/v1/forecast?",
-      f"latitude={app_config.latitude}",
-      f"&longitude={app_config.longitude}",
+  def __init__(self,fields=None,debug=False,location=None,cache=True):
+    """ constructor. location defaults to app_config.latitude/longitude """
+
+    self._debug  = debug
+    if not fields:
+      fields = list(OpenMeteoDataProvider.OM_SOURCES.keys())
+    if not location:
+      location = (app_config.latitude,app_config.longitude)
+    self._api   = getattr(app_config,"api_url",
+                          OpenMeteoDataProvider.OM_URL).rstrip("/")
+    self._query = self._build_query(fields)
+    self._url   = self.get_url([location])
+    self.msg(f"url: {self._url}")
+    self._wifi   = None
+    self._stream = getattr(app_config,"stream_json",True)
+    self._p0     = 0             # index of section in path while streaming
+    self.mem_min = 0             # lowest free heap of last update (0: n/a)
+    self._cache  = None
+    cache_file   = getattr(app_config,"cache_file","cache/openmeteo.json")
+    if cache and cache_file:
+      # generationtime_ms changes with every response: exclude from digest
+      self._cache = ResponseCache(cache_file,
+                                  digest_from=b'"current_units"',debug=debug)
+      if not self._cache.enabled:
+        self._cache = None
+
+  # --- build url for a list of locations   ----------------------------------
+
+  def get_url(self,locations):
+    """ build url. Open-Meteo accepts lists of coordinates """
+
+    return "".join([
+      self._api,
+      OpenMeteoDataProvider.OM_PATH,
+      f"latitude={','.join([str(loc[0]) for loc in locations])}",
+      f"&longitude={','.join([str(loc[1]) for loc in locations])}",
       "&wind_speed_unit=kmh",
-      f"&current=is_day,{OpenMeteoDataProvider.OM_CURRENT}",
-      f"&hourly={OpenMeteoDataProvider.OM_HOURLY}",
-      f"&daily={OpenMeteoDataProvider.OM_DAILY}",
       "&timezone=auto",
-      "&forecast_days=6"
+      self._query
       ])
-    self._wifi   = None
+
+  # --- build minimal query for the given model-fields   ---------------------
+
+  def _build_query(self,fields):
+    """ build query-parameters from field-manifest """
+
+    om_vars = {"current": [], "hourly": [], "daily": []}
+    for field in fields:
+      for section,var in OpenMeteoDataProvider.OM_SOURCES.get(field,[]):
+        if var not in om_vars[section]:
+          om_vars[section].append(var)
+    if not om_vars["current"]:
+      # we always need current.time and current.interval
+      om_vars["current"].append("is_day")
+
+    # number of hours needed (hourly data starts at the current hour)
+    with_days = [f for f in fields if f.startswith("days.")]
+    self._n_hours = 0
+    for h_now in range(24):
+      slots, daily_off = self._get_slots(h_now)
+      last = (daily_off+4)*24-1 if with_days else max(slots)
+      self._n_hours = max(self._n_hours,last-h_now+1)
+
+    # daily min/max: derive from hourly temperatures if that is cheaper
+    # (counted in values to transfer) than the daily block
+    self._local_minmax = False
+    if om_vars["daily"]:
+      if "temperature_2m" in om_vars["hourly"]:
+        cost_local = 0
+      else:
+        cost_local = self._n_hours
+      cost_daily = (len(om_vars["daily"])+1)*OpenMeteoDataProvider.OM_DAYS
+      if cost_local <= cost_daily:
+        self._local_minmax = True
+        om_vars["daily"] = []
+        if not cost_local == 0:
+          om_vars["hourly"].append("temperature_2m")
+    if with_days and not om_vars["hourly"]:
+      # we need at least the timestamps of the hourly data
+      om_vars["hourly"].append("is_day")
+
+    self._om_vars = om_vars
+    query = [f"&current={','.join(om_vars['current'])}"]
+    if om_vars["hourly"]:
+      query.append(f"&hourly={','.join(om_vars['hourly'])}")
+      query.append(f"&forecast_hours={self._n_hours}")
+    if om_vars["daily"]:
+      query.append(f"&daily={','.join(om_vars['daily'])}")
+      query.append(f"&forecast_days={OpenMeteoDataProvider.OM_DAYS}")
+    return "".join(query)
 
   # --- print debug-message   ------------------------------------------------
 
@@ -83,17 +178,6 @@ class OpenMeteoDataProvider:
     """ set wifi-object """
     self._wifi   = wifi
 
-  # --- parse iso-time   -----------------------------------------------------
-
-  def _parse_time(self,tm):
-    """ parse iso-timestamp """
-
-    the_date, the_time = tm.split('T')
-    year,month,mday    = the_date.split('-')
-    hour               = the_time.split(':')[0]
-    iso_pretty         = tm.replace('T',' ')
-    return (the_date,the_time,year,month,mday,hour,iso_pretty)
-
   # --- parse current data   -------------------------------------------------
 
   def _parse_current(self,data):
@@ -101,38 +185,35 @@ class OpenMeteoDataProvider:
 
     self.current = Values()
 
-    # parse current time
-    tm                     = self._parse_time(data["time"])
-    self.current.hour      = tm[5]
-    self.current.day       = tm[4]
-    self.current.month     = tm[3]
-    self.current.update    = tm[6]
+    # parse current time (already parsed if streaming)
+    tm = data["time"]
+    if not isinstance(tm,tuple):
+      tm = iso_time.parse(tm)
+    self.current.hour      = f"{tm[3]:02d}"
+    self.current.day       = f"{tm[2]:02d}"
+    self.current.month     = f"{tm[1]:02d}"
+    self.current.update    = (
+      f"{tm[0]:04d}-{tm[1]:02d}-{tm[2]:02d} {tm[3]:02d}:{tm[4]:02d}")
+    self.current.update_ts = iso_time.to_seconds(tm)
     self.current.interval  = data["interval"]
 
     # measurements
-    self.current.temp       = data["temperature_2m"]
-    self.current.is_day     = data["is_day"]
-    self.current.wind_speed = data["wind_speed_10m"]
-    self.current.wind_dir   = OpenMeteoDataProvider.DIRECTION[
-      int((data["winddirection_10m"]+22.5)/45)]
-    self.current.wmo       = data["weathercode"]
-
-    #self.current.is_day    = data["is_day"]
-    #self.current.pressure  = data["pressure_msl"]
-    #self.current.humidity  = data["relativehumidity_2m"]
-    #self.current.precipit  = data["precipitation"]
+    for var,attr in OpenMeteoDataProvider.OM_CURRENT.items():
+      if var in data:
+        setattr(self.current,attr,data[var])
+    if "winddirection_10m" in data:
+      self.current.wind_dir = OpenMeteoDataProvider.DIRECTION[
+        int((data["winddirection_10m"]+22.5)/45)]
 
-  # --- parse hourly data   --------------------------------------------------
+  # --- calculate hour-slots and offset into daily data   --------------------
 
-  def _parse_hours(self,data):
-    """ parse hourly data """
+  def _get_slots(self,h_now):
+    """ return three hour-indices and offset into daily-data """
 
-    self.hours   = []
     # extract only a subset of hourly data:
     # three hours between 08:00 and 21:00
 
-    h_now = int(self.current.hour)   # index into hour-data
-    self._daily_off = 1              # offset into daily-data
+    daily_off = 1                    # offset into daily-data
     if h_now < 18:
       h_min = max(h_now+1,8)
       h_max = min(h_min+12,21)
@@ -145,17 +226,23 @@ class OpenMeteoDataProvider:
       h_min   = 32   # 08:00 next day
       h_mid   = 38   # 14:00 next day
       h_max   = 44   # 20:00 next day
-      self._daily_off = 2    # next day is already in hourly forecast
+      daily_off = 2          # next day is already in hourly forecast
+    return ([h_min,h_mid,h_max],daily_off)
+
+  # --- parse hourly data   --------------------------------------------------
+
+  def _parse_hours(self,data):
+    """ parse hourly data """
+
+    self.hours   = []
+    slots, self._daily_off = self._get_slots(int(self.current.hour))
 
-    for i in [h_min,h_mid,h_max]:
+    for i in slots:
       val = Values()
       val.hour   = f"{i:02d}" if i<24 else f"{i-24:02d}"
-      val.temp   = data["temperature_2m"][i]
-      val.wmo    = data["weathercode"][i]
-      val.is_day = data["is_day"][i]
-      #val.pressure  = data["pressure_msl"]
-      #val.humidity  = data["relativehumidity_2m"]
-      #val.precipit  = data["precipitation"]
+      for var,attr in OpenMeteoDataProvider.OM_HOURLY.items():
+        if var in data:
+          setattr(val,attr,data[var][i])
       self.hours.append(val)
 
   # --- round data   ----------------------------------------------------------
@@ -169,17 +256,6 @@ class OpenMeteoDataProvider:
     else:
       return value
 
-  # --- get weekday   ---------------------------------------------------------
-
-  def _get_wday(self,iso_t):
-    """ get weekday from iso-day """
-
-    y,m,d = iso_t.split("-")
-    epoch = time.mktime((int(y),int(m),int(d),
-                         12, 0, 0,
-                         -1,-1,-1))
-    return (int(epoch/86400)+3) % 7                    # 01/01/1970 is Thursday
-
   # --- get mode of code in day-bucket   --------------------------------------
 
   def _get_mode(self,bucket):
@@ -202,6 +278,9 @@ class OpenMeteoDataProvider:
     buckets    = []
     sun_hours  = []
     prec_hours = []
+    if not "weathercode" in data:
+      return [None]*4,[None]*4,[None]*4
+    precipitation = data.get("precipitation",None)
     for i in range(self._daily_off,self._daily_off+4):
       day_bucket = {}
       sun_h      = 0
@@ -216,7 +295,7 @@ class OpenMeteoDataProvider:
           day_bucket[wcode] = 1
         if wcode < 3:             # wmo-code overcast
           sun_h += 1
-        if data["precipitation"][i*24+j] > 0:
+        if precipitation and precipitation[i*24+j] > 0:
           prec_h += 1
       buckets.append(day_bucket)
       sun_hours.append(sun_h)
@@ -276,52 +355,211 @@ class OpenMeteoDataProvider:
 
   # --- parse daily data   ----------------------------------------------------
 
-  def _parse_days(self,data,wcodes,sun_hours,prec_hours):
+  def _parse_days(self,hourly,daily,wcodes,sun_hours,prec_hours):
     """ parse daily data """
 
     self.days    = []
     for i in range(self._daily_off,self._daily_off+4):
       val = Values()
-      val.day   = data["time"][i][-2:]
-      val.month = data["time"][i][-5:-3]
-      val.wday  = self._get_wday(data["time"][i])
-      val.tmin  = self._round(data["temperature_2m_min"][i])
-      val.tmax  = self._round(data["temperature_2m_max"][i])
+      y,m,d     = hourly.date(i*24)
+      val.day   = f"{d:02d}"
+      val.month = f"{m:02d}"
+      val.wday  = iso_time.weekday(y,m,d)
+      if self._local_minmax:
+        temps = [hourly["temperature_2m"][i*24+j] for j in range(24)]
+        val.tmin  = self._round(min(temps))
+        val.tmax  = self._round(max(temps))
+      elif daily:
+        val.tmin  = self._round(daily["temperature_2m_min"][i])
+        val.tmax  = self._round(daily["temperature_2m_max"][i])
       val.wmo   = wcodes[i-self._daily_off]
-      #val.sunrise    = self._parse_time(data["sunrise"])[i]
-      #val.sunset     = self._parse_time(data["sunset"])[i]
       val.sun_hours  = sun_hours[i-self._daily_off]
       val.prec_hours = prec_hours[i-self._daily_off]
       self.days.append(val)
 
+  # --- select hourly values needed for the current hour   -------------------
+
+  def _select_hours(self,current):
+    """ map hourly variables to the indices (hours since midnight) we need """
+
+    if not current or not "time" in current or not self._hourly.start:
+      # current-data unknown: keep everything
+      return None
+
+    self._sel_hoff = self._hourly.start[3]
+    slots, self._sel_off = self._get_slots(current["time"][3])
+    window  = range(self._sel_off*24,(self._sel_off+4)*24)
+    slots_window = set(slots)
+    slots_window.update(window)
+    return {
+      "is_day":         slots_window,
+      "weathercode":    slots_window,
+      "temperature_2m": slots_window if self._local_minmax else set(slots),
+      "precipitation":  window
+      }
+
+  # --- start streaming   ----------------------------------------------------
+
+  def begin_stream(self,p0=0):
+    """ reset state for streaming. p0 is the index of the section in the
+    path (1 for multi-location responses) """
+
+    self._p0        = p0
+    self._sel_hours = False
+    self._result    = {}
+    self._hourly    = ForecastStore(self._om_vars["hourly"],self._n_hours)
+
+  # --- end streaming   ------------------------------------------------------
+
+  def end_stream(self):
+    """ return result of streaming """
+
+    om_data = self._result
+    self._result = None
+    return om_data
+
+  # --- select values during streaming   -------------------------------------
+
+  def select(self,path):
+    """ return True for all values we actually use """
+
+    p = self._p0
+    section = path[p]
+    if section == "current" or section == "utc_offset_seconds":
+      return True
+    elif section == "current_units":
+      return path[p+1] in ["temperature_2m","wind_speed_10m"]
+    elif len(path)-p < 3:
+      return False
+
+    if section == "hourly" and path[p+1] == "time" and path[p+2] == 0:
+      # first timestamp defines offset of hourly data
+      return True
+    if self._sel_hours is False:
+      # current-data and first timestamp are complete at this point
+      self._sel_hours = self._select_hours(self._result.get("current",None))
+    if self._sel_hours is None:
+      return True
+
+    if section == "hourly":
+      indices = self._sel_hours.get(path[p+1],None)
+      return indices is not None and path[p+2]+self._sel_hoff in indices
+    elif section == "daily":
+      return self._sel_off <= path[p+2] < self._sel_off+4
+    return False
+
+  # --- store values during streaming   --------------------------------------
+
+  def on_value(self,path,value):
+    """ store hourly values in forecast-store, everything else in result """
+
+    p = self._p0
+    if isinstance(value,memoryview):
+      # timestamps are parsed from the buffer without creating strings
+      if path[p] != "current_units" and "time" in path:
+        value = iso_time.parse(value)
+      else:
+        value = str(value,"utf-8")
+    if path[p] == "hourly":
+      self._hourly.put(path[p+1],path[p+2],value)
+    else:
+      node = self._result
+      for key in path[p:-1]:
+        if key not in node:
+          node[key] = {}
+        node = node[key]
+      node[path[-1]] = value
+
+  # --- stream and parse response   ------------------------------------------
+
+  def _get_stream(self,chunks):
+    """ parse response while streaming """
+
+    self.begin_stream()
+    parser  = JsonStream(select=self.select,on_value=self.on_value,
+                         raw_strings=True)
+    mem_min = gc.mem_free() if hasattr(gc,"mem_free") else 0
+    for chunk in chunks:
+      parser.feed(chunk)
+      if mem_min:
+        mem_min = min(mem_min,gc.mem_free())
+    parser.feed(b"",final=True)
+    self.msg(f"streamed {parser.size} bytes, min free memory: {mem_min}")
+    self.mem_min = mem_min
+    return self.end_stream()
+
+  # --- fetch and parse data   -----------------------------------------------
+
+  def _fetch(self):
+    """ fetch and parse data. Returns None if data did not change """
+
+    if not self._cache:
+      if self._stream:
+        return self._get_stream(self._wifi.get_chunks(self._url))
+      else:
+        return self._wifi.get_json(self._url)
+
+    has_model = hasattr(self,"current")
+    if self._cache.is_fresh():
+      if has_model:
+        self.msg("response-cache: data is fresh, skipping fetch")
+        return None
+      self.msg("response-cache: using cached data")
+    else:
+      changed = self._cache.store(self._wifi.get_chunks(self._url))
+      if not changed and has_model:
+        return None
+    return self._get_stream(self._cache.get_chunks())
+
   # --- query weather-data   -------------------------------------------------
 
   def update_data(self,data):
     """ callback for E-Ink-App: query weather data """
 
-    # try at most 3 times
-    for i in range(3):
-      try:
-        om_data = self._wifi.get_json(self._url)
-        break
-      except:
-        if i == 2:
-          raise
+    # retries, timeouts and backoff are handled by the fetch-policy
+    self.mem_min = 0
+    om_data = self._wifi.fetch(self._fetch)
+
+    data["unchanged"] = om_data is None
+    if om_data is None:
+      self.msg("data unchanged")
+      return
+    self.parse(om_data,data)
+
+  # --- parse data of a single location   ------------------------------------
+
+  def parse(self,om_data,data):
+    """ parse response (streaming-result or complete) and update model """
 
     # current: temp, wind-direction, wind-speed
     self._parse_current(om_data["current"])
-    
+    if self._cache:
+      # the data is in local time (timezone=auto)
+      self._cache.set_validity(
+        self.current.update_ts - int(om_data.get("utc_offset_seconds",0)),
+        self.current.interval)
+
+    # hourly data starts with the current hour: the store indexes
+    # by hour since midnight
+    if "hourly" in om_data:
+      self._hourly = ForecastStore(self._om_vars["hourly"],self._n_hours)
+      self._hourly.fill(om_data["hourly"])
+      del om_data["hourly"]
+    hourly = self._hourly
+
     # next hours: hour, temp, wmo
-    self._parse_hours(om_data["hourly"])
+    self._parse_hours(hourly)
 
     # next days: date, temp (min/max)
-    wcodes,sun_hours,prec_hours = self._get_day_aggregates(om_data["hourly"])
-    self._parse_days(om_data["daily"],wcodes,sun_hours,prec_hours)
+    wcodes,sun_hours,prec_hours = self._get_day_aggregates(hourly)
+    self._parse_days(hourly,om_data.get("daily",None),
+                     wcodes,sun_hours,prec_hours)
 
+    units = om_data["current_units"]
     data.update({
       "units": {
-        "temp":       om_data["current_units"]["temperature_2m"],
-        "wind_speed": om_data["current_units"]["wind_speed_10m"]
+        "temp":       units.get("temperature_2m",None),
+        "wind_speed": units.get("wind_speed_10m",None)
         },
       "current": self.current,
       "hours":   self.hours,
@@ -12,16 +12,19 @@
 
 import time
 import gc
+import binascii
 import displayio
-import traceback
 
 from vectorio import Rectangle
 from adafruit_display_text import label
 from adafruit_display_shapes.line import Line
-from adafruit_bitmap_font import bitmap_font
 
+import font_cache
+from font_cache import DIGITS
+from icon_sheet import IconSheet
 from ui_settings import UI_SETTINGS, COLORS, UI_COLOR_MAP, UI_PALETTE
 from frame import Frame
+from layout import Layout
 
 # --- OpenMeteo Class for layout   -------------------------------------------
 
@@ -135,21 +138,104 @@ class OpenMeteoUIProvider:
     "NW": "\uF05D"
     }
 
+  # layout of the grid of forecast-boxes below the header (see layout.py).
+  # Positions are (anchor_point,anchored_position) relative to the grid
+  LAYOUT = [
+    ("grid_pos",   "(MARGIN,h_header)"),
+    ("grid_w",     "W"),
+    ("grid_h",     "H-h_header-h_footer"),
+    ("b_width",    "int(grid_w/4)"),
+    ("b_width2",   "int(grid_w/8)"),
+    ("b_height",   "int(grid_h/2)"),
+    ("b_height2",  "int(grid_h/4)"),
+    ("lines",      "[(0,b_height,grid_w,b_height)]+"
+                   "[(i*b_width,0,i*b_width,grid_h) for i in range(1,4)]"),
+    # current day. Note: current-temp is slightly moved to the right using
+    # a fixed offset. The dynamic solution would be to measure "°"
+    ("cur_temp",   "((0.5,0),(b_width2+3*MARGIN,2*MARGIN))"),
+    ("cur_wdir",   "((0.5,0.5),(b_width2,b_height2))"),
+    ("cur_speed",  "((0.5,1),(b_width2,b_height-MARGIN))"),
+    # hours: time, temperature, icon
+    ("hours_h",    "bbox(SMALL_FONT,'00:00')[3]"),
+    ("hours_x",    "[MARGIN+(i+1)*(b_width+1)+b_width2 for i in range(3)]"),
+    ("hours_time", "[((0.5,0),(x,2*MARGIN)) for x in hours_x]"),
+    ("hours_temp", "[((0.5,0),(x,2*MARGIN+hours_h+6)) for x in hours_x]"),
+    ("hours_icon", "[((0.5,0.15),(MARGIN+(i+1)*b_width+b_width2,b_height2))"
+                   " for i in range(3)]"),
+    # days: date, temperatures, icon, sun-hours, precipitation-hours
+    ("days_h",     "bbox(SMALL_FONT,'Mo 28.12.')[3]"),
+    ("days_x",     "[i*(b_width+1)+b_width2 for i in range(4)]"),
+    ("days_date",  "[((0.5,0),(x,b_height+1+MARGIN)) for x in days_x]"),
+    ("days_temp",  "[((0.5,0),(x,b_height+1+MARGIN+days_h+6))"
+                   " for x in days_x]"),
+    ("days_icon",  "[((0.5,0.3),(MARGIN+x,b_height+1+b_height2))"
+                   " for x in days_x]"),
+    ("days_sun",   "[((0,1),(i*(b_width+1),2*b_height-MARGIN-1))"
+                   " for i in range(4)]"),
+    ("days_prec",  "[((1,1),((i+1)*b_width-MARGIN,2*b_height-MARGIN-1))"
+                   " for i in range(4)]")
+    ]
+
+  # model-fields used by this UI. The data-provider derives the query
+  # from this list (see OpenMeteoDataProvider.OM_SOURCES)
+  FIELDS = [
+    "current.temp", "current.wind_speed", "current.wind_dir",
+    "hours.temp", "hours.wmo", "hours.is_day",
+    "days.wmo", "days.tmin", "days.tmax", "days.sun_hours", "days.prec_hours"
+    ]
+
+  # the footer shows a banner if the data is stale (see Application)
+  STALE_BANNER = True
+
   # --- constructor   --------------------------------------------------------
 
   def __init__(self,debug=False):
     """ constructor: create ressources """
 
     self._debug       = debug
-    self._large_font  = bitmap_font.load_font(UI_SETTINGS.LARGE_FONT)
-    self._small_font  = bitmap_font.load_font(UI_SETTINGS.SMALL_FONT)
-    self._wdir_font   = bitmap_font.load_font(UI_SETTINGS.WDIR_FONT)
-    self._wicon_font  = bitmap_font.load_font(UI_SETTINGS.WICON_FONT)
+    # fonts are shared: preload the glyphs this layout can produce
+    glyphs            = OpenMeteoUIProvider.glyphs()
+    self._large_font  = font_cache.get_font(UI_SETTINGS.LARGE_FONT,
+                                            glyphs[UI_SETTINGS.LARGE_FONT])
+    self._small_font  = font_cache.get_font(UI_SETTINGS.SMALL_FONT,
+                                            glyphs[UI_SETTINGS.SMALL_FONT])
+    # icons: use the sprite-sheet if available, else the icon-fonts
+    try:
+      self._icons     = IconSheet(UI_SETTINGS.ICON_SHEET)
+    except (OSError,ValueError):
+      self._icons     = None
     self._margin      = UI_SETTINGS.MARGIN
     self._padding     = UI_SETTINGS.PADDING
     self._model       = {}
     self._frame       = None
 
+  # --- characters used by this layout   ------------------------------------
+
+  @staticmethod
+  def glyphs():
+    """ return characters per font that this layout can display """
+
+    return {
+      UI_SETTINGS.LARGE_FONT: DIGITS+"-.°",      # current.temp is a float
+      UI_SETTINGS.SMALL_FONT: DIGITS+":.-/° hkm"+"".join(UI_SETTINGS.UI_DAYS),
+      UI_SETTINGS.WDIR_FONT:  "".join(OpenMeteoUIProvider.DIR_MAP.values()),
+      UI_SETTINGS.WICON_FONT: "".join(["".join(icons) for icons in
+                                       OpenMeteoUIProvider.WMO_MAP.values()])
+                              +"\uf07b"
+      }
+
+  # --- icon-sets of the sprite-sheet   --------------------------------------
+
+  @staticmethod
+  def icons():
+    """ return icon-sets: name -> (font,characters,background_tight) """
+
+    glyphs = OpenMeteoUIProvider.glyphs()
+    return {
+      "wicon": (UI_SETTINGS.WICON_FONT,glyphs[UI_SETTINGS.WICON_FONT],True),
+      "wdir":  (UI_SETTINGS.WDIR_FONT,glyphs[UI_SETTINGS.WDIR_FONT],False)
+      }
+
   # --- map wmo to char of WI-font   -----------------------------------------
 
   def _map_wmo(self,wmo,is_day=True):
@@ -167,128 +253,92 @@ class OpenMeteoUIProvider:
     """ print size of object """
     print(f"{label} w,h: {obj.width},{obj.height}")
 
-  # --- get grid of forecast-boxes   -----------------------------------------
+  # --- create label   -------------------------------------------------------
 
-  def _get_grid(self,width,height):
-    """ get grid of forecast-boxes """
-
-    b_width   = int(width/4)
-    b_width2  = int(width/8)
-    b_height  = int(height/2)
-    b_height2 = int(height/4)
-    g        = displayio.Group()
-
-    # horizontal line
-    g.append(Line(0,b_height,width,b_height,
-                  color=UI_PALETTE[UI_SETTINGS.FOREGROUND]))
-    # vertical lines
-    for i in range(1,4):
-      g.append(Line(i*b_width,0,i*b_width,height,
-                 color=UI_PALETTE[UI_SETTINGS.FOREGROUND]))
-    # current day
-    # note: current-temp is slightly moved to the right using a fixed
-    #       offset. The dynamic solution would be to measure the size of "°"
-    g.append(
-      label.Label(self._large_font,
-                  text=f"{self._model['current'].temp}°",
-                  color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                  anchor_point=(0.5,0),
-                  anchored_position=(b_width2+3*self._margin,
-                                     2*self._margin)))
-
-    wdir_char = OpenMeteoUIProvider.DIR_MAP[
-      self._model["current"].wind_dir]
-    g.append(label.Label(self._wdir_font,text=wdir_char,
+  def _label(self,font,text,anchor_point,anchored_position,**kwargs):
+    """ create label with foreground color """
+    return label.Label(font,text=text,
                        color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.5,0.5),
-                       anchored_position=(b_width2,b_height2
-                                          )))
+                       anchor_point=anchor_point,
+                       anchored_position=anchored_position,**kwargs)
 
-    speed_txt = f"{self._model['current'].wind_speed} {self._model['units']['wind_speed']}"
-    g.append(label.Label(self._small_font,text=speed_txt,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.5,1),
-                       anchored_position=(b_width2,
-                                          b_height-self._margin)))
+  # --- create icon   --------------------------------------------------------
 
-    # hours
-    for i in range(3):
-      h_data = self._model["hours"][i]
-      h_txt1  = f"{h_data.hour}:00"
-      h_txt2  = f"{h_data.temp}°"
-      h_txt1_label = label.Label(self._small_font,text=h_txt1,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.5,0),
-                       anchored_position=(
-                             self._margin+(i+1)*(b_width+1)+b_width2,
-                             2*self._margin))
-      g.append(h_txt1_label)
-      g.append(label.Label(self._small_font,text=h_txt2,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.5,0),
-                       anchored_position=(
-                             self._margin+(i+1)*(b_width+1)+b_width2,
-                             2*self._margin+h_txt1_label.bounding_box[3]+6)))
+  def _icon(self,name,anchor_point,anchored_position):
+    """ create icon from the sprite-sheet, or label with the icon-font """
 
-      icon = self._map_wmo(h_data.wmo,h_data.is_day)
-      g.append(label.Label(self._wicon_font,text=icon,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       background_tight=True,
-                       anchor_point=(0.5,0.15),
-                       anchored_position=(self._margin+(i+1)*b_width+b_width2,
-                                          b_height2)))
+    font,chars,tight = OpenMeteoUIProvider.icons()[name]
+    if self._icons and self._icons.has(name,font):
+      return self._icons.icon(name,anchor_point,anchored_position)
+    return self._label(font_cache.get_font(font,chars),"",
+                       anchor_point,anchored_position,background_tight=tight)
 
-    # days
-    for i in range(4):
-      d_data = self._model["days"][i]
-      d_txt1 = f"{UI_SETTINGS.UI_DAYS[d_data.wday]} {d_data.day}.{d_data.month}."
-      d_txt2 = f"{d_data.tmin}°/{d_data.tmax}°"
-      d_txt1_label = label.Label(self._small_font,text=d_txt1,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.5,0.00),
-                       anchored_position=(
-                             i*(b_width+1)+b_width2,
-                             b_height+1+self._margin))
-      g.append(d_txt1_label)
-      g.append(label.Label(self._small_font,text=d_txt2,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.5,0.00),
-                       anchored_position=(
-                             i*(b_width+1)+b_width2,
-                             b_height+1+self._margin+
-                             d_txt1_label.bounding_box[3]+6)))
-
-      icon = self._map_wmo(d_data.wmo)
-      g.append(label.Label(self._wicon_font,text=icon,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       background_tight=True,
-                       anchor_point=(0.5,0.3),
-                       anchored_position=(self._margin+i*(b_width+1)+b_width2,
-                                          b_height+1+b_height2)))
+  # --- get grid of forecast-boxes   -----------------------------------------
 
-      sun_hours = f"{d_data.sun_hours}h"
-      g.append(label.Label(self._small_font,text=sun_hours,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(0.00,1.00),
-                       anchored_position=(
-                             i*(b_width+1),
-                             2*b_height-self._margin-1)))
+  def _get_grid(self):
+    """ create grid of forecast-boxes. Labels are updated by update_ui """
 
-      prec_hours = f"{d_data.prec_hours}h"
-      g.append(label.Label(self._small_font,text=prec_hours,
-                       color=UI_PALETTE[UI_SETTINGS.FOREGROUND],
-                       anchor_point=(1.00,1.00),
-                       anchored_position=(
-                             (i+1)*(b_width)-self._margin,
-                             2*b_height-self._margin-1)))
+    L = self._layout
+    g = displayio.Group()
+    for line in L["lines"]:
+      g.append(Line(*line,color=UI_PALETTE[UI_SETTINGS.FOREGROUND]))
+
+    # current day
+    self._cur_temp  = self._label(self._large_font,"",*L["cur_temp"])
+    self._cur_wdir  = self._icon("wdir",*L["cur_wdir"])
+    self._cur_speed = self._label(self._small_font,"",*L["cur_speed"])
+    # all labels in the order of _get_texts()
+    self._grid_labels = [self._cur_temp,self._cur_wdir,self._cur_speed]
+
+    # hours: (time, temperature, icon)
+    for i in range(3):
+      self._grid_labels.extend((
+        self._label(self._small_font,"",*L["hours_time"][i]),
+        self._label(self._small_font,"",*L["hours_temp"][i]),
+        self._icon("wicon",*L["hours_icon"][i])))
+
+    # days: (date, temperatures, icon, sun-hours, precipitation-hours)
+    for i in range(4):
+      self._grid_labels.extend((
+        self._label(self._small_font,"",*L["days_date"][i]),
+        self._label(self._small_font,"",*L["days_temp"][i]),
+        self._icon("wicon",*L["days_icon"][i]),
+        self._label(self._small_font,"",*L["days_sun"][i]),
+        self._label(self._small_font,"",*L["days_prec"][i])))
+
+    for lbl in self._grid_labels:
+      g.append(lbl)
     return g
 
-  # --- update data   --------------------------------------------------------
+  # --- texts of grid   -----------------------------------------------------
 
-  def update_ui(self,new_data):
-    """ update data: callback for Application """
+  def _get_texts(self):
+    """ return texts of the grid (in the order of the labels) """
+
+    current = self._model["current"]
+    texts   = [f"{current.temp}°",
+               OpenMeteoUIProvider.DIR_MAP[current.wind_dir],
+               f"{current.wind_speed} {self._model['units']['wind_speed']}"]
+
+    for h_data in self._model["hours"][:3]:
+      texts.append(f"{h_data.hour}:00")
+      texts.append(f"{h_data.temp}°")
+      texts.append(self._map_wmo(h_data.wmo,h_data.is_day))
+
+    for d_data in self._model["days"][:4]:
+      texts.append(
+        f"{UI_SETTINGS.UI_DAYS[d_data.wday]} {d_data.day}.{d_data.month}.")
+      texts.append(f"{d_data.tmin}°/{d_data.tmax}°")
+      texts.append(self._map_wmo(d_data.wmo))
+      texts.append(f"{d_data.sun_hours}h")
+      texts.append(f"{d_data.prec_hours}h")
+    return texts
+
+  # --- update model   -------------------------------------------------------
+
+  def _update_model(self,new_data):
+    """ update model with new data """
 
-    # update model
     self._model.update(new_data)
 
     # map values for day and month
@@ -296,40 +346,62 @@ class OpenMeteoUIProvider:
     self._model["date"] = UI_SETTINGS.UI_MONTHS[int(self._model["current"].month)-1]
     self._model["now"]  = self._model["current"].update
 
-    # remove old header, footer, grid (keep background)
-    if len(self._frame_group) == 4:
-      for _ in range(3):
-        self._frame_group.pop()
-      gc.collect()
+  # --- fingerprint of content   ---------------------------------------------
 
-    (header,h_header) = self._frame.get_header()
-    self._frame_group.append(header)
-    (footer,h_footer) = self._frame.get_footer()
-    self._frame_group.append(footer)
-    gc.collect()
+  def fingerprint(self,new_data):
+    """ return checksum of all texts and icons shown for new_data """
 
-    # create layout for weather
-    grid = self._get_grid(self._width,self._height - h_header - h_footer)
-    grid.x = self._margin
-    grid.y = h_header
-    self._frame_group.append(grid)
+    self._update_model(new_data)
+    texts = Frame.get_texts(self._model) + self._get_texts()
+    return binascii.crc32("\n".join(texts).encode())
+
+  # --- update data   --------------------------------------------------------
+
+  def update_ui(self,new_data):
+    """ update data: callback for Application """
+
+    self._update_model(new_data)
+
+    # the widget-tree is retained: only change texts
+    self._frame.update()
+    dirty,x,y = self._frame.dirty,self._grid.x,self._grid.y
+    for lbl,text in zip(self._grid_labels,self._get_texts()):
+      Frame.set_text(lbl,text,dirty,x,y)
+
+  # --- changed regions   ----------------------------------------------------
+
+  def get_dirty(self):
+    """ return and reset list of regions changed since the last call """
+
+    dirty = self._frame.dirty
+    self._frame.dirty = []
+    return dirty
 
   # --- create complete content   --------------------------------------------
 
   def create_ui(self,display):
-    """ create content """
+    """ create content (once: the widget-tree is retained) """
 
     if not self._frame:
       self._width       = display.width
       self._height      = display.height
-      self._frame       = Frame(display,self._model)
+      self._layout      = Layout(Frame.LAYOUT+OpenMeteoUIProvider.LAYOUT,
+                                 debug=self._debug).solve(self._width,
+                                                          self._height)
+      self._frame       = Frame(display,self._model,self._layout)
       self._frame_group = self._frame.create_group()
+
+      # create layout for weather
+      self._grid = self._get_grid()
+      self._grid.x,self._grid.y = self._layout["grid_pos"]
+      self._frame_group.append(self._grid)
     return self._frame_group
 
   # --- handle exception   ---------------------------------------------------
 
   def handle_exception(self,ex):
     """ handle exception """
+    import traceback                      # only needed on errors
 
     traceback.print_exception(ex)
 
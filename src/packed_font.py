@@ -0,0 +1,166 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Loader for packed fonts (created by tools/compile_fonts.py).
+#
+# A packed font is a binary file with a header, an index sorted by
+# code-point and the glyph-bitmaps (1 bit per pixel, rows padded to
+# full bytes):
+#
+#   header: magic, count, bbox (w,h,dx,dy), ascent, descent
+#   index:  count x (code-point, offset, w, h, dx, dy, shift_x)
+#   data:   glyph-bitmaps, offsets are relative to the start of data
+#
+# Code-points the original font does not provide are listed in the index
+# with offset NO_GLYPH.
+#
+# Only the header and the index are read when the font is opened.
+# Glyphs are loaded by seeking to their bitmap, no text is parsed.
+# Code-points missing in the (subsetted) file are loaded from the
+# original BDF-font if it is available.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import struct
+import displayio
+from fontio import Glyph
+
+MAGIC  = b"EPF1"
+HEADER = "<4sHhhhhhh"
+ENTRY  = "<IIBBbbh"
+NO_GLYPH = 0xFFFFFFFF
+
+class PackedFont:
+  """ font with seekable glyph-bitmaps """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,path,fallback=None):
+    """ constructor: read header and index """
+
+    self._file = open(path,"rb")
+    h_size = struct.calcsize(HEADER)
+    (magic,self._count,bb_w,bb_h,bb_dx,bb_dy,
+     self.ascent,self.descent) = struct.unpack(HEADER,self._file.read(h_size))
+    if magic != MAGIC:
+      raise ValueError(f"{path}: unsupported font-format")
+    self._bbox     = (bb_w,bb_h,bb_dx,bb_dy)
+    self._e_size   = struct.calcsize(ENTRY)
+    self._index    = self._file.read(self._count*self._e_size)
+    self._data     = h_size + len(self._index)
+    self._fallback = fallback          # path of BDF-font (or None)
+    self._bdf      = fallback
+    self._glyphs   = {}
+
+  # --- bounding box of font   -----------------------------------------------
+
+  def get_bounding_box(self):
+    """ return maximum glyph size: width, height, x_offset, y_offset """
+    return self._bbox
+
+  # --- lookup index entry   -------------------------------------------------
+
+  def _find(self,code_point):
+    """ binary search in index, return entry or None """
+
+    lo,hi = 0,self._count-1
+    while lo <= hi:
+      mid = (lo+hi)//2
+      entry = struct.unpack_from(ENTRY,self._index,mid*self._e_size)
+      if entry[0] == code_point:
+        return entry
+      elif entry[0] < code_point:
+        lo = mid+1
+      else:
+        hi = mid-1
+    return None
+
+  # --- read glyph-bitmap   --------------------------------------------------
+
+  def _read_glyph(self,entry):
+    """ read bitmap of glyph and return Glyph-object """
+
+    _,offset,w,h,dx,dy,shift_x = entry
+    stride = (w+7)//8
+    self._file.seek(self._data+offset)
+    rows   = self._file.read(stride*h)
+    bitmap = displayio.Bitmap(w,h,2)
+    pos = 0
+    for y in range(h):
+      start = y*w
+      for i in range(stride):
+        val = rows[pos]
+        pos += 1
+        x = 8*i
+        while val:                     # only set pixels (bitmap is zeroed)
+          if val & 0x80:
+            bitmap[start+x] = 1
+          val = (val << 1) & 0xFF
+          x += 1
+    return Glyph(bitmap,0,w,h,dx,dy,shift_x,0)
+
+  # --- load glyphs   --------------------------------------------------------
+
+  def load_glyphs(self,code_points):
+    """ load glyphs into cache """
+
+    if isinstance(code_points,int):
+      code_points = (code_points,)
+    elif isinstance(code_points,str):
+      code_points = [ord(c) for c in code_points]
+
+    missing = []
+    for code_point in code_points:
+      if code_point in self._glyphs:
+        continue
+      entry = self._find(code_point)
+      if entry:
+        self._glyphs[code_point] = (None if entry[1] == NO_GLYPH else
+                                    self._read_glyph(entry))
+      else:
+        missing.append(code_point)
+
+    if missing and self._fallback:
+      font = self._get_fallback()
+      if font:
+        font.load_glyphs(missing)
+        for code_point in missing:
+          self._glyphs[code_point] = font.get_glyph(code_point)
+        return
+    for code_point in missing:
+      self._glyphs[code_point] = None
+
+  # --- load original font   -------------------------------------------------
+
+  def _get_fallback(self):
+    """ load original font (once) """
+
+    if isinstance(self._fallback,str):
+      try:
+        from adafruit_bitmap_font import bitmap_font
+        self._fallback = bitmap_font.load_font(self._fallback)
+      except:
+        self._fallback = None
+    return self._fallback
+
+  # --- drop glyphs   --------------------------------------------------------
+
+  def drop(self):
+    """ drop loaded glyphs and the original font (reloaded lazily) """
+
+    self._glyphs   = {}
+    self._fallback = self._bdf
+
+  # --- return glyph   -------------------------------------------------------
+
+  def get_glyph(self,code_point):
+    """ return glyph for code-point or None if not available """
+
+    if code_point not in self._glyphs:
+      self.load_glyphs(code_point)
+    return self._glyphs[code_point]
@@ -0,0 +1,168 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Persistent cache for the raw response of the data-provider.
+#
+# The response is streamed to a temporary file and renamed to the cache
+# file once it is complete. A digest of the streamed bytes tells if the
+# content changed since the last fetch. Metadata (digest, time of the
+# data, data-interval) is kept in a small sidecar file. The cached data is
+# fresh until the next data-interval starts (needs a synchronized clock,
+# otherwise the data is never fresh).
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import time
+from binascii import crc32
+
+class ResponseCache:
+  """ file-based cache for the last raw response """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,path,digest_from=None,debug=False):
+    """ constructor. Digest starts with the first occurence of digest_from """
+
+    self._debug       = debug
+    self._path        = path
+    self._tmp         = path + ".tmp"
+    self._meta        = path + ".meta"
+    self._digest_from = digest_from
+    self.digest       = None
+    self.data_ts      = 0               # time of data (UTC)
+    self.interval     = 0
+    self.enabled      = True
+
+    # create directory if necessary and check if we can write
+    if "/" in path:
+      try:
+        os.mkdir(path[:path.rfind("/")])
+      except:
+        pass
+    try:
+      with open(self._tmp,"wb"):
+        pass
+      os.remove(self._tmp)
+      self._read_meta()
+    except OSError:
+      self.msg(f"response-cache: {path} is not writable, cache disabled")
+      self.enabled = False
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- check for existing file   --------------------------------------------
+
+  def _exists(self,path):
+    """ check if file exists """
+    try:
+      os.stat(path)
+      return True
+    except OSError:
+      return False
+
+  # --- write-then-rename   --------------------------------------------------
+
+  def _rename(self,src,dest):
+    """ replace dest with src (FAT does not overwrite on rename) """
+    if self._exists(dest):
+      os.remove(dest)
+    os.rename(src,dest)
+
+  # --- read metadata   ------------------------------------------------------
+
+  def _read_meta(self):
+    """ read metadata from sidecar file """
+
+    try:
+      with open(self._meta,"r") as f:
+        meta = [int(v) for v in f.read().split()]
+      if len(meta) == 3 and self._exists(self._path):
+        self.digest,self.data_ts,self.interval = meta
+    except (OSError,ValueError):
+      pass                                # missing or corrupted
+
+  # --- write metadata   -----------------------------------------------------
+
+  def _write_meta(self):
+    """ write metadata to sidecar file """
+
+    with open(self._tmp,"w") as f:
+      f.write(f"{self.digest} {self.data_ts} {self.interval}\n")
+    self._rename(self._tmp,self._meta)
+
+  # --- check freshness   ----------------------------------------------------
+
+  def is_fresh(self):
+    """ check if the next data-interval has not started yet """
+
+    if not self.enabled or self.digest is None:
+      return False
+    age = time.time() - self.data_ts
+    return 0 <= age < self.interval
+
+  # --- set validity   -------------------------------------------------------
+
+  def set_validity(self,data_ts,interval):
+    """ set time (UTC) and interval of the cached data (taken from the
+        parsed data) """
+
+    if self.enabled and (data_ts,interval) != (self.data_ts,self.interval):
+      self.data_ts  = data_ts
+      self.interval = interval
+      self._write_meta()
+
+  # --- store response   -----------------------------------------------------
+
+  def store(self,chunks):
+    """ write chunks to cache. Return True if the content changed """
+
+    digest = 0
+    tail   = b""
+    active = self._digest_from is None
+    with open(self._tmp,"wb") as f:
+      for chunk in chunks:
+        f.write(chunk)
+        if active:
+          digest = crc32(chunk,digest)
+        else:
+          # search marker, also across chunk-boundaries
+          buf = tail + chunk
+          pos = buf.find(self._digest_from)
+          if pos < 0:
+            tail = buf[-len(self._digest_from)+1:]
+          else:
+            active = True
+            digest = crc32(buf[pos:],digest)
+
+    changed = digest != self.digest
+    if changed:
+      self._rename(self._tmp,self._path)
+    else:
+      os.remove(self._tmp)
+    self.msg(f"response-cache: digest {digest}, changed: {changed}")
+    self.digest  = digest
+    self._write_meta()
+    return changed
+
+  # --- read cached response   -----------------------------------------------
+
+  def get_chunks(self,chunk_size=1024):
+    """ yield cached response in chunks """
+
+    with open(self._path,"rb") as f:
+      while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+          break
+        yield chunk
@@ -0,0 +1,143 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# Adaptive update-scheduler.
+#
+# Open-Meteo publishes new data some time after the timestamp of the
+# data (current.time). The scheduler learns this publication-lag from
+# observations: new data seen at time t gives an upper bound
+# (lag <= t - update), and every fetch gives a lower bound since the next
+# slot is not published yet (lag > t - (update+interval)). Fetches are
+# scheduled just after the upper bound. While the bounds are far apart,
+# the scheduler probes the middle of the window (binary search over
+# cycles). The window slowly widens to follow drift. New data published
+# earlier than the window resets it. If the prediction fails (no new data
+# after the window), it falls back to bounded backoff.
+#
+# The clock is the monotonic clock, so lags contain a constant offset
+# between the clock and the timestamps of the data. Only integers are
+# used (floats of CircuitPython are too small for timestamps).
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import time
+
+class Scheduler:
+  """ predict publication of new data """
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,margin=30,retry=120,max_retry=900,drift=1,debug=False):
+    """ constructor. All times are in seconds """
+
+    self._debug      = debug
+    self.margin      = margin     # fetch this long after predicted lag
+    self.retry       = retry      # first backoff-interval
+    self.max_retry   = max_retry  # max backoff-interval
+    self.drift       = drift      # widening of the window per new update
+    self.lo          = None       # publication-lag is larger than lo
+    self.hi          = None       # publication-lag is at most hi
+    self.last_update = 0
+    self._retries    = 0
+    self._failed     = False
+
+  # --- print debug-message   ------------------------------------------------
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  # --- current time   -------------------------------------------------------
+
+  @staticmethod
+  def now():
+    """ monotonic time in seconds as integer """
+    return time.monotonic_ns() // 1000000000
+
+  # --- record observation   -------------------------------------------------
+
+  def _observe(self,update_ts,interval,now):
+    """ update bounds of the publication-lag, return True for new data """
+
+    changed = update_ts != self.last_update
+    if changed:
+      # new data: publication-lag of update_ts was at most now-update_ts
+      self.last_update = update_ts
+      self._retries    = 0
+      lag = now - update_ts
+      if self.lo is not None and lag <= self.lo:
+        # published earlier than learned (jitter): the window is wrong
+        self.msg("scheduler: observation outside window, reset")
+        self.lo = None
+        self.hi = lag
+      elif self.hi is None:
+        self.hi = lag
+      else:
+        self.hi  = min(self.hi,lag)
+        self.lo -= self.drift                 # re-probe from time to time
+    else:
+      self._retries += 1
+
+    # in any case: the next slot was not published at now-(update+interval)
+    lag = now - (update_ts+interval)
+    self.lo = lag if self.lo is None else max(self.lo,lag)
+    self._failed = self.lo >= self.hi
+    if self._failed:
+      # publication is later than predicted (jitter or drift)
+      self.msg("scheduler: prediction failed")
+      self.hi = self.lo + self.margin
+    return changed
+
+  # --- return delay until next fetch   --------------------------------------
+
+  def next_fetch(self,update_ts,interval,now=None):
+    """ record observation and return seconds until the next fetch """
+
+    if now is None:
+      now = Scheduler.now()
+    changed = self._observe(update_ts,interval,now)
+
+    if self._failed:
+      # missed: bounded backoff
+      delay = min(self.retry << max(0,self._retries-1),
+                  self.max_retry,interval)
+      self.msg(f"scheduler: backoff {delay}s")
+      return delay
+
+    if changed and self.hi-self.lo > 2*self.margin:
+      # probe the middle of the window
+      lag = (self.lo+self.hi)//2
+    else:
+      lag = self.hi + self.margin
+    delay = max(update_ts + interval + lag - now,self.margin)
+    self.msg(f"scheduler: lag in ({self.lo},{self.hi}], next fetch in {delay}s")
+    return delay
+
+  # --- persist state (deep-sleep)   -----------------------------------------
+
+  # The monotonic clock restarts after deep-sleep, so the bounds are
+  # saved relative to the expected wakeup-time (and to last_update, to
+  # keep the numbers small).
+
+  def export(self,wake):
+    """ return bounds relative to the wakeup-time (monotonic) """
+
+    offset = self.last_update - wake
+    return (None if self.lo is None else self.lo + offset,
+            None if self.hi is None else self.hi + offset)
+
+  def restore(self,last_update,lo,hi,now=None):
+    """ restore state after wakeup """
+
+    if now is None:
+      now = Scheduler.now()
+    offset = now - last_update
+    self.last_update = last_update
+    self.lo = None if lo is None else lo + offset
+    self.hi = None if hi is None else hi + offset
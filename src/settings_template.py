@@ -19,7 +19,12 @@ secrets.password  = 'my_secret_password'
 secrets.retry     = 2
 secrets.debugflag = False
 #secrets.channel   = 6           # optional
-#secrets.timeout   = 10          # optional
+#secrets.timeout   = 10          # optional: connect-timeout of the radio
+#secrets.read_timeout = 15       # optional: socket-timeout per attempt
+#secrets.deadline  = 60          # optional: total time for all attempts
+#secrets.attempts  = 3           # optional: max. number of attempts
+#secrets.dns_ttl   = 3600        # optional: cache dns-results (seconds)
+#secrets.ca_file   = "cert.pem"  # optional: additional CA, e.g. of a local server (CPython)
 
 # hardware configuration (optional)  -----------------------------------------
 
@@ -33,7 +38,12 @@ def _get_rtc():
   return None
 
 hw_config.DISPLAY  = _get_display
+#hw_config.HAL             = "headless"      # no window, needs numpy
+#hw_config.HEADLESS_SIZE   = (600,448)
+#hw_config.HEADLESS_EXPORT = "frames/frame-{n:04d}.png"   # or .bmp/.raw
 hw_config.get_rtc  = _get_rtc
+#hw_config.FULL_REFRESH_EVERY = 10   # full refresh after n partial refreshes (0: off)
+#hw_config.PARTIAL_MAX_AREA   = 0.5  # full refresh if more is changed (0: off)
 
 # changes to UI-defaults (see ui_settings.py for a list)   -------------------
 
@@ -46,6 +56,12 @@ ui_config.UI_DAYS = [
   "Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"
   ]
 ui_config.FOOTER = "Aktualisiert"
+#ui_config.STALE = "Alt"            # footer-banner if the update failed
+#ui_config.ERROR_TEXT = "No connection"  # error-screen without image
+#ui_config.LAYOUT_CACHE = None     # solve layout at every boot
+#ui_config.LAYOUTS = {             # replace layout-rules for a display-size
+#  "296x128": {"cur_temp": "((0.5,0),(b_width2+MARGIN,MARGIN))"}
+#  }
 
 # app configuration   --------------------------------------------------------
 
@@ -53,6 +69,22 @@ app_config = Settings()
 app_config.longitude = 13.4105
 app_config.latitude  = 52.5244
 app_config.debug = False
+# render gateway (tools/gateway.py): fetch the locations of all panels in
+# batches (OpenMeteoBatchProvider), one request per batch of locations
+#app_config.locations  = [(52.5244,13.4105),(48.1374,11.5755)]
+#app_config.batch_size = 50
+# thin client: fetch a rendered screen from tools/gateway.py
+#app_config.gateway_url  = "http://192.168.1.10:8080/v1/screen"
+#app_config.gateway_file = "cache/screen.bmp"    # None: keep bitmap in RAM
+#app_config.stream_json = True      # parse response while streaming (default)
+#app_config.cache_file  = "cache/openmeteo.json"  # None: no response-cache
+#app_config.use_asyncio = False     # asyncio main-loop (fetch, LED, keys)
+#app_config.deep_sleep  = False     # deep-sleep between updates
+#app_config.update_margin = 30      # fetch this long after predicted update
+#app_config.retry_interval = 120    # retry after a failed update (seconds)
+#app_config.api_url = "http://localhost:8081"  # Open-Meteo stand-in server
+#app_config.metrics_size = 32       # records of per-cycle metrics (RAM)
+#app_config.metrics_file = None     # append metrics as CSV (writable flash)
 
 # all settings   -------------------------------------------------------------
 
@@ -0,0 +1,85 @@
+# -------------------------------------------------------------------------
+# Display weather-data (current and forecast) on an ACEP e-paper display.
+#
+# State that survives deep-sleep.
+#
+# The state is a compact versioned record at the start of sleep-memory
+# (alarm.sleep_memory or the file-backed stand-in of the pygame-HAL).
+# Memory with an unknown magic or version (e.g. after power-on) is
+# ignored, so a cold start just uses the defaults.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import struct
+
+class SleepState:
+  """ scheduler-state persisted in sleep-memory """
+
+  # magic, version, last_update, interval, wakeups, lag_lo, lag_hi,
+  # fingerprint, skipped
+  FORMAT  = "<2sBIHHiiIH"
+  MAGIC   = b"EW"
+  VERSION = 3
+  UNKNOWN = -0x80000000       # marker for lag_lo/lag_hi == None
+
+  # --- constructor   --------------------------------------------------------
+
+  def __init__(self,memory):
+    """ constructor: memory is a bytearray-like object (or None) """
+
+    self._memory     = memory
+    self.last_update = 0        # update_ts of the last shown data
+    self.interval    = 0        # last sleep-interval (seconds)
+    self.wakeups     = 0        # number of wakeups since cold start
+    self.lag_lo      = None     # window of the publication-lag (scheduler)
+    self.lag_hi      = None
+    self.fingerprint = None     # checksum of displayed content
+    self.skipped     = 0        # number of skipped refreshes
+
+  # --- read state   ---------------------------------------------------------
+
+  def load(self):
+    """ read state, return False if sleep-memory has no valid record """
+
+    size = struct.calcsize(SleepState.FORMAT)
+    if not self._memory or len(self._memory) < size:
+      return False
+    (magic,version,last_update,interval,
+     wakeups,lag_lo,lag_hi,
+     fingerprint,skipped) = struct.unpack(SleepState.FORMAT,
+                                          bytes(self._memory[0:size]))
+    if magic != SleepState.MAGIC or version != SleepState.VERSION:
+      return False
+    self.last_update = last_update
+    self.interval    = interval
+    self.wakeups     = wakeups
+    self.lag_lo = None if lag_lo == SleepState.UNKNOWN else lag_lo
+    self.lag_hi = None if lag_hi == SleepState.UNKNOWN else lag_hi
+    self.fingerprint = fingerprint if fingerprint else None
+    self.skipped     = skipped
+    return True
+
+  # --- pack optional value   ------------------------------------------------
+
+  def _value(self,value):
+    """ map None to marker """
+    return SleepState.UNKNOWN if value is None else value
+
+  # --- write state   --------------------------------------------------------
+
+  def save(self):
+    """ write state to sleep-memory """
+
+    if not self._memory:
+      return
+    record = struct.pack(SleepState.FORMAT,SleepState.MAGIC,
+                         SleepState.VERSION,self.last_update,
+                         min(self.interval,0xFFFF),self.wakeups & 0xFFFF,
+                         self._value(self.lag_lo),self._value(self.lag_hi),
+                         self.fingerprint or 0,self.skipped & 0xFFFF)
+    self._memory[0:len(record)] = record
@@ -57,6 +57,9 @@ UI_SETTINGS.FOREGROUND = COLORS.BLACK
 UI_SETTINGS.BACKGROUND = COLORS.WHITE
 UI_SETTINGS.NO_NETWORK = "images/no-server-connection.bmp"
 UI_SETTINGS.NO_EVENTS  = "images/empty-agenda.bmp"
+UI_SETTINGS.ICON_SHEET = "images/icons.bmp"      # see tools/build_icons.py
+UI_SETTINGS.LAYOUT_CACHE = "cache/layout.json"   # None: solve at every boot
+UI_SETTINGS.LAYOUTS    = {}                      # "WxH": {rule: expression}
 
 UI_SETTINGS.UI_MONTHS = [
   "January", "February", "March",     "April",   "May",      "June",
@@ -66,6 +69,8 @@ UI_SETTINGS.UI_DAYS = [
   "Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"
   ]
 UI_SETTINGS.FOOTER = "Updated"
+UI_SETTINGS.STALE  = "Stale"                    # footer-banner: stale data
+UI_SETTINGS.ERROR_TEXT = "No connection"        # if NO_NETWORK is missing
 
 # overrides from settings
 
@@ -10,11 +10,11 @@
 
 import board
 import time
-import socketpool
-import ssl
-import adafruit_requests
+import adafruit_connection_manager
 
 from settings import secrets
+from fetch_policy import FetchPolicy, HTTPError
+from connection_manager import SessionManager
 
 class WifiHelper:
   """ Wifi-Helper for MCU with integrated wifi """
@@ -26,10 +26,18 @@ class WifiHelper:
 
     self._debug = debug
     self._wifi = None
+    self._session = None
+    self.rx_bytes = 0                 # response-bytes (cumulative)
     if not hasattr(secrets,'channel'):
       secrets.channel = 0
     if not hasattr(secrets,'timeout'):
       secrets.timeout = None
+    self.policy = FetchPolicy(
+      deadline        = getattr(secrets,'deadline',60),
+      connect_timeout = secrets.timeout,
+      read_timeout    = getattr(secrets,'read_timeout',15),
+      max_attempts    = getattr(secrets,'attempts',3),
+      debug=debug)
 
   # --- print debug-message   ------------------------------------------------
 
@@ -52,7 +60,7 @@ class WifiHelper:
         wifi.radio.connect(secrets.ssid,
                           secrets.password,
                            channel = secrets.channel,
-                           timeout = secrets.timeout
+                           timeout = self.policy.connect_timeout
                            )
         break
       except:
@@ -63,8 +71,22 @@ class WifiHelper:
         time.sleep(1)
         continue
     self.msg("connected to %s" % secrets.ssid)
-    pool = socketpool.SocketPool(wifi.radio)
-    self._requests = adafruit_requests.Session(pool,ssl.create_default_context())
+    if self._session:
+      # radio was down: sockets are stale, but pool, ssl-context and
+      # dns-cache are still valid
+      self._session.close_all()
+    else:
+      self._session = SessionManager(
+        adafruit_connection_manager.get_radio_socketpool(wifi.radio),
+        adafruit_connection_manager.get_radio_ssl_context(wifi.radio),
+        dns_ttl=getattr(secrets,'dns_ttl',3600),debug=self._debug)
+
+  # --- timings of last request   ------------------------------------------
+
+  @property
+  def stats(self):
+    """ return connection-statistics """
+    return self._session.stats if self._session else None
 
   # --- return implementing wifi   -----------------------------------------
 
@@ -73,11 +95,48 @@ class WifiHelper:
     """ return wifi """
     return self._wifi
 
+  # --- execute fetch with retries   ----------------------------------------
+
+  def fetch(self,fetch):
+    """ run fetch() (using get_json/get_chunks) with the fetch-policy """
+    return self.policy.run(fetch)
+
+  # --- execute get-request and check status   ------------------------------
+
+  def _get(self,url):
+    """ process get-request, raise HTTPError for status >= 400 """
+
+    if not self._wifi or not self._wifi.radio.connected:
+      self.connect()
+    response = self._session.get(url,timeout=self.policy.timeout)
+    if response.status_code >= 400:
+      response.close()
+      raise HTTPError(response.status_code,response.reason)
+    return response
+
   # --- execute get-request   -----------------------------------------------
 
   def get_json(self,url):
     """ process get-request """
 
-    if not self._wifi or not self._wifi.radio.connected:
-      self.connect()
-    return self._requests.get(url).json()
+    response = self._get(url)
+    self.rx_bytes += int(response.headers.get("content-length",0))
+    try:
+      return response.json()
+    finally:
+      response.close()
+      self._session.done()
+
+  # --- execute get-request and return body in chunks   ---------------------
+
+  def get_chunks(self,url,chunk_size=1024):
+    """ process get-request, yield the response-body in chunks """
+
+    response = self._get(url)
+    try:
+      for chunk in response.iter_content(chunk_size=chunk_size):
+        self.rx_bytes += len(chunk)
+        yield chunk
+    finally:
+      response.close()
+      self._session.done()
@@ -10,7 +10,13 @@
 
 import socket
 import ssl
-import adafruit_requests
+
+from fetch_policy import FetchPolicy, HTTPError
+from connection_manager import SessionManager
+try:
+  from settings import secrets
+except:
+  secrets = None
 
 class WifiHelper:
   """ request-implementation using sockets from CPython """
@@ -19,17 +25,62 @@ class WifiHelper:
     """ constructor """
     self._debug = debug
     self._http = None
+    self.rx_bytes = 0                 # response-bytes (cumulative)
+    self.policy = FetchPolicy(
+      deadline        = getattr(secrets,'deadline',60),
+      read_timeout    = getattr(secrets,'read_timeout',15),
+      max_attempts    = getattr(secrets,'attempts',3),
+      debug=debug)
 
   def connect(self):
-    self._http = adafruit_requests.Session(socket,ssl.create_default_context())
+    # ca_file: additional certificate, e.g. of a local server
+    # (tools/openmeteo_server.py). The system certificates stay trusted
+    context = ssl.create_default_context()
+    ca_file = getattr(secrets,'ca_file',None)
+    if ca_file:
+      context.load_verify_locations(cafile=ca_file)
+    self._http = SessionManager(socket,context,
+                                dns_ttl=getattr(secrets,'dns_ttl',3600),
+                                debug=self._debug)
 
-  def get_json(self,url):
+  def fetch(self,fetch):
+    """ run fetch() (using get_json/get_chunks) with the fetch-policy """
+    return self.policy.run(fetch)
+
+  def _get(self,url):
+    """ process get-request, raise HTTPError for status >= 400 """
     if not self._http:
       self.connect()
-    response = self._http.get(url)
-    result = response.json()
-    response.close()
-    return result
+    response = self._http.get(url,timeout=self.policy.timeout)
+    if response.status_code >= 400:
+      response.close()
+      raise HTTPError(response.status_code,response.reason)
+    return response
+
+  def get_json(self,url):
+    response = self._get(url)
+    self.rx_bytes += int(response.headers.get("content-length",0))
+    try:
+      return response.json()
+    finally:
+      response.close()
+      self._http.done()
+
+  def get_chunks(self,url,chunk_size=1024):
+    """ process get-request, yield the response-body in chunks """
+    response = self._get(url)
+    try:
+      for chunk in response.iter_content(chunk_size=chunk_size):
+        self.rx_bytes += len(chunk)
+        yield chunk
+    finally:
+      response.close()
+      self._http.done()
+
+  @property
+  def stats(self):
+    """ return connection-statistics """
+    return self._http.stats if self._http else None
 
   @property
   def wifi(self):
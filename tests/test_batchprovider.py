@@ -0,0 +1,128 @@
+# -------------------------------------------------------------------------
+# Tests for src/openmeteo_batchprovider.py with the multi-location fixture
+# tools/fixtures/batch-3.json (complete response including the daily block)
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import math
+import types
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+# the providers read app_config from settings.py
+class Settings:
+  pass
+
+settings = types.ModuleType("settings")
+settings.app_config = Settings()
+settings.app_config.latitude  = 52.52
+settings.app_config.longitude = 13.41
+settings.secrets = Settings()
+sys.modules.setdefault("settings",settings)
+
+from openmeteo_batchprovider import OpenMeteoBatchProvider
+
+FIXTURE = os.path.join(os.path.dirname(__file__),"..","tools","fixtures",
+                       "batch-3.json")
+LOCATIONS = [(52.52,13.41),(48.14,11.58),(53.55,9.99)]
+
+# fields of OpenMeteoUIProvider
+FIELDS = ["current.temp","current.wind_speed","current.wind_dir",
+          "hours.temp","hours.wmo","hours.is_day",
+          "days.wmo","days.tmin","days.tmax","days.sun_hours",
+          "days.prec_hours"]
+
+class StubWifi:
+  """ wifi-helper returning the fixture """
+
+  def __init__(self,response,chunk_size):
+    self._response  = response
+    self._chunk_size = chunk_size
+    self.urls = []
+
+  def fetch(self,fetch):
+    return fetch()
+
+  def get_json(self,url):
+    self.urls.append(url)
+    return json.loads(self._response)
+
+  def get_chunks(self,url):
+    self.urls.append(url)
+    for i in range(0,len(self._response),self._chunk_size):
+      yield self._response[i:i+self._chunk_size]
+
+def rounded(value):
+  """ round half away from zero (like the data-provider) """
+  return int(math.copysign(math.floor(abs(value)+0.5),value))
+
+@pytest.fixture(scope="module")
+def response():
+  with open(FIXTURE,"rb") as f:
+    return f.read()
+
+def update(response,fields,stream=True,chunk_size=1024):
+  """ return models of all locations and the urls of the requests """
+
+  settings.app_config.stream_json = stream
+  provider = OpenMeteoBatchProvider(locations=LOCATIONS,fields=fields,
+                                    batch_size=len(LOCATIONS))
+  wifi = StubWifi(response,chunk_size)
+  provider.set_wifi(wifi)
+  data = {}
+  provider.update_data(data)
+  return data["locations"],wifi.urls
+
+def test_shape(response):
+  """ the fixture has the shape of a multi-location response """
+
+  locations = json.loads(response)
+  assert len(locations) == len(LOCATIONS)
+  assert "location_id" not in locations[0]
+  for i,location in enumerate(locations):
+    assert location.get("location_id",0) == i
+    for block in ["current","hourly","daily"]:
+      assert set(location[block]) == set(location[block+"_units"])
+    assert len(location["daily"]["time"]) == 6
+
+@pytest.mark.parametrize("stream,chunk_size",[(True,1),(True,1024),
+                                              (False,0)])
+def test_daily(response,stream,chunk_size):
+  """ without hourly temperatures, min/max are taken from the daily block """
+
+  fields = [f for f in FIELDS if f != "hours.temp"]
+  models,urls = update(response,fields,stream,chunk_size or 1)
+  assert len(urls) == 1 and "&daily=" in urls[0]
+
+  for model,location in zip(models,json.loads(response)):
+    daily = location["daily"]
+    assert len(model["days"]) == 4
+    for day in model["days"]:
+      i = daily["time"].index(f"2024-{day.month}-{day.day}")
+      assert day.tmin == rounded(daily["temperature_2m_min"][i])
+      assert day.tmax == rounded(daily["temperature_2m_max"][i])
+    assert model["current"].temp is not None
+
+def test_minimized(response):
+  """ the minimized query skips the daily block of the response """
+
+  models,urls = update(response,FIELDS)
+  assert "&daily=" not in urls[0]
+  for model,location in zip(models,json.loads(response)):
+    hourly = location["hourly"]
+    for day in model["days"]:
+      date  = f"2024-{day.month}-{day.day}"
+      temps = [t for tm,t in zip(hourly["time"],hourly["temperature_2m"])
+               if tm.startswith(date)]
+      assert len(temps) == 24
+      assert day.tmin == rounded(min(temps))
+      assert day.tmax == rounded(max(temps))
@@ -0,0 +1,115 @@
+# -------------------------------------------------------------------------
+# Tests for src/fetch_policy.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+import fetch_policy
+from fetch_policy import FetchPolicy, HTTPError
+
+class Clock:
+  """ simulated time: sleep advances the clock """
+  def __init__(self):
+    self.now = 1000.0
+  def monotonic(self):
+    return self.now
+  def sleep(self,seconds):
+    self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+  clock = Clock()
+  monkeypatch.setattr(fetch_policy.time,"monotonic",clock.monotonic)
+  monkeypatch.setattr(fetch_policy.time,"sleep",clock.sleep)
+  return clock
+
+def failing(policy,clock,ex,calls):
+  """ fetch that times out after the socket-timeout of the policy """
+  def fetch():
+    calls.append(clock.now)
+    clock.sleep(policy.timeout)
+    raise ex
+  return fetch
+
+@pytest.mark.parametrize("deadline",[5,20,60])
+def test_deadline(clock,deadline):
+  """ retries, backoff and timeouts stay within the deadline """
+
+  policy = FetchPolicy(deadline=deadline,read_timeout=15,max_attempts=10,
+                       backoff=1.0,max_backoff=16.0)
+  calls = []
+  start = clock.now
+  with pytest.raises(TimeoutError):
+    policy.run(failing(policy,clock,TimeoutError("timeout"),calls))
+  assert clock.now - start <= deadline
+  assert policy.stats.duration == clock.now - start
+  assert policy.stats.attempts == len(calls)
+  assert policy.stats.retries == len(calls) - 1
+  assert policy.stats.failures == 1
+
+def test_success_after_retry(clock):
+  """ transport errors are retried """
+
+  results = [OSError(104,"reset"),EOFError("incomplete JSON"),"data"]
+  def fetch():
+    result = results.pop(0)
+    if isinstance(result,Exception):
+      raise result
+    return result
+
+  policy = FetchPolicy(max_attempts=3)
+  assert policy.run(fetch) == "data"
+  assert policy.stats.attempts == 3
+  assert policy.stats.failures == 0
+  assert 0 < policy.stats.backoff <= 1.0 + 2.0
+
+@pytest.mark.parametrize("ex",[KeyError("current"),ValueError("bad"),
+                               TypeError("bug"),HTTPError(404,b"Not Found"),
+                               HTTPError(400,"Bad Request")])
+def test_no_retry(clock,ex):
+  """ parse-errors (bugs) and client-errors are not retried """
+
+  policy = FetchPolicy(max_attempts=5)
+  calls  = []
+  with pytest.raises(type(ex)):
+    policy.run(failing(policy,clock,ex,calls))
+  assert len(calls) == 1
+  assert policy.stats.retries == 0
+  assert policy.stats.backoff == 0
+  assert policy.stats.last_error is ex
+
+@pytest.mark.parametrize("status",[408,429,500,503])
+def test_retry_http(clock,status):
+  """ timeouts, rate-limits and server-errors are retried """
+
+  policy = FetchPolicy(max_attempts=3,deadline=600)
+  calls  = []
+  with pytest.raises(HTTPError):
+    policy.run(failing(policy,clock,HTTPError(status),calls))
+  assert len(calls) == 3
+
+def test_timeout(clock):
+  """ the socket-timeout is bounded by the remaining time """
+
+  policy = FetchPolicy(deadline=20,read_timeout=15,backoff=1.0,jitter=0)
+  assert policy.timeout == 15
+  timeouts = []
+  def fetch():
+    timeouts.append(policy.timeout)
+    if len(timeouts) == 1:
+      clock.sleep(12)
+      raise OSError(110,"timeout")
+    return True
+  assert policy.run(fetch)
+  assert timeouts == [15,20-12-1]
+  assert policy.remaining() == 20                  # no run active
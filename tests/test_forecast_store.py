@@ -0,0 +1,105 @@
+# -------------------------------------------------------------------------
+# Tests for src/forecast_store.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+from forecast_store import ForecastStore, Series
+
+HOURLY = {
+  "time":           ["2024-02-28T22:00","2024-02-28T23:00",
+                     "2024-02-29T00:00","2024-02-29T01:00"],
+  "is_day":         [0,0,0,1],
+  "weathercode":    [3,61,95,255],
+  "temperature_2m": [-12.34,0.06,21.5,None],
+  "precipitation":  [0.0,1.2,3276.7,0.1]
+  }
+
+def make_store(n=4):
+  store = ForecastStore(list(HOURLY.keys()),n)
+  store.fill(HOURLY)
+  return store
+
+def test_index_from_midnight():
+  """ series are indexed by hour since midnight of the first day """
+
+  store = make_store()
+  assert store.start == (2024,2,28,22)
+  assert store["weathercode"][22] == 3
+  assert store["weathercode"][25] == 255
+  assert store["temperature_2m"][22] == pytest.approx(-12.3)
+  assert store["temperature_2m"][23] == pytest.approx(0.1)
+  assert store["temperature_2m"][25] == 0         # null
+  assert store.date(24) == (2024,2,29)
+
+def test_out_of_range():
+  """ hours outside of the series raise IndexError (no wrap-around) """
+
+  store = make_store()
+  series = store["temperature_2m"]
+  with pytest.raises(IndexError):
+    series[21]
+  with pytest.raises(IndexError):
+    series[-1]
+  with pytest.raises(IndexError):
+    series[26]
+
+def test_series_scale():
+  """ floats are stored as scaled integers """
+
+  series = Series("h",10,2,5)
+  series.put(0,-3.14)
+  series.put(1,None)
+  assert list(series.values) == [-31,0]
+  assert series[5] == pytest.approx(-3.1)
+  assert len(series) == 2
+
+def test_put_ignores_excess():
+  """ values after n hours are dropped """
+
+  store = ForecastStore(["weathercode"],2)
+  store.put("time",0,"2024-01-01T05:00")
+  for i,code in enumerate([1,2,3]):
+    store.put("weathercode",i,code)
+  assert list(store["weathercode"].values) == [1,2]
+  assert "is_day" not in store
+  assert store.get("is_day") is None
+
+def test_round_trip():
+  """ save/load of the raw buffers gives the identical store """
+
+  store  = make_store()
+  stream = io.BytesIO()
+  store.save(stream)
+  assert len(stream.getvalue()) == store.size
+
+  stream.seek(0)
+  copy = ForecastStore.load(stream)
+  assert copy.start == store.start
+  assert copy.size == store.size
+  for var,typecode,_ in ForecastStore.LAYOUT:
+    assert copy[var].values.typecode == typecode
+    assert copy[var].values == store[var].values
+    assert [copy[var][h] for h in range(22,26)] == \
+           [store[var][h] for h in range(22,26)]
+
+def test_load_invalid():
+  """ wrong version or truncated header: no store """
+
+  stream = io.BytesIO()
+  make_store().save(stream)
+  data = bytearray(stream.getvalue())
+  assert ForecastStore.load(io.BytesIO(data[:3])) is None
+  data[0] = ForecastStore.VERSION + 1
+  assert ForecastStore.load(io.BytesIO(bytes(data))) is None
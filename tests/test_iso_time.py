@@ -0,0 +1,76 @@
+# -------------------------------------------------------------------------
+# Tests for src/iso_time.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+import calendar
+import datetime
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+import iso_time
+
+EPOCH = datetime.date(1970,1,1).toordinal()
+
+@pytest.mark.parametrize("y",[1900,1970,1999,2000,2023,2024,2100,2400])
+def test_month_ends(y):
+  """ first and last day of every month (leap years: 2000, 2024, 2400) """
+
+  for m in range(1,13):
+    last = calendar.monthrange(y,m)[1]
+    for d in (1,last):
+      days = datetime.date(y,m,d).toordinal() - EPOCH
+      assert iso_time.days_from_civil(y,m,d) == days
+      assert iso_time.civil_from_days(days) == (y,m,d)
+    # the day after the last day is the first of the next month
+    next_day = iso_time.add_days(y,m,last,1)
+    assert next_day == ((y,m+1,1) if m < 12 else (y+1,1,1))
+
+def test_leap_days():
+  """ 29th of February only exists in leap years """
+
+  assert iso_time.add_days(2024,2,28,1) == (2024,2,29)
+  assert iso_time.add_days(2023,2,28,1) == (2023,3,1)
+  assert iso_time.add_days(1900,2,28,1) == (1900,3,1)   # not divisible by 400
+  assert iso_time.add_days(2000,2,28,1) == (2000,2,29)
+  assert iso_time.add_days(2024,3,1,-1) == (2024,2,29)
+  assert iso_time.add_days(2024,1,1,366) == (2025,1,1)
+
+def test_epoch():
+  """ day zero and days before it """
+
+  assert iso_time.days_from_civil(1970,1,1) == 0
+  assert iso_time.civil_from_days(0) == (1970,1,1)
+  assert iso_time.civil_from_days(-1) == (1969,12,31)
+  assert iso_time.weekday(1970,1,1) == 3                # Thursday
+
+def test_round_trip():
+  """ civil_from_days is the inverse of days_from_civil """
+
+  for z in range(-800000,800000,97):
+    assert iso_time.days_from_civil(*iso_time.civil_from_days(z)) == z
+
+def test_weekday():
+  """ weekday matches the standard library """
+
+  for days in range(0,20000,13):
+    date = datetime.date.fromordinal(EPOCH+days)
+    assert iso_time.weekday(date.year,date.month,date.day) == date.weekday()
+
+@pytest.mark.parametrize("buf",["2024-02-29T23:45",b"2024-02-29T23:45",
+                                memoryview(b"2024-02-29T23:45")])
+def test_parse(buf):
+  """ parse str, bytes and memoryview """
+
+  assert iso_time.parse(buf) == (2024,2,29,23,45)
+  assert iso_time.parse(buf[:10]) == (2024,2,29,0,0)
+  assert iso_time.to_seconds(iso_time.parse(buf)) == calendar.timegm(
+    (2024,2,29,23,45,0))
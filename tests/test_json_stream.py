@@ -0,0 +1,99 @@
+# -------------------------------------------------------------------------
+# Tests for src/json_stream.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+from json_stream import JsonStream
+
+DOC = (b'{"latitude": 52.52, "utc_offset_seconds": -3600,'
+       b' "current": {"time": 1700000000, "is_day": true, "rain": null},'
+       b' "hourly_units": {"temperature_2m": "\\u00b0C"},'
+       b' "hourly": {"time": [1700000000, 1700003600, 1700007200],'
+       b' "temperature_2m": [-1.5, 2.0e1, 3],'
+       b' "weather_code": [0, 61, 95]},'
+       b' "text": "a \\"quoted\\" word", "empty": [], "flag": false}')
+
+def parse(doc,size,**kwargs):
+  """ feed doc in chunks of the given size, return parser """
+
+  parser = JsonStream(**kwargs)
+  for i in range(0,len(doc),size):
+    parser.feed(doc[i:i+size])
+  parser.feed(b"",final=True)
+  return parser
+
+def test_full_model():
+  """ without selection, all scalars are stored (arrays as dicts) """
+
+  result = parse(DOC,1024).result
+  assert result["latitude"] == 52.52
+  assert result["utc_offset_seconds"] == -3600
+  assert result["current"] == {"time": 1700000000, "is_day": True,
+                               "rain": None}
+  assert result["hourly_units"]["temperature_2m"] == "°C"
+  assert result["hourly"]["temperature_2m"] == {0: -1.5, 1: 20.0, 2: 3}
+  assert result["text"] == 'a "quoted" word'
+  assert result["flag"] is False
+  assert "empty" not in result
+
+@pytest.mark.parametrize("size",[1,7])
+def test_chunk_boundaries(size):
+  """ every chunk size gives the identical model """
+
+  assert parse(DOC,size).result == parse(DOC,1024).result
+
+def test_select_paths():
+  """ only selected values are passed, arrays are addressed by index """
+
+  seen = []
+  def select(path):
+    return path[0] == "hourly" and (path[1] == "weather_code" or
+                                    path[1] == "time" and path[2] == 1)
+  parse(DOC,7,select=select,
+        on_value=lambda path,value: seen.append((tuple(path),value)))
+  assert seen == [(("hourly","time",1),1700003600),
+                  (("hourly","weather_code",0),0),
+                  (("hourly","weather_code",1),61),
+                  (("hourly","weather_code",2),95)]
+
+@pytest.mark.parametrize("size",[1,7,1024])
+def test_raw_strings(size):
+  """ raw strings are memoryviews, escaped strings are decoded """
+
+  seen = {}
+  def on_value(path,value):
+    if isinstance(value,memoryview):
+      value = ("raw",bytes(value))        # only valid during the call
+    seen[path[-1]] = value
+  parse(DOC,size,raw_strings=True,
+        select=lambda path: path[-1] in ("temperature_2m","text"),
+        on_value=on_value)
+  assert seen["text"] == 'a "quoted" word'
+  assert seen["temperature_2m"] == "°C"
+
+  seen.clear()
+  parse(b'{"a": "plain", "b": "x"}',size,raw_strings=True,
+        on_value=on_value)
+  assert seen == {"a": ("raw",b"plain"), "b": ("raw",b"x")}
+
+def test_size():
+  """ size counts the consumed bytes """
+  assert parse(DOC,7).size == len(DOC)
+
+@pytest.mark.parametrize("cut",[5,30,len(DOC)-30,len(DOC)-1])
+def test_truncated(cut):
+  """ a truncated document raises EOFError """
+
+  with pytest.raises(EOFError):
+    parse(DOC[:cut],7)
@@ -0,0 +1,100 @@
+# -------------------------------------------------------------------------
+# Tests for src/response_cache.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+from response_cache import ResponseCache
+
+MARKER = b'"current_units"'
+
+def response(generationtime,temp):
+  """ response split into chunks, the marker crosses a chunk-boundary """
+  data = (b'{"generationtime_ms":%f,"current_units":{},"current":{"t":%d}}'
+          % (generationtime,temp))
+  return [data[i:i+5] for i in range(0,len(data),5)]
+
+def test_unchanged(tmp_path):
+  """ same data after the marker: no change, cache file is kept """
+
+  path  = str(tmp_path / "cache" / "response.json")
+  cache = ResponseCache(path,digest_from=MARKER)
+  assert cache.enabled
+  assert cache.store(response(0.5,20))
+  mtime = os.stat(path).st_mtime_ns
+  content = b"".join(cache.get_chunks(7))
+  assert content == b"".join(response(0.5,20))
+
+  time.sleep(0.01)
+  assert not cache.store(response(0.9,20))     # only the prefix differs
+  assert os.stat(path).st_mtime_ns == mtime
+  assert not os.path.exists(path+".tmp")
+  assert b"".join(cache.get_chunks()) == content
+
+  assert cache.store(response(0.9,21))
+  assert b"".join(cache.get_chunks()) == b"".join(response(0.9,21))
+
+def test_digest_persists(tmp_path):
+  """ the digest survives a restart (deep-sleep) """
+
+  path = str(tmp_path / "response.json")
+  ResponseCache(path,digest_from=MARKER).store(response(0.5,20))
+  cache = ResponseCache(path,digest_from=MARKER)
+  assert cache.digest is not None
+  assert not cache.store(response(0.7,20))
+
+def test_freshness(tmp_path):
+  """ fresh until the next data-interval starts """
+
+  path  = str(tmp_path / "response.json")
+  cache = ResponseCache(path)
+  assert not cache.is_fresh()                  # no data yet
+  cache.store(response(0.5,20))
+  now = int(time.time())
+  cache.set_validity(now-100,900)
+  assert cache.is_fresh()
+  assert ResponseCache(path).is_fresh()        # from .meta
+  cache.set_validity(now-900,900)
+  assert not cache.is_fresh()
+  cache.set_validity(now+100,900)              # clock not synchronized
+  assert not cache.is_fresh()
+
+def test_corrupted_meta(tmp_path):
+  """ a corrupted .meta file is ignored: nothing is fresh or unchanged """
+
+  path = str(tmp_path / "response.json")
+  cache = ResponseCache(path)
+  cache.store(response(0.5,20))
+  cache.set_validity(int(time.time()),900)
+
+  for meta in ["", "garbage\n", "1 2\n", "123 456 x\n", "1 2 3 4\n"]:
+    with open(path+".meta","w") as f:
+      f.write(meta)
+    cache = ResponseCache(path)
+    assert cache.enabled
+    assert cache.digest is None
+    assert (cache.data_ts,cache.interval) == (0,0)
+    assert not cache.is_fresh()
+
+  assert cache.store(response(0.5,20))         # treated as new data
+  assert ResponseCache(path).digest == cache.digest
+
+def test_missing_response(tmp_path):
+  """ metadata without the cached response is ignored """
+
+  path = str(tmp_path / "response.json")
+  cache = ResponseCache(path)
+  cache.store(response(0.5,20))
+  cache.set_validity(int(time.time()),900)
+  os.remove(path)
+  assert ResponseCache(path).digest is None
@@ -0,0 +1,39 @@
+# -------------------------------------------------------------------------
+# Tests for src/scheduler.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+from scheduler import Scheduler
+
+U = 1000000
+
+def test_early_publication_resets_window():
+  """ new data earlier than the learned window: no backoff, no crash """
+
+  s = Scheduler()
+  s.next_fetch(U,900,now=U+700)
+  s.next_fetch(U,900,now=U+1150)           # not published yet: lo=250
+  delay = s.next_fetch(U+900,900,now=U+1000)  # published after 100s
+  assert s.lo < s.hi == 100
+  # no backoff: probe the middle of the new window (lo=-800, hi=100)
+  assert delay == U+900+900 + (-800+100)//2 - (U+1000)
+
+def test_failed_prediction_backs_off():
+  """ no new data after the window: bounded exponential backoff """
+
+  s = Scheduler(retry=120,max_retry=900)
+  s.next_fetch(U,900,now=U+100)            # published after 100s
+  assert s.next_fetch(U,900,now=U+1100) == 120
+  assert s.next_fetch(U,900,now=U+1220) == 240
+  assert s.next_fetch(U,900,now=U+1460) == 480
+  assert s.next_fetch(U,900,now=U+1940) == 900
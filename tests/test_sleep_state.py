@@ -0,0 +1,80 @@
+# -------------------------------------------------------------------------
+# Tests for src/sleep_state.py
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import os
+import sys
+import struct
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__),"..","src"))
+
+from sleep_state import SleepState
+
+def saved(memory,**values):
+  """ save state with the given values """
+
+  state = SleepState(memory)
+  for key,value in values.items():
+    setattr(state,key,value)
+  state.save()
+  return state
+
+def test_format():
+  """ layout of version 3 """
+
+  assert SleepState.FORMAT == "<2sBIHHiiIH"
+  assert SleepState.VERSION == 3
+  assert struct.calcsize(SleepState.FORMAT) == 25
+
+def test_round_trip():
+  """ all fields survive save/load """
+
+  memory = bytearray(256)
+  saved(memory,last_update=1700000000,interval=900,wakeups=42,
+        lag_lo=-350,lag_hi=100,fingerprint=0xDEADBEEF,skipped=7)
+  assert memory[:3] == b"EW\x03"
+  assert not any(memory[25:])                 # rest is untouched
+
+  state = SleepState(memory)
+  assert state.load()
+  assert (state.last_update,state.interval,state.wakeups) == (
+    1700000000,900,42)
+  assert (state.lag_lo,state.lag_hi) == (-350,100)
+  assert state.fingerprint == 0xDEADBEEF
+  assert state.skipped == 7
+
+def test_defaults():
+  """ unknown values and clamping """
+
+  memory = bytearray(32)
+  saved(memory,interval=100000,wakeups=0x10001,skipped=0x10002)
+  state = SleepState(memory)
+  assert state.load()
+  assert state.lag_lo is None and state.lag_hi is None
+  assert state.fingerprint is None
+  assert state.interval == 0xFFFF
+  assert (state.wakeups,state.skipped) == (1,2)
+
+def test_reject():
+  """ cold start, other magic or version: keep the defaults """
+
+  memory = bytearray(32)
+  saved(memory,last_update=1700000000,wakeups=5)
+
+  for offset,value in [(0,ord("X")),(2,2),(2,4)]:
+    copy = bytearray(memory)
+    copy[offset] = value
+    state = SleepState(copy)
+    assert not state.load()
+    assert (state.last_update,state.wakeups) == (0,0)
+
+  assert not SleepState(bytearray(32)).load()     # power-on
+  assert not SleepState(memory[:24]).load()       # too small
+  assert not SleepState(None).load()
+  SleepState(None).save()                         # no sleep-memory: noop
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -------------------------------------------------------------------------
+# Benchmark suite: time the hot paths with recorded Open-Meteo responses.
+#
+# The responses in tools/fixtures (openmeteo-HH.json, HH is the hour of
+# current.time) cover all branches of the slot-selection of the hourly
+# forecast and days with mixed weather. A multi-location response is
+# built from these fixtures. These responses are minimized (no daily
+# block), batch-3.json is a complete multi-location response (list with
+# location_id, current, hourly and daily). Benchmarks:
+#
+#   parse/HH       OpenMeteoDataProvider.update_data (stub wifi-helper)
+#   aggregate/HH   OpenMeteoDataProvider._get_day_aggregates
+#   batch/N        OpenMeteoBatchProvider.update_data for N locations
+#   batch-daily/N  same with batch-3.json, min/max from the daily block
+#   layout/WxH     Layout.solve (uncached)
+#   update/WxH     OpenMeteoUIProvider.update_ui
+#   show/WxH       headless refresh (FramebufferDisplay, needs NumPy)
+#   fetch          update_data with WifiHelper from a server (-u, e.g.
+#                  tools/openmeteo_server.py), failed fetches are counted
+#
+# Every benchmark reports the median time of all runs and the peak memory
+# (tracemalloc) of a separate run. With -s the results are saved as
+# baseline, otherwise they are compared to the baseline: a benchmark
+# slower or using more memory than the baseline plus the threshold is a
+# regression (exit-code 1). Differences below the minimal absolute delta
+# (-d) are ignored: timings in the range of milliseconds are noisy.
+# tools/benchmark.json is a reference baseline (CPython 3.11, x86_64). The
+# timings depend on the machine: save a local baseline with -s -n 30
+# before comparing changes.
+#
+# The suite uses its own settings (not src/settings.py), so results only
+# depend on the code. With -r a live response for the current hour is
+# recorded as new fixture.
+#
+# Usage: tools/benchmark.py [-n runs] [-t threshold] [-d delta] [-b baseline]
+#                           [-s] [-k filter] [-r] [-u url [-c ca-file]]
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import sys
+import os
+import gc
+import json
+import time
+import types
+import argparse
+import tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR   = os.path.normpath(os.path.join(TOOLS_DIR,"..","src"))
+FIXTURES  = os.path.join(TOOLS_DIR,"fixtures")
+BATCH     = os.path.join(FIXTURES,"batch-3.json")
+BASELINE  = os.path.join(TOOLS_DIR,"benchmark.json")
+
+# display-sizes (see src/hal/GENERIC_LINUX_PC.py)
+SIZES     = [(296,128),(400,300),(600,448),(640,400)]
+LOCATIONS = 50                          # locations of batch-benchmark
+MIN_RUN   = 0.02                        # minimal duration of a run (s)
+MIN_PEAK  = 1024                        # minimal delta of peak memory
+
+# --- settings of the suite   ------------------------------------------------
+
+class Settings:
+  pass
+
+settings = types.ModuleType("settings")
+settings.app_config = Settings()
+settings.app_config.latitude    = 52.5244
+settings.app_config.longitude   = 13.4105
+settings.app_config.debug       = False
+settings.app_config.stream_json = True
+settings.app_config.cache_file  = None
+settings.secrets = Settings()
+sys.modules["settings"] = settings
+
+CWD = os.getcwd()
+sys.path.insert(0,SRC_DIR)
+os.chdir(SRC_DIR)                       # font-paths are relative to src
+
+import layout
+from ui_settings import UI_SETTINGS
+from frame import Frame
+from openmeteo_uiprovider import OpenMeteoUIProvider
+from openmeteo_dataprovider import OpenMeteoDataProvider
+from openmeteo_batchprovider import OpenMeteoBatchProvider
+try:
+  from framebuffer import FramebufferDisplay
+except ImportError:
+  FramebufferDisplay = None
+
+UI_SETTINGS.LAYOUT_CACHE = None         # always solve
+
+# --- wifi-helper serving a fixture   ----------------------------------------
+
+class StubWifi:
+  """ wifi-helper returning a fixed response """
+
+  def __init__(self,response):
+    self._response = response
+    self.rx_bytes  = 0
+
+  def fetch(self,fetch):
+    return fetch()
+
+  def get_json(self,url):
+    self.rx_bytes += len(self._response)
+    return json.loads(self._response)
+
+  def get_chunks(self,url,chunk_size=1024):
+    for i in range(0,len(self._response),chunk_size):
+      self.rx_bytes += min(chunk_size,len(self._response)-i)
+      yield self._response[i:i+chunk_size]
+
+# --- display without output   -----------------------------------------------
+
+class Screen:
+  """ display stand-in if NumPy is not available """
+
+  def __init__(self,width,height):
+    self.width      = width
+    self.height     = height
+    self.root_group = None
+
+# --- fixtures   -------------------------------------------------------------
+
+def read_fixtures():
+  """ return {hour: response} of all fixtures """
+
+  fixtures = {}
+  for name in sorted(os.listdir(FIXTURES)):
+    if name.startswith("openmeteo-") and name.endswith(".json"):
+      with open(os.path.join(FIXTURES,name),"rb") as f:
+        fixtures[name[10:-5]] = f.read()
+  return fixtures
+
+def multi_location(responses,n):
+  """ response for n locations (Open-Meteo returns a list) """
+
+  locations = []
+  for i in range(n):
+    location = dict(responses[i % len(responses)])
+    location.pop("location_id",None)
+    if i:
+      location = dict(location_id=i,**location)     # first key, like the API
+    locations.append(location)
+  return json.dumps(locations,ensure_ascii=False,
+                    separators=(",",":")).encode()
+
+def parse(response):
+  """ return provider and data-model of a response """
+
+  provider = OpenMeteoDataProvider(fields=OpenMeteoUIProvider.FIELDS,
+                                   cache=False)
+  provider.set_wifi(StubWifi(response))
+  data = {"bat_level": 3.9}
+  provider.update_data(data)
+  return provider,data
+
+# --- benchmarks   -----------------------------------------------------------
+
+def get_benchmarks(fixtures,wifi=None):
+  """ return list of (name,setup). setup() returns the function to time """
+
+  benchmarks = []
+  if wifi:
+    def setup_fetch():
+      provider = OpenMeteoDataProvider(fields=OpenMeteoUIProvider.FIELDS,
+                                       cache=False)
+      provider.set_wifi(wifi)
+      def fetch():
+        try:
+          provider.update_data({})
+        except Exception:
+          pass                          # counted in wifi.policy.stats
+      return fetch
+    benchmarks.append(("fetch",setup_fetch))
+
+  for hour,response in fixtures.items():
+    benchmarks.append((f"parse/{hour}",
+                       lambda r=response: lambda: parse(r)))
+
+    def setup_aggregate(r=response):
+      provider,_ = parse(r)
+      return lambda: provider._get_day_aggregates(provider._hourly)
+    benchmarks.append((f"aggregate/{hour}",setup_aggregate))
+
+  def setup_batch(responses,fields):
+    locations = [(45+i*0.1,5+i*0.1) for i in range(LOCATIONS)]
+    provider  = OpenMeteoBatchProvider(locations=locations,fields=fields,
+                                       batch_size=LOCATIONS)
+    provider.set_wifi(StubWifi(multi_location(responses,LOCATIONS)))
+    return lambda: provider.update_data({})
+  benchmarks.append((f"batch/{LOCATIONS}",lambda: setup_batch(
+    [json.loads(r) for r in fixtures.values()],OpenMeteoUIProvider.FIELDS)))
+
+  # without hourly temperatures, daily min/max are fetched from Open-Meteo
+  with open(BATCH,"rb") as f:
+    batch = json.load(f)
+  fields = [f for f in OpenMeteoUIProvider.FIELDS if f != "hours.temp"]
+  benchmarks.append((f"batch-daily/{LOCATIONS}",
+                     lambda: setup_batch(batch,fields)))
+
+  models = [parse(response)[1] for response in fixtures.values()]
+  for width,height in SIZES:
+    size = f"{width}x{height}"
+
+    def setup_layout(w=width,h=height):
+      rules = Frame.LAYOUT+OpenMeteoUIProvider.LAYOUT
+      def solve():
+        layout._solved.clear()
+        return layout.Layout(rules).solve(w,h)
+      return solve
+    benchmarks.append((f"layout/{size}",setup_layout))
+
+    def setup_update(w=width,h=height):
+      ui = OpenMeteoUIProvider()
+      ui.create_ui(Screen(w,h))
+      state = {"n": 0}
+      def update():
+        # alternate models: every run changes the labels
+        state["n"] += 1
+        ui.update_ui(models[state["n"] % len(models)])
+      return update
+    benchmarks.append((f"update/{size}",setup_update))
+
+    if FramebufferDisplay:
+      def setup_show(w=width,h=height):
+        display = FramebufferDisplay(w,h)
+        ui = OpenMeteoUIProvider()
+        display.root_group = ui.create_ui(display)
+        ui.update_ui(models[0])
+        return display.refresh
+      benchmarks.append((f"show/{size}",setup_show))
+  return benchmarks
+
+# --- run benchmark   --------------------------------------------------------
+
+def run(setup,runs):
+  """ return median time of runs and peak memory of a single run """
+
+  func = setup()
+  start = time.perf_counter()
+  func()                                # warm-up (caches, glyphs)
+  # loops per run: at least MIN_RUN seconds (like timeit)
+  loops = max(1,int(MIN_RUN/max(time.perf_counter()-start,1e-6)))
+  durations = []
+  for _ in range(runs):
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(loops):
+      func()
+    durations.append((time.perf_counter() - start)/loops)
+  durations.sort()
+  median = durations[len(durations)//2]
+
+  gc.collect()
+  tracemalloc.start()
+  func()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return median,peak
+
+# --- record live response   -------------------------------------------------
+
+def record():
+  """ save current response of the API as fixture """
+
+  import ssl
+  import urllib.request
+  url = OpenMeteoDataProvider(fields=OpenMeteoUIProvider.FIELDS,
+                              cache=False)._url
+  context = ssl.create_default_context()
+  if getattr(settings.secrets,"ca_file",None):
+    context.load_verify_locations(cafile=settings.secrets.ca_file)
+  with urllib.request.urlopen(url,context=context) as response:
+    data = response.read()
+  hour = json.loads(data)["current"]["time"][11:13]
+  path = os.path.join(FIXTURES,f"openmeteo-{hour}.json")
+  with open(path,"wb") as f:
+    f.write(data)
+  print(f"{path}: {len(data)} bytes")
+
+# --- get commandline arguments   --------------------------------------------
+
+def get_parser():
+  """ configure cmdline-parser """
+
+  parser = argparse.ArgumentParser(description='benchmark suite')
+  parser.add_argument('-n', '--runs', dest='runs', type=int, default=10,
+                      help='runs per benchmark (default: 10)')
+  parser.add_argument('-t', '--threshold', dest='threshold', type=float,
+                      default=0.5,
+                      help='allowed increase over baseline (default: 0.5)')
+  parser.add_argument('-d', '--delta', dest='delta', type=float, default=1.0,
+                      help='ignored absolute increase in ms (default: 1.0)')
+  parser.add_argument('-b', '--baseline', dest='baseline', default=BASELINE,
+                      help='baseline-file (default: tools/benchmark.json)')
+  parser.add_argument('-s', '--save', dest='save', action='store_true',
+                      help='save results as baseline')
+  parser.add_argument('-k', '--filter', dest='filter', default=None,
+                      help='only run benchmarks containing this string')
+  parser.add_argument('-r', '--record', dest='record', action='store_true',
+                      help='record live response as fixture and exit')
+  parser.add_argument('-u', '--url', dest='url', default=None,
+                      help='base-url of the API (fetch-benchmark, record)')
+  parser.add_argument('-c', '--ca-file', dest='ca_file', default=None,
+                      help='CA-certificate of the server (with -u)')
+  return parser
+
+# --- main program   ---------------------------------------------------------
+
+if __name__ == '__main__':
+  options = get_parser().parse_args()
+  options.baseline = os.path.join(CWD,options.baseline)
+  wifi = None
+  if options.url:
+    from wifi_helper_generic import WifiHelper
+    settings.app_config.api_url = options.url
+    if options.ca_file:
+      settings.secrets.ca_file = os.path.join(CWD,options.ca_file)
+    wifi = WifiHelper()
+  if options.record:
+    record()
+    sys.exit(0)
+
+  baseline = {}
+  if not options.save:
+    try:
+      with open(options.baseline,"r") as f:
+        baseline = json.load(f)
+    except OSError:
+      print(f"no baseline: {options.baseline} (create with -s)")
+
+  results     = {}
+  regressions = 0
+  print(f"{'benchmark':<16} {'time (ms)':>10} {'peak (KiB)':>11}  baseline")
+  for name,setup in get_benchmarks(read_fixtures(),wifi):
+    if options.filter and options.filter not in name:
+      continue
+    duration,peak = run(setup,options.runs)
+    results[name] = {"time": duration, "peak": peak}
+    line = f"{name:<16} {1000*duration:10.3f} {peak/1024:11.1f}"
+    if name in baseline:
+      base = baseline[name]
+      d_time = duration/base["time"] - 1
+      d_peak = peak/base["peak"] - 1 if base["peak"] else 0
+      line  += f"  {100*d_time:+6.1f}% {100*d_peak:+6.1f}%"
+      if ((d_time > options.threshold and
+           duration - base["time"] > options.delta/1000) or
+          (d_peak > options.threshold and peak - base["peak"] > MIN_PEAK)):
+        line += "  REGRESSION"
+        regressions += 1
+    print(line)
+
+  if wifi:
+    stats = wifi.policy.stats
+    print(f"fetch: {stats.runs} runs, {stats.retries} retries, " +
+          f"{stats.failures} failures")
+
+  if options.save:
+    with open(options.baseline,"w") as f:
+      json.dump(results,f,indent=2)
+    print(f"baseline saved to {options.baseline}")
+  elif regressions:
+    print(f"{regressions} regression(s) (threshold: {options.threshold:.0%})")
+    sys.exit(1)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -------------------------------------------------------------------------
+# Icon builder: pre-render the weather-icons into a sprite-sheet.
+#
+# Every character of the icon-sets of OpenMeteoUIProvider.icons() (the
+# day- and night-icons of WMO_MAP, the "n/a"-icon and the arrows of
+# DIR_MAP) is rendered as the label the UI would create and stored as one
+# tile of a 1bpp BMP. The index (tile-size, tile and size of every icon)
+# is written as JSON next to the BMP. See src/icon_sheet.py.
+#
+# The default output is UI_SETTINGS.ICON_SHEET (relative to src). Copy
+# both files to the device. Rebuild the sheet after changing the
+# icon-fonts in settings.py (a sheet of different fonts is ignored).
+#
+# Usage: tools/build_icons.py [-c columns] [-o sheet.bmp]
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import sys
+import os
+import json
+import argparse
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","src")
+sys.path.insert(0,SRC_DIR)
+
+import numpy as np
+import displayio
+from adafruit_display_text import label
+
+import font_cache
+from ui_settings import UI_SETTINGS
+from openmeteo_uiprovider import OpenMeteoUIProvider
+import framebuffer
+
+# --- render icons   ---------------------------------------------------------
+
+def render_icons():
+  """ render all icons, return tile-size and {name: (font,[icons])} """
+
+  palette    = displayio.Palette(2)
+  palette[0] = 0xFFFFFF
+  palette[1] = 0x000000
+
+  labels = {}
+  for name,(font_path,chars,tight) in OpenMeteoUIProvider.icons().items():
+    font = font_cache.get_font(font_path,chars)
+    labels[name] = []
+    for char in dict.fromkeys(chars):              # unique, keep order
+      if not font.get_glyph(ord(char)):
+        print(f"{font_path}: warning: no glyph for U+{ord(char):04X}",
+              file=sys.stderr)
+        continue
+      lbl = label.Label(font,text=char,color=0x000000,
+                        background_tight=tight,
+                        anchor_point=(0,0),anchored_position=(0,0))
+      labels[name].append((char,lbl))
+
+  t_width  = max(lbl.bounding_box[2] for l in labels.values() for _,lbl in l)
+  t_height = max(lbl.bounding_box[3] for l in labels.values() for _,lbl in l)
+  renderer = framebuffer.Framebuffer(t_width,t_height,palette)
+
+  icons = {}
+  for name,lbls in labels.items():
+    icons[name] = (OpenMeteoUIProvider.icons()[name][0],[])
+    for char,lbl in lbls:
+      group = displayio.Group()
+      group.append(lbl)
+      icons[name][1].append((char,lbl.bounding_box[2],lbl.bounding_box[3],
+                             renderer.render(group).copy()))
+  return (t_width,t_height,icons)
+
+# --- write 1bpp BMP   -------------------------------------------------------
+
+def to_bmp(tiles,t_width,t_height,columns,colors):
+  """ create sheet of tiles (framebuffers), return 1bpp BMP """
+
+  rows  = (len(tiles)+columns-1)//columns
+  sheet = np.zeros((rows*t_height,columns*t_width),dtype=np.uint8)
+  for n,tile in enumerate(tiles):
+    x0 = (n % columns)*t_width
+    y0 = (n // columns)*t_height
+    sheet[y0:y0+t_height,x0:x0+t_width] = tile
+  return framebuffer.to_bmp(sheet,colors,bpp=1)
+
+# --- get commandline arguments   --------------------------------------------
+
+def get_parser():
+  """ configure cmdline-parser """
+
+  parser = argparse.ArgumentParser(description='build icon sprite-sheet')
+  parser.add_argument('-c', '--columns', dest='columns', type=int,
+                      default=8, help='number of tiles per row (default: 8)')
+  parser.add_argument('-o', '--output', dest='output', default=None,
+                      help='BMP-file (default: UI_SETTINGS.ICON_SHEET)')
+  return parser
+
+# --- main program   ---------------------------------------------------------
+
+if __name__ == '__main__':
+  options = get_parser().parse_args()
+  if options.output:
+    output = os.path.abspath(options.output)
+  else:
+    output = os.path.normpath(os.path.join(SRC_DIR,UI_SETTINGS.ICON_SHEET))
+
+  os.chdir(SRC_DIR)                 # font-paths are relative to src
+  t_width,t_height,icons = render_icons()
+
+  tiles = []
+  index = {"tile": [t_width,t_height], "icons": {}}
+  for name,(font_path,entries) in icons.items():
+    index["icons"][name] = [font_path,{}]
+    for char,width,height,tile in entries:
+      index["icons"][name][1][f"{ord(char):04x}"] = [len(tiles),width,height]
+      tiles.append(tile)
+
+  os.makedirs(os.path.dirname(output),exist_ok=True)
+  with open(output,"wb") as f:
+    f.write(to_bmp(tiles,t_width,t_height,options.columns,
+                   [0xFFFFFF,0x000000]))
+  with open(output[:output.rfind(".")]+".json","w") as f:
+    json.dump(index,f)
+  print(f"{output}: {len(tiles)} icons, tiles {t_width}x{t_height}, " +
+        f"{os.path.getsize(output)} bytes")
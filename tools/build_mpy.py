@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -------------------------------------------------------------------------
+# Build a deployable bundle: compile src/ with mpy-cross.
+#
+# Precompiled modules (*.mpy) load faster and need less memory on the MCU
+# than source-files, since the device does not compile them at boot.
+# The bundle contains
+#
+#   - main.py as source (CircuitPython only runs source-files)
+#   - all other modules of src/ and src/hal/ compiled to *.mpy, except
+#     the modules only used on a PC (CPYTHON_ONLY)
+#   - hal_map.mpy: map of board-id to HAL-module, so the application
+#     selects the HAL without a failing import (Application._get_hal())
+#   - fonts/ and images/ (run tools/compile_fonts.py and
+#     tools/build_icons.py before)
+#
+# settings.py is not part of the bundle. Copy the content of the bundle
+# to the CIRCUITPY-drive and remove the source-files of older
+# installations: a *.py file takes precedence over a *.mpy file.
+#
+# The version of mpy-cross must match the version of CircuitPython on
+# the device (download: https://adafruit-circuit-python.s3.amazonaws.com,
+# folder bin/mpy-cross).
+#
+# With -p the import-profile (src/import_profile.py) of the sources is
+# run with CPython and saved to the bundle. Run the same profile on the
+# device with the REPL to check the startup of the bundle.
+#
+# Usage: tools/build_mpy.py [-m mpy-cross] [-a args] [-o dir] [-p]
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import sys
+import os
+import shutil
+import argparse
+import subprocess
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR   = os.path.normpath(os.path.join(TOOLS_DIR,"..","src"))
+OUT_DIR   = os.path.normpath(os.path.join(TOOLS_DIR,"..","build","bundle"))
+
+SOURCE       = ["main.py"]                  # copied as source
+SKIP         = ["settings.py","settings_template.py"]
+CPYTHON_ONLY = ["framebuffer.py","wifi_helper_generic.py",
+                "hal/GENERIC_LINUX_PC.py","hal/headless.py"]
+HAL_COMMON   = ["hal/__init__.py","hal/hal_base.py","hal/hal_default.py"]
+ASSETS       = ["fonts","images"]
+
+# --- collect modules   ------------------------------------------------------
+
+def get_modules():
+  """ return list of modules (paths relative to src) """
+
+  modules = []
+  for subdir in ["","hal"]:
+    for name in sorted(os.listdir(os.path.join(SRC_DIR,subdir))):
+      path = f"{subdir}/{name}" if subdir else name
+      if (name.endswith(".py") and path not in SKIP and
+          path not in CPYTHON_ONLY):
+        modules.append(path)
+  return modules
+
+# --- map of board-id to HAL-module   ----------------------------------------
+
+def write_hal_map(modules,path):
+  """ write map of all board-specific HAL-modules """
+
+  hals = [m for m in modules
+          if m.startswith("hal/") and m not in HAL_COMMON]
+  with open(path,"w") as f:
+    f.write("# generated by tools/build_mpy.py\n\nHAL_MAP = {\n")
+    for m in hals:
+      board_id = m[4:-3]
+      f.write(f'  "{board_id}": "hal.{board_id}",\n')
+    f.write("}\n")
+  return hals
+
+# --- compile module   -------------------------------------------------------
+
+def compile_module(options,source,target,name):
+  """ compile source with mpy-cross """
+
+  cmd = [options.mpy_cross]+options.args.split()+["-o",target,"-s",name,
+                                                  source]
+  result = subprocess.run(cmd,capture_output=True,text=True)
+  if result.returncode:
+    print(f"{name}: {result.stderr.strip()}",file=sys.stderr)
+    sys.exit(3)
+
+# --- build bundle   ---------------------------------------------------------
+
+def build(options):
+  """ build bundle, return (size of sources, size of bundle) """
+
+  if os.path.exists(options.output):
+    shutil.rmtree(options.output)
+  os.makedirs(os.path.join(options.output,"hal"))
+
+  src_size = 0
+  out_size = 0
+  modules  = get_modules()
+  for path in modules:
+    source = os.path.join(SRC_DIR,path)
+    if path in SOURCE:
+      target = os.path.join(options.output,path)
+      shutil.copyfile(source,target)
+    else:
+      target = os.path.join(options.output,path[:-3]+".mpy")
+      compile_module(options,source,target,path)
+    src_size += os.path.getsize(source)
+    out_size += os.path.getsize(target)
+    print(f"{path:<32} {os.path.getsize(source):7d} -> " +
+          f"{os.path.getsize(target):7d}")
+
+  hal_map = os.path.join(options.output,"hal_map.py")
+  hals    = write_hal_map(modules,hal_map)
+  compile_module(options,hal_map,hal_map[:-3]+".mpy","hal_map.py")
+  os.remove(hal_map)
+  print(f"hal_map.mpy: {', '.join([m[4:-3] for m in hals])}")
+
+  for asset in ASSETS:
+    shutil.copytree(os.path.join(SRC_DIR,asset),
+                    os.path.join(options.output,asset))
+  return src_size,out_size
+
+# --- import-profile   -------------------------------------------------------
+
+def profile(options):
+  """ run import-profile with CPython and save it to the bundle """
+
+  result = subprocess.run(
+    [sys.executable,"-c","import import_profile; import_profile.run()"],
+    cwd=SRC_DIR,capture_output=True,text=True)
+  print(result.stdout,end="")
+  if result.returncode:
+    print(result.stderr,file=sys.stderr)
+    return
+  with open(os.path.join(options.output,"import_profile.txt"),"w") as f:
+    f.write(result.stdout)
+
+# --- get commandline arguments   --------------------------------------------
+
+def get_parser():
+  """ configure cmdline-parser """
+
+  parser = argparse.ArgumentParser(description='build mpy-bundle')
+  parser.add_argument('-m', '--mpy-cross', dest='mpy_cross',
+                      default='mpy-cross',
+                      help='mpy-cross executable (default: mpy-cross)')
+  parser.add_argument('-a', '--args', dest='args', default='',
+                      help='additional arguments of mpy-cross (e.g. "-O1")')
+  parser.add_argument('-o', '--output', dest='output', default=OUT_DIR,
+                      help='output-directory (default: build/bundle)')
+  parser.add_argument('-p', '--profile', dest='profile', action='store_true',
+                      help='run import-profile (CPython)')
+  return parser
+
+# --- main program   ---------------------------------------------------------
+
+if __name__ == '__main__':
+  options = get_parser().parse_args()
+  options.output = os.path.abspath(options.output)
+  if options.output == SRC_DIR:
+    print("output-directory must not be src",file=sys.stderr)
+    sys.exit(3)
+  if not shutil.which(options.mpy_cross):
+    print(f"{options.mpy_cross} not found (see option -m)",file=sys.stderr)
+    sys.exit(3)
+
+  src_size,out_size = build(options)
+  print(f"modules: {src_size} -> {out_size} bytes ({options.output})")
+  if options.profile:
+    profile(options)
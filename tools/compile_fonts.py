@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -------------------------------------------------------------------------
+# Font compiler: convert the BDF-fonts of UI_SETTINGS to packed fonts.
+#
+# BDF-fonts are text-files that are slow to parse on the MCU. This tool
+# subsets the fonts to the characters the UI can display (see
+# Frame.glyphs() and OpenMeteoUIProvider.glyphs(), including the
+# localised UI_MONTHS/UI_DAYS from settings.py) and writes them in the
+# binary format of src/packed_font.py.
+#
+# The packed fonts are written next to the BDF-fonts (same name,
+# extension .pft). font_cache.get_font() prefers them automatically.
+# Copy them together with the BDF-fonts to the device: glyphs missing in
+# the subset are still loaded from the BDF-font.
+#
+# Usage: tools/compile_fonts.py [-a] [-c chars] [-o dir] [font.bdf ...]
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import sys
+import os
+import struct
+import argparse
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","src")
+sys.path.insert(0,SRC_DIR)
+
+from packed_font import MAGIC, HEADER, ENTRY, NO_GLYPH
+
+# --- parse BDF-font   -------------------------------------------------------
+
+def read_bdf(path):
+  """ parse BDF-font, return (bbox,ascent,descent,glyphs) """
+
+  bbox    = None
+  ascent  = 0
+  descent = 0
+  glyphs  = {}            # code-point -> (w,h,dx,dy,shift_x,rows)
+  with open(path,"r",encoding="latin-1") as f:
+    lines = iter(f.read().splitlines())
+
+  for line in lines:
+    if line.startswith("FONTBOUNDINGBOX "):
+      bbox = tuple(int(v) for v in line.split()[1:5])
+    elif line.startswith("FONT_ASCENT "):
+      ascent = int(line.split()[1])
+    elif line.startswith("FONT_DESCENT "):
+      descent = int(line.split()[1])
+    elif line.startswith("STARTCHAR"):
+      code_point = -1
+      w = h = dx = dy = shift_x = 0
+      rows = []
+      for line in lines:
+        if line.startswith("ENCODING "):
+          code_point = int(line.split()[1])
+        elif line.startswith("DWIDTH "):
+          shift_x = int(line.split()[1])
+        elif line.startswith("BBX "):
+          w,h,dx,dy = (int(v) for v in line.split()[1:5])
+        elif line.startswith("BITMAP"):
+          for line in lines:
+            if line.startswith("ENDCHAR"):
+              break
+            rows.append(bytes.fromhex(line.strip())[:(w+7)//8])
+          break
+      if code_point >= 0:
+        glyphs[code_point] = (w,h,dx,dy,shift_x,rows)
+
+  if bbox is None:
+    raise ValueError(f"{path}: missing FONTBOUNDINGBOX")
+  return (bbox,ascent,descent,glyphs)
+
+# --- write packed font   ----------------------------------------------------
+
+def write_packed(path,bbox,ascent,descent,glyphs):
+  """ write packed font, return size of file. Glyphs may be None """
+
+  index = bytearray()
+  data  = bytearray()
+  for code_point in sorted(glyphs):
+    if glyphs[code_point] is None:
+      index += struct.pack(ENTRY,code_point,NO_GLYPH,0,0,0,0,0)
+      continue
+    w,h,dx,dy,shift_x,rows = glyphs[code_point]
+    index += struct.pack(ENTRY,code_point,len(data),w,h,dx,dy,shift_x)
+    for row in rows:
+      data += row.ljust((w+7)//8,b"\x00")
+  with open(path,"wb") as f:
+    f.write(struct.pack(HEADER,MAGIC,len(glyphs),*bbox,ascent,descent))
+    f.write(index)
+    f.write(data)
+  return struct.calcsize(HEADER) + len(index) + len(data)
+
+# --- collect characters used by the UI   ------------------------------------
+
+def get_ui_glyphs():
+  """ return mapping font-path -> set of characters """
+
+  from frame import Frame
+  from openmeteo_uiprovider import OpenMeteoUIProvider
+
+  result = {}
+  for glyphs in (Frame.glyphs(),OpenMeteoUIProvider.glyphs()):
+    for path,chars in glyphs.items():
+      result.setdefault(path,set()).update(chars)
+  return result
+
+# --- get commandline arguments   --------------------------------------------
+
+def get_parser():
+  """ configure cmdline-parser """
+
+  parser = argparse.ArgumentParser(description='compile BDF-fonts')
+  parser.add_argument('-a', '--all', action='store_true',
+                      dest='all', default=False,
+                      help='keep all glyphs (no subsetting)')
+  parser.add_argument('-c', '--chars', dest='chars', default='',
+                      help='additional characters to keep')
+  parser.add_argument('-o', '--output', dest='output', default=None,
+                      help='output-directory (default: next to BDF-font)')
+  parser.add_argument('fonts', nargs='*', metavar='font',
+                      help='BDF-fonts (default: all fonts of the UI)')
+  return parser
+
+# --- main program   ---------------------------------------------------------
+
+if __name__ == '__main__':
+  options = get_parser().parse_args()
+
+  os.chdir(SRC_DIR)                 # font-paths are relative to src
+  ui_glyphs = get_ui_glyphs()
+  fonts     = options.fonts or sorted(ui_glyphs)
+
+  for path in fonts:
+    bbox,ascent,descent,glyphs = read_bdf(path)
+    if not options.all:
+      chars  = ui_glyphs.get(path,set()) | set(options.chars)
+      keep   = {ord(c) for c in chars}
+      glyphs = {cp: g for cp,g in glyphs.items() if cp in keep}
+      for cp in sorted(keep - set(glyphs)):
+        print(f"{path}: warning: no glyph for U+{cp:04X}",file=sys.stderr)
+        glyphs[cp] = None             # don't search the BDF-font at runtime
+
+    name   = os.path.splitext(os.path.basename(path))[0]+".pft"
+    target = os.path.join(options.output or os.path.dirname(path),name)
+    size   = write_packed(target,bbox,ascent,descent,glyphs)
+    print(f"{path}: {len(glyphs)} glyphs, " +
+          f"{os.path.getsize(path)} -> {size} bytes ({target})")
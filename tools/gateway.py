@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -------------------------------------------------------------------------
+# Render gateway: render the weather screen on a server (CPython) and
+# serve it as a ready-to-show packed bitmap.
+#
+# The gateway reuses the data- and UI-provider of the application. It
+# renders the displayio group-tree into a palette-indexed framebuffer and
+# returns it as a 4bpp BMP (for OnDiskBitmap) or as packed raw rows.
+# Rendering uses src/framebuffer.py (needs NumPy).
+# Bitmaps are cached per location, display size and battery-level (as
+# shown in the footer) until the data interval of Open-Meteo expires.
+#
+# The locations of app_config.locations (settings.py) are fetched in
+# batches (OpenMeteoBatchProvider): one request per batch_size locations
+# instead of one request per panel. Other locations are fetched one by one.
+#
+# Usage: tools/gateway.py [-p port] [-H host]
+#   GET /v1/screen?latitude=52.52&longitude=13.41&width=600&height=448
+#                  [&format=bmp|raw][&bat=3.9]
+#
+# The response starts with a preamble (see PREAMBLE) followed by the
+# payload.
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import sys
+import os
+import time
+import struct
+import threading
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "..","src"))
+
+import framebuffer
+from wifi_helper_generic import WifiHelper
+from openmeteo_uiprovider import OpenMeteoUIProvider
+from openmeteo_dataprovider import OpenMeteoDataProvider
+from openmeteo_batchprovider import OpenMeteoBatchProvider
+from settings import app_config
+
+# preamble: magic, update (seconds since 1970, local time of location),
+#           interval (seconds), format (0: bmp, 1: raw)
+PREAMBLE = "<4sIHB"
+MAGIC    = b"EIW1"
+FORMATS  = {"bmp": 0, "raw": 1}
+
+# --- display stand-in   -----------------------------------------------------
+
+class Display:
+  """ the UI-provider only needs the size of the display """
+  def __init__(self,width,height):
+    self.width  = width
+    self.height = height
+
+# --- gateway   --------------------------------------------------------------
+
+class Gateway:
+  """ fetch, render and cache screens """
+
+  def __init__(self,locations=None,debug=False):
+    self._debug = debug
+    self._wifi  = WifiHelper(debug=debug)
+    self._lock  = threading.Lock()
+    self._data  = {}      # (lat,lon) -> (expires,data)
+    self._ui    = {}      # (width,height) -> (uiprovider,group)
+    self._cache = {}      # (location,width,height,format,bat) ->
+                          #                                 (expires,payload)
+    self._batch = None
+    self._batch_locs = []
+    if locations:
+      self._batch = OpenMeteoBatchProvider(locations=locations,
+                                           fields=OpenMeteoUIProvider.FIELDS,
+                                           debug=debug)
+      self._batch.set_wifi(self._wifi)
+      self._batch_locs = [Gateway.key(location) for location in locations]
+
+  def msg(self,text):
+    """ print (debug) message """
+    if self._debug:
+      print(text)
+
+  @staticmethod
+  def key(location):
+    """ normalized location (clients might send float32 digits) """
+    return (round(location[0],4),round(location[1],4))
+
+  def _get_batch(self,now):
+    """ fetch models of all batched locations """
+
+    data = {}
+    self._batch.update_data(data)
+    for location,model in zip(self._batch_locs,data["locations"]):
+      self._data[location] = (now+model["current"].interval,model)
+
+  def _get_data(self,location):
+    """ return model for location (cached until the data interval expires) """
+
+    now = time.time()
+    expires,data = self._data.get(location,(0,None))
+    if now < expires:
+      return expires,data
+    if location in self._batch_locs:
+      self._get_batch(now)
+      return self._data[location]
+    provider = OpenMeteoDataProvider(fields=OpenMeteoUIProvider.FIELDS,
+                                     location=location,cache=False,
+                                     debug=self._debug)
+    provider.set_wifi(self._wifi)
+    data = {}                   # model without the device-specific bat_level
+    provider.update_data(data)
+    expires = now + data["current"].interval
+    self._data[location] = (expires,data)
+    return expires,data
+
+  def get_screen(self,location,width,height,fmt,bat=0.0):
+    """ return payload (preamble + bitmap) """
+
+    bat = round(bat,1)              # resolution of the footer
+    with self._lock:
+      key = (location,width,height,fmt,bat)
+      expires,payload = self._cache.get(key,(0,None))
+      if time.time() < expires:
+        self.msg(f"cache hit: {key}")
+        return payload
+
+      expires,data = self._get_data(location)
+      data = dict(data,bat_level=bat)
+      if not (width,height) in self._ui:
+        ui = OpenMeteoUIProvider(debug=self._debug)
+        self._ui[(width,height)] = (ui,ui.create_ui(Display(width,height)))
+      ui,group = self._ui[(width,height)]
+
+      start = time.monotonic()
+      ui.update_ui(data)
+      ui.get_dirty()                # full frames only: drop changed regions
+      renderer = framebuffer.Framebuffer(width,height)
+      fb = renderer.render(group)
+      if fmt == "raw":
+        body = framebuffer.to_raw(fb)
+      else:
+        body = framebuffer.to_bmp(fb,renderer.colors)
+      self.msg(f"render {key}: {time.monotonic()-start:f}s")
+
+      current = data["current"]
+      payload = struct.pack(PREAMBLE,MAGIC,current.update_ts,
+                            current.interval,FORMATS[fmt]) + body
+      self._cache[key] = (expires,payload)
+      return payload
+
+# --- http handler   ---------------------------------------------------------
+
+class Handler(BaseHTTPRequestHandler):
+  gateway = None
+
+  def do_GET(self):
+    url = urlparse(self.path)
+    if url.path != "/v1/screen":
+      self.send_error(404)
+      return
+    try:
+      q        = parse_qs(url.query)
+      location = Gateway.key((float(q["latitude"][0]),
+                              float(q["longitude"][0])))
+      width    = int(q["width"][0])
+      height   = int(q["height"][0])
+      fmt      = q.get("format",["bmp"])[0]
+      bat      = float(q.get("bat",["0"])[0])
+      if fmt not in FORMATS:
+        raise ValueError(f"unsupported format {fmt}")
+    except (KeyError,ValueError) as ex:
+      self.send_error(400,str(ex))
+      return
+    try:
+      payload = Handler.gateway.get_screen(location,width,height,fmt,bat)
+    except Exception as ex:
+      self.send_error(502,str(ex))
+      return
+    self.send_response(200)
+    self.send_header("Content-Type","application/octet-stream")
+    self.send_header("Content-Length",str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+# --- main   -----------------------------------------------------------------
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="render gateway")
+  parser.add_argument("-H","--host",default="0.0.0.0")
+  parser.add_argument("-p","--port",type=int,default=8080)
+  parser.add_argument("-d","--debug",action="store_true")
+  args = parser.parse_args()
+
+  Handler.gateway = Gateway(locations=getattr(app_config,"locations",None),
+                            debug=args.debug)
+  server = ThreadingHTTPServer((args.host,args.port),Handler)
+  print(f"gateway listening on {args.host}:{args.port}")
+  server.serve_forever()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -------------------------------------------------------------------------
+# Local stand-in for the Open-Meteo forecast-API with fault injection.
+#
+# GET /v1/forecast returns synthetic data (deterministic per location and
+# day) or a recorded response (-f, e.g. tools/fixtures/openmeteo-10.json).
+# The query is honoured like the real API: variables of current, hourly
+# and daily, forecast_hours (starting at the current hour),
+# forecast_days and lists of coordinates (the response is a list).
+# Recorded responses are reduced to the requested variables and hours.
+#
+# Faults for load-testing the fetch-policy:
+#
+#   --latency s       delay before the response
+#   --bandwidth b     throttle the body to b bytes/s
+#   --truncate p      probability of a truncated body
+#   --error-rate p    probability of an error-response (--errors)
+#   --tls-delay s     delay before the TLS-handshake (needs --cert)
+#
+# Point the application to the server with app_config.api_url (and
+# secrets.ca_file for a self-signed certificate), the benchmark-suite
+# with tools/benchmark.py -u.
+#
+# Usage: tools/openmeteo_server.py [-H host] [-p port] [-f fixture]
+#                                  [-t time] [fault-options]
+#
+# Author: Bernhard Bablok
+# License: GPL3
+#
+# Website: https://github.com/bablokb/pico-e-ink-weather
+#
+# -------------------------------------------------------------------------
+
+import sys
+import ssl
+import json
+import math
+import time
+import random
+import datetime
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# units of the supported variables
+UNITS = {
+  "time":               "iso8601",
+  "interval":           "seconds",
+  "temperature_2m":     "°C",
+  "relativehumidity_2m": "%",
+  "weathercode":        "wmo code",
+  "is_day":             "",
+  "precipitation":      "mm",
+  "pressure_msl":       "hPa",
+  "wind_speed_10m":     "km/h",
+  "winddirection_10m":  "°",
+  "temperature_2m_min": "°C",
+  "temperature_2m_max": "°C",
+  "precipitation_sum":  "mm",
+  "precipitation_hours": "h",
+  "sunshine_duration":  "s",
+  "sunrise":            "iso8601",
+  "sunset":             "iso8601"
+  }
+HOURLY = ["temperature_2m","relativehumidity_2m","weathercode","is_day",
+          "precipitation","pressure_msl","wind_speed_10m","winddirection_10m"]
+DAILY  = ["weathercode","temperature_2m_min","temperature_2m_max",
+          "precipitation_sum","precipitation_hours","sunshine_duration",
+          "sunrise","sunset"]
+
+# weather per day: (wmo-codes, mean temperature, amplitude)
+REGIMES = [([0,1,2],18,7),([2,3,80,81,95,96],21,5),([3,71,73,75,85],-1,3),
+           ([45,48,51,53,3],6,2),([1,2,3,61,63,65],12,4),([0,0,1],24,8)]
+
+# --- synthetic weather   ----------------------------------------------------
+
+class Weather:
+  """ deterministic weather of a location """
+
+  def __init__(self,lat,lon,seed):
+    self._lat  = lat
+    self._lon  = lon
+    self._seed = seed
+    self._days = {}
+
+  def _day(self,date):
+    """ return hourly values of a day: {var: [24 values]} """
+
+    if date in self._days:
+      return self._days[date]
+    rnd = random.Random(f"{self._lat},{self._lon},{date},{self._seed}")
+    codes,mean,amp = REGIMES[rnd.randrange(len(REGIMES))]
+    mean += rnd.uniform(-3,3)
+    day = {var: [] for var in HOURLY}
+    for h in range(24):
+      wmo = rnd.choice(codes)
+      day["temperature_2m"].append(
+        round(mean+amp*math.sin((h-9)/24*2*math.pi)+rnd.uniform(-1,1),1))
+      day["relativehumidity_2m"].append(rnd.randrange(40,100))
+      day["weathercode"].append(wmo)
+      day["is_day"].append(1 if 5 <= h < 21 else 0)
+      day["precipitation"].append(
+        round(rnd.uniform(0.1,3.0),1) if wmo >= 51 else 0.0)
+      day["pressure_msl"].append(round(rnd.uniform(995,1030),1))
+      day["wind_speed_10m"].append(round(rnd.uniform(2,35),1))
+      day["winddirection_10m"].append(rnd.randrange(0,360))
+    self._days[date] = day
+    return day
+
+  def hourly(self,var,start,n):
+    """ return n hourly values of var starting at datetime start """
+
+    values = []
+    for i in range(n):
+      t = start + datetime.timedelta(hours=i)
+      values.append(self._day(t.date())[var][t.hour])
+    return values
+
+  def daily(self,var,date):
+    """ return daily aggregate of var """
+
+    day = self._day(date)
+    if var == "weathercode":
+      return max(day["weathercode"])
+    elif var == "temperature_2m_min":
+      return min(day["temperature_2m"])
+    elif var == "temperature_2m_max":
+      return max(day["temperature_2m"])
+    elif var == "precipitation_sum":
+      return round(sum(day["precipitation"]),1)
+    elif var == "precipitation_hours":
+      return float(len([p for p in day["precipitation"] if p > 0]))
+    elif var == "sunshine_duration":
+      return 3600.0*len([w for w,d in zip(day["weathercode"],day["is_day"])
+                         if d and w <= 1])
+    elif var == "sunrise":
+      return f"{date}T05:00"
+    else:
+      return f"{date}T21:00"
+
+# --- build response   -------------------------------------------------------
+
+class Forecast:
+  """ create responses for a query """
+
+  def __init__(self,now=None,fixture=None,seed=0):
+    self._now     = now
+    self._fixture = fixture
+    self._seed    = seed
+
+  def _vars(self,q,section,known):
+    """ return requested variables of a section """
+
+    names = [v for v in ",".join(q.get(section,[])).split(",") if v]
+    for name in names:
+      if name not in known:
+        raise ValueError(f"Cannot initialize {section} variable " +
+                         f"from invalid String value {name}")
+    return names
+
+  def _location(self,lat,lon,q,now):
+    """ response of a single location """
+
+    current = self._vars(q,"current",HOURLY)
+    hourly  = self._vars(q,"hourly",HOURLY)
+    daily   = self._vars(q,"daily",DAILY)
+    days    = int(q.get("forecast_days",["7"])[0])
+    today   = datetime.datetime.combine(now.date(),datetime.time())
+    if "forecast_hours" in q:
+      h_start = now.replace(minute=0,second=0,microsecond=0)
+      n_hours = int(q["forecast_hours"][0])
+    else:
+      h_start = today
+      n_hours = 24*days
+
+    if self._fixture:
+      return self._recorded(lat,lon,current,hourly,daily,n_hours)
+
+    weather = Weather(lat,lon,self._seed)
+    offset  = time.localtime().tm_gmtoff
+    data = {"latitude": lat, "longitude": lon, "generationtime_ms": 0.05,
+            "utc_offset_seconds": offset,
+            "timezone": time.tzname[0],
+            "timezone_abbreviation": time.tzname[0], "elevation": 38.0}
+    if current:
+      c_time = now.replace(minute=now.minute//15*15,second=0,microsecond=0)
+      data["current_units"] = {v: UNITS[v]
+                               for v in ["time","interval"]+current}
+      data["current"] = {"time": c_time.strftime("%Y-%m-%dT%H:%M"),
+                         "interval": 900}
+      for v in current:
+        data["current"][v] = weather.hourly(v,c_time,1)[0]
+    if hourly:
+      data["hourly_units"] = {v: UNITS[v] for v in ["time"]+hourly}
+      data["hourly"] = {"time": [
+        (h_start+datetime.timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M")
+        for i in range(n_hours)]}
+      for v in hourly:
+        data["hourly"][v] = weather.hourly(v,h_start,n_hours)
+    if daily:
+      dates = [today.date()+datetime.timedelta(days=i) for i in range(days)]
+      data["daily_units"] = {v: UNITS[v] for v in ["time"]+daily}
+      data["daily"] = {"time": [str(d) for d in dates]}
+      for v in daily:
+        data["daily"][v] = [weather.daily(v,d) for d in dates]
+    return data
+
+  def _recorded(self,lat,lon,current,hourly,daily,n_hours):
+    """ recorded response reduced to the requested variables """
+
+    data = json.loads(json.dumps(self._fixture))       # deep copy
+    data["latitude"],data["longitude"] = lat,lon
+    for section,names in [("current",current),("hourly",hourly),
+                          ("daily",daily)]:
+      if not names:
+        data.pop(section,None)
+        data.pop(section+"_units",None)
+        continue
+      keep = ["time","interval"]+names
+      for key in [section,section+"_units"]:
+        if key in data:
+          data[key] = {k: v for k,v in data[key].items() if k in keep}
+      if section == "hourly" and "hourly" in data:
+        data["hourly"] = {k: v[:n_hours] for k,v in data["hourly"].items()}
+    return data
+
+  def get(self,q):
+    """ return response (a list for more than one location) """
+
+    lats = [float(v) for v in q["latitude"][0].split(",")]
+    lons = [float(v) for v in q["longitude"][0].split(",")]
+    if len(lats) != len(lons):
+      raise ValueError("Parameter 'latitude' and 'longitude' must have " +
+                       "the same number of elements")
+    now = self._now or datetime.datetime.now()
+    locations = [self._location(lat,lon,q,now) for lat,lon in zip(lats,lons)]
+    return locations[0] if len(locations) == 1 else locations
+
+# --- http handler   ---------------------------------------------------------
+
+class Handler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"       # keep-alive like the real API
+  forecast = None
+  options  = None
+  rnd      = random.Random()
+
+  def _send_json(self,status,obj):
+    """ send a complete json-response """
+
+    body = json.dumps(obj).encode()
+    self.send_response(status)
+    self.send_header("Content-Type","application/json")
+    self.send_header("Content-Length",str(len(body)))
+    if status == 429:
+      self.send_header("Retry-After","1")
+    self.end_headers()
+    self.wfile.write(body)
+
+  def _write(self,body):
+    """ write body, throttled to the configured bandwidth """
+
+    bandwidth = Handler.options.bandwidth
+    if not bandwidth:
+      self.wfile.write(body)
+      return
+    chunk = max(1,int(bandwidth/10))           # ten writes per second
+    for i in range(0,len(body),chunk):
+      self.wfile.write(body[i:i+chunk])
+      self.wfile.flush()
+      time.sleep(len(body[i:i+chunk])/bandwidth)
+
+  def do_GET(self):
+    url = urlparse(self.path)
+    if url.path != "/v1/forecast":
+      self._send_json(404,{"error": True, "reason": "Not Found"})
+      return
+
+    options = Handler.options
+    if options.latency:
+      time.sleep(options.latency)
+    if Handler.rnd.random() < options.error_rate:
+      status = Handler.rnd.choice(options.errors)
+      self.log_message("fault: status %d",status)
+      self._send_json(status,{"error": True, "reason": "injected fault"})
+      return
+
+    try:
+      response = Handler.forecast.get(parse_qs(url.query))
+    except (KeyError,ValueError) as ex:
+      self._send_json(400,{"error": True, "reason": str(ex)})
+      return
+
+    body = json.dumps(response,ensure_ascii=False).encode()
+    self.send_response(200)
+    self.send_header("Content-Type","application/json")
+    self.send_header("Content-Length",str(len(body)))
+    self.end_headers()
+    if Handler.rnd.random() < options.truncate:
+      self.log_message("fault: truncated body")
+      body = body[:len(body)//2]
+      self.close_connection = True
+    self._write(body)
+
+# --- server with optional (slow) TLS   --------------------------------------
+
+class Server(ThreadingHTTPServer):
+  context   = None
+  tls_delay = 0
+
+  def finish_request(self,request,client_address):
+    """ TLS-handshake in the thread of the request """
+
+    if not Server.context:
+      super().finish_request(request,client_address)
+      return
+    if Server.tls_delay:
+      time.sleep(Server.tls_delay)
+    try:
+      request = Server.context.wrap_socket(request,server_side=True)
+    except (ssl.SSLError,OSError) as ex:
+      print(f"TLS-handshake failed: {ex}",file=sys.stderr)
+      return
+    try:
+      super().finish_request(request,client_address)
+    finally:
+      request.close()
+
+  def handle_error(self,request,client_address):
+    """ clients giving up after a fault are expected """
+    if not isinstance(sys.exc_info()[1],(ConnectionError,ssl.SSLEOFError)):
+      super().handle_error(request,client_address)
+
+# --- main   -----------------------------------------------------------------
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Open-Meteo stand-in server")
+  parser.add_argument("-H","--host",default="localhost")
+  parser.add_argument("-p","--port",type=int,default=8081)
+  parser.add_argument("-f","--fixture",default=None,
+                      help="recorded response (default: synthetic data)")
+  parser.add_argument("-t","--time",default=None,
+                      help="fixed local time, e.g. 2024-05-02T10:45")
+  parser.add_argument("-s","--seed",type=int,default=0,
+                      help="seed of weather and faults")
+  parser.add_argument("--latency",type=float,default=0,
+                      help="delay before the response (seconds)")
+  parser.add_argument("--bandwidth",type=int,default=0,
+                      help="bandwidth of the body (bytes/s)")
+  parser.add_argument("--truncate",type=float,default=0,
+                      help="probability of a truncated body")
+  parser.add_argument("--error-rate",type=float,default=0,
+                      help="probability of an error-response")
+  parser.add_argument("--errors",default="429,500,502,503",
+                      help="status-codes of error-responses")
+  parser.add_argument("--cert",default=None,help="certificate (enables TLS)")
+  parser.add_argument("--key",default=None,help="key of the certificate")
+  parser.add_argument("--tls-delay",type=float,default=0,
+                      help="delay before the TLS-handshake (seconds)")
+  args = parser.parse_args()
+  args.errors = [int(status) for status in args.errors.split(",")]
+
+  fixture = None
+  if args.fixture:
+    with open(args.fixture,"r") as f:
+      fixture = json.load(f)
+  now = datetime.datetime.fromisoformat(args.time) if args.time else None
+  Handler.forecast = Forecast(now=now,fixture=fixture,seed=args.seed)
+  Handler.options  = args
+  Handler.rnd.seed(args.seed)
+
+  if args.cert:
+    Server.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    Server.context.load_cert_chain(args.cert,args.key)
+    Server.tls_delay = args.tls_delay
+  server = Server((args.host,args.port),Handler)
+  scheme = "https" if args.cert else "http"
+  print(f"Open-Meteo stand-in listening on {scheme}://{args.host}:{args.port}")
+  server.serve_forever()